@@ -0,0 +1,3 @@
+"""
+性能基准（离线运行，不依赖 FreshRSS / LLM）
+"""
@@ -0,0 +1,73 @@
+"""
+异步 LLM 并发基准：模拟固定延迟的 LLM，比较四个分类串行 / 并发执行 风险评估 + 摘要生成 的耗时
+
+不访问网络；每次请求 sleep --latency 秒。并发时总耗时应接近单个分类的关键路径
+（风险评估 + max(低风险, 高风险)），而不是各分类之和。
+
+用法：
+    python -m benchmarks.bench_async_llm --latency 0.5
+"""
+
+import argparse
+import asyncio
+import time
+
+from workflows.risk_assessment import arun_risk_assessment_pipeline
+from workflows.summary_generation import arun_summary_generation_pipeline
+
+CATEGORIES = ["头条", "政治", "财经", "科技"]
+
+
+class SimulatedClient:
+    """按固定延迟返回的假 LLMClient"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def arequest_gemini(self, prompt, **kwargs):
+        await asyncio.sleep(self.latency)
+        if "编号:low" in prompt:
+            return "\n".join(f"{n}:{'low' if n % 2 else 'high'}" for n in range(1, 11))
+        return "<p>摘要 [1]</p>"
+
+    async def arequest_with_fallback(self, prompt, **kwargs):
+        await asyncio.sleep(self.latency)
+        return {"content": "<p>摘要 [1]</p>", "model_used": "deepseek", "is_fallback": False, "filter_reason": None}
+
+
+def _block(category):
+    items = [
+        {"id": f"H{n}", "title": f"{category} 新闻 {n}", "summary": "摘要", "link": f"https://news.test/{n}"}
+        for n in range(1, 11)
+    ]
+    return {"section": "headline", "category": category, "items": items}
+
+
+async def _one(category, client):
+    risk = await arun_risk_assessment_pipeline(_block(category), llm_client=client, verdict_cache=False)
+    return await arun_summary_generation_pipeline(risk, llm_client=client)
+
+
+async def sequential(client):
+    return [await _one(cat, client) for cat in CATEGORIES]
+
+
+async def concurrent(client):
+    return await asyncio.gather(*(_one(cat, client) for cat in CATEGORIES))
+
+
+def main():
+    p = argparse.ArgumentParser(description="异步 LLM 并发基准")
+    p.add_argument("--latency", type=float, default=0.5)
+    args = p.parse_args()
+    client = SimulatedClient(args.latency)
+
+    for name, fn in (("串行", sequential), ("并发", concurrent)):
+        start = time.perf_counter()
+        asyncio.run(fn(client))
+        print(f"{name}  {len(CATEGORIES)} 个分类  {time.perf_counter() - start:.2f}s")
+    print(f"单个分类关键路径约 {2 * args.latency:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+分块摘要基准：模拟"耗时与输出条数成正比"的 LLM，比较单块 / 分块生成的耗时
+
+不访问网络；每条素材的生成耗时为 --per-item 秒。单块时耗时随条数线性增长，
+分块并发时约等于最大一块的耗时。
+
+用法：
+    python -m benchmarks.bench_chunked_summary --items 60 --per-item 0.02 --chunk-tokens 1500
+"""
+
+import argparse
+import asyncio
+import re
+import time
+
+from config import settings
+from workflows.summary_generation import arun_summary_generation_pipeline
+
+
+class SimulatedClient:
+    """按 prompt 中的素材条数计耗时，每条写一段并引用其编号"""
+
+    def __init__(self, per_item: float):
+        self.per_item = per_item
+
+    async def _generate(self, prompt):
+        numbers = re.findall(r"【(\d+)】", prompt)
+        await asyncio.sleep(self.per_item * len(numbers))
+        return "<h1>t</h1>" + "".join(f"<p>新闻 [{n}]</p>" for n in numbers)
+
+    async def arequest_gemini(self, prompt, **kwargs):
+        return await self._generate(prompt)
+
+    async def arequest_with_fallback(self, prompt, **kwargs):
+        return {"content": await self._generate(prompt), "model_used": "deepseek", "is_fallback": False}
+
+
+def _data(count):
+    items = [
+        {
+            "id": f"H{n}",
+            "title": f"新闻标题 {n}",
+            "summary": "摘要内容" * 40,
+            "link": f"https://news.test/{n}",
+            "ds_risk": "low",
+        }
+        for n in range(1, count + 1)
+    ]
+    return {"section": "headline", "category": "头条", "items": items}
+
+
+def main():
+    p = argparse.ArgumentParser(description="分块摘要基准")
+    p.add_argument("--items", type=int, default=60)
+    p.add_argument("--per-item", type=float, default=0.02)
+    p.add_argument("--chunk-tokens", type=int, default=1500)
+    args = p.parse_args()
+    client = SimulatedClient(args.per_item)
+    data = _data(args.items)
+
+    for name, chunk_tokens in (("单块", 0), ("分块", args.chunk_tokens)):
+        settings.SUMMARY_CHUNK_TOKENS = chunk_tokens
+        start = time.perf_counter()
+        result = asyncio.run(arun_summary_generation_pipeline(data, llm_client=client))
+        refs = len(re.findall(r"https://news\.test/", result["merged_summary"]))
+        print(
+            f"{name}  {result['meta']['low_chunks']} 块  {time.perf_counter() - start:.2f}s  "
+            f"引用 {refs}/{args.items}"
+        )
+
+
+if __name__ == "__main__":
+    main()
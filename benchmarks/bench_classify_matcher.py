@@ -0,0 +1,83 @@
+"""
+对比 Classify 关键词匹配的几种实现：
+
+- linear：按规则顺序逐个关键词 `kw in text`（改造前的写法）
+- scan：RuleEngine + KeywordMatcher scan 后端（含每条规则的命中计数；CLASSIFY_RULE_TIMING=true 时另含计时）
+- aho：RuleEngine + KeywordMatcher aho 后端（需要 pyahocorasick）
+
+规则来自 config/classify_rules.toml。
+
+用法：
+    python -m benchmarks.bench_classify_matcher --items 10000 100000
+"""
+
+import argparse
+import time
+
+from preprocessing.matcher import ahocorasick
+from preprocessing.news_item import NewsItem
+from preprocessing.rules import FIELDS, TOP_CATEGORY, RuleEngine
+
+from benchmarks.synthetic import synthetic_items
+
+
+def _linear_fires(rule, item) -> bool:
+    """逐关键词 `kw in text` 判断一条规则"""
+    for field, keywords in rule.keywords.items():
+        text = getattr(item, FIELDS[field])
+        if not any(kw in text for kw in keywords):
+            return False
+    return all(pattern.search(getattr(item, FIELDS[field])) for field, pattern in rule.patterns.items())
+
+
+def _linear_category(engine, item) -> str | None:
+    """改造前的写法：按规则顺序逐个关键词扫描"""
+    if not item.title:
+        return None
+    rules = engine.rules
+    if any(_linear_fires(r, item) for r in rules if r.action == "exclude"):
+        return None
+    if any(_linear_fires(r, item) for r in rules if r.action == "top") and not any(
+        _linear_fires(r, item) for r in rules if r.action == "soft"
+    ):
+        return TOP_CATEGORY
+    for rule in rules:
+        if rule.action == "category" and _linear_fires(rule, item):
+            return rule.category
+    return engine.fallback
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(n_items: int):
+    items = [NewsItem.from_raw(raw) for raw in synthetic_items(n_items)]
+    reference = RuleEngine(backend="scan")
+
+    elapsed, expected = _timed(lambda: [_linear_category(reference, it) for it in items])
+    print(f"{n_items:>7} 条  linear  {elapsed:.3f}s")
+
+    backends = ["scan"] + (["aho"] if ahocorasick is not None else [])
+    for backend in backends:
+        engine = RuleEngine(backend=backend)
+        elapsed, got = _timed(lambda: [engine.evaluate(it) if it.title else None for it in items])
+        assert got == expected, f"{backend} 结果与 linear 不一致"
+        print(f"{n_items:>7} 条  {backend:<6}  {elapsed:.3f}s")
+
+    if ahocorasick is None:
+        print("（未安装 pyahocorasick，跳过 aho 后端）")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Classify 关键词匹配基准")
+    p.add_argument("--items", type=int, nargs="+", default=[10000, 100000])
+    args = p.parse_args()
+    for n in args.items:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
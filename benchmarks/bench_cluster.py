@@ -0,0 +1,66 @@
+"""
+报道聚类基准：一个分类 block 聚类前后的条目数、标题 prompt 大小与聚类耗时
+
+用法：
+    python -m benchmarks.bench_cluster --items 80 500 2000
+"""
+
+import argparse
+import time
+
+from llms.build_prompt import build_headline_prompt
+from preprocessing.cluster import cluster_block
+from preprocessing.news_item import NewsItem
+from utils.tokens import estimate_tokens
+
+from benchmarks.synthetic import syndicated_items
+
+
+def _block(n_items: int) -> tuple[dict, dict]:
+    raw = syndicated_items(n_items, seed=1)
+    story_of = {item["id"]: item["story"] for item in raw}
+    items = []
+    for n, raw_item in enumerate(raw, start=1):
+        item = NewsItem.from_raw(raw_item)
+        items.append({
+            "id": f"H{n}", "title": item.title, "summary": item.summary, "link": item.link,
+            "source": item.source, "item_id": item.id, "ds_risk": "low",
+        })
+    return {"section": "headline", "category": "国际", "items": items}, story_of
+
+
+def run(n_items: int, threshold: float | None):
+    block, story_of = _block(n_items)
+
+    start = time.perf_counter()
+    merged = cluster_block(block, threshold=threshold)
+    elapsed = time.perf_counter() - start
+
+    before = build_headline_prompt(block, risk_filter="low")["prompt"]
+    after = build_headline_prompt(merged, risk_filter="low")["prompt"]
+
+    # 纯度：每簇内来自同一原稿的条目比例
+    pure = 0
+    for item in merged["items"]:
+        ids = [item["item_id"], *(m["item_id"] for m in item.get("members") or [])]
+        stories = [story_of[i] for i in ids]
+        pure += max(stories.count(s) for s in set(stories))
+    purity = pure / len(block["items"])
+
+    print(
+        f"{len(block['items']):>6} 条 -> {len(merged['items']):>6} 条  {elapsed:.3f}s  "
+        f"prompt 约 {estimate_tokens(before)} -> {estimate_tokens(after)} tokens  纯度 {purity:.3f}"
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description="报道聚类基准")
+    p.add_argument("--items", type=int, nargs="+", default=[80, 500, 2000])
+    p.add_argument("--threshold", type=float, default=None)
+    args = p.parse_args()
+    for n in args.items:
+        run(n, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
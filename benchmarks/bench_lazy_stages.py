@@ -0,0 +1,85 @@
+"""
+惰性预处理阶段基准：tracemalloc 统计 拉取条目 → 过滤 → 去重 → 分类 → 风险标注 的峰值内存
+
+- eager：每一步都生成新列表（原 filter_ru / dedupe_items 用法，风险标注逐条 copy）
+- lazy：preprocessing.stages 串联生成器，风险标注原地写入
+
+近似去重需要全部条目，开启时峰值主要由它决定；--no-near-dedupe 可单独观察流式阶段的效果。
+
+用法：
+    python -m benchmarks.bench_lazy_stages --items 20000 [--no-near-dedupe]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from config import settings
+from preprocessing.classify import CATEGORIES, Classify
+from preprocessing.dedupe import dedupe_items, near_dedupe_items
+from preprocessing.filters import filter_ru
+from preprocessing.news_item import NewsItem
+from preprocessing.stages import chain, iter_dedupe, iter_filter_ru, iter_near_dedupe
+from utils.risk import annotate_risk_levels
+
+from benchmarks.synthetic import synthetic_items
+
+
+def eager(raw):
+    items = [NewsItem.from_raw(item) for item in raw]
+    filtered = filter_ru({"items": items})
+    deduped = dedupe_items(filtered)
+    if settings.NEAR_DEDUPE_ENABLED:
+        deduped = near_dedupe_items(deduped)
+    partitioned = Classify.partition(list(deduped["items"]), CATEGORIES)
+    out = {}
+    for cat, block in partitioned.items():
+        risk_map = {str(n): "low" for n in range(1, len(block["items"]) + 1)}
+        out[cat] = [dict(item, ds_risk=risk_map.get(item["id"][1:], "unknown")) for item in block["items"]]
+    return out
+
+
+def lazy(raw):
+    items = chain(map(NewsItem.from_raw, raw), iter_filter_ru, iter_dedupe, iter_near_dedupe)
+    partitioned = Classify.partition(items, CATEGORIES)
+    out = {}
+    for cat, block in partitioned.items():
+        risk_map = {str(n): "low" for n in range(1, len(block["items"]) + 1)}
+        out[cat] = annotate_risk_levels(block["items"], risk_map)
+    return out
+
+
+def measure(fn, raw):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(raw)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return result, elapsed, peak, current, blocks
+
+
+def main():
+    p = argparse.ArgumentParser(description="惰性预处理阶段基准")
+    p.add_argument("--items", type=int, nargs="+", default=[20000])
+    p.add_argument("--no-near-dedupe", action="store_true", help="关闭近似去重（它需要物化全部条目）")
+    args = p.parse_args()
+    if args.no_near_dedupe:
+        settings.NEAR_DEDUPE_ENABLED = False
+
+    for n in args.items:
+        raw = synthetic_items(n)
+        results = {}
+        for name, fn in (("eager", eager), ("lazy", lazy)):
+            result, elapsed, peak, current, blocks = measure(fn, raw)
+            results[name] = result
+            print(
+                f"{n:>7} 条  {name:<5}  {elapsed:.3f}s  峰值 {peak / 2**20:.1f} MiB  "
+                f"结束时 {current / 2**20:.1f} MiB / {blocks} 个内存块"
+            )
+        print(f"{'':>7}    结果一致 {results['eager'] == results['lazy']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+近似去重（MinHash + LSH）基准：耗时与按原稿编号计算的合并准确度
+
+- precision：被合并进同一簇的条目中，确实来自同一原稿的比例
+- recall：同一原稿的转载稿中，被合并掉的比例
+
+实测（单核 Python 3.11，纯 Python 实现，50000 条精确去重后约 42000 条）：
+
+    默认 num_perm=16 bands=8   42153 条  1.7–2.3s  recall 0.873  误合并 0
+    num_perm=8 bands=4         42153 条  1.35–1.6s recall 0.865  误合并 0
+
+未达到"5 万条亚秒级"的目标：耗时主要在逐条分词/shingle 哈希（约一半）与签名计算，
+减少签名长度只能省两成左右；要到亚秒级需要向量化（numpy）或把这一步移出 Python。
+当前按每批约 2s 计（相对 LLM 调用可忽略），默认参数仍取召回率更高的 16 / 8。
+
+用法：
+    python -m benchmarks.bench_near_dedupe --items 50000
+    python -m benchmarks.bench_near_dedupe --items 50000 --num-perm 8 --bands 4
+"""
+
+import argparse
+import time
+
+from preprocessing.dedupe import dedupe_items, near_dedupe_items
+from preprocessing.news_item import NewsItem
+
+from benchmarks.synthetic import syndicated_items
+
+
+def run(n_items: int, threshold: float | None, num_perm: int | None = None, bands: int | None = None):
+    raw = syndicated_items(n_items)
+    story_of = {item["id"]: item["story"] for item in raw}
+    items = [NewsItem.from_raw(item) for item in raw]
+    items = dedupe_items({"items": items})["items"]
+
+    start = time.perf_counter()
+    kept = near_dedupe_items({"items": list(items)}, threshold=threshold, num_perm=num_perm, bands=bands)["items"]
+    elapsed = time.perf_counter() - start
+
+    stories = len(set(story_of.values()))
+    kept_stories = [story_of[item.id] for item in kept]
+    # 每个原稿理想情况下恰好保留一条
+    missed = len(kept_stories) - len(set(kept_stories))
+    lost = stories - len(set(kept_stories))
+    duplicates = len(items) - stories
+    recall = (duplicates - missed) / duplicates if duplicates else 1.0
+    print(
+        f"{len(items):>7} 条 -> {len(kept):>7} 条  {elapsed:.3f}s  "
+        f"原稿 {stories}  漏合并 {missed}  误合并丢失原稿 {lost}  recall {recall:.3f}"
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description="近似去重基准")
+    p.add_argument("--items", type=int, nargs="+", default=[10000, 50000])
+    p.add_argument("--threshold", type=float, default=None)
+    p.add_argument("--num-perm", type=int, default=None)
+    p.add_argument("--bands", type=int, default=None)
+    args = p.parse_args()
+    for n in args.items:
+        run(n, args.threshold, args.num_perm, args.bands)
+
+
+if __name__ == "__main__":
+    main()
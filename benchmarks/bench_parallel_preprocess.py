@@ -0,0 +1,52 @@
+"""
+并行预处理基准：不同进程数下 去重 → 近似去重 → 分类 的耗时，并校验与串行结果一致
+
+并行路径默认关闭（PREPROCESS_WORKERS=1），用本基准在目标机器上找到"加速 > 1"的条目数后，
+再设置 PREPROCESS_WORKERS 与 PREPROCESS_PARALLEL_MIN_ITEMS。单核机器上实测：
+
+    30000 条  串行 1.15s   2 进程 2.28s  加速 0.50x
+
+用法：
+    python -m benchmarks.bench_parallel_preprocess --items 100000 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+from preprocessing.classify import CATEGORIES
+from preprocessing.news_item import NewsItem
+from preprocessing.parallel import preprocess, preprocess_parallel
+
+from benchmarks.synthetic import syndicated_items
+
+
+def run(n_items: int, workers_list, chunk_size: int | None):
+    items = [NewsItem.from_raw(item) for item in syndicated_items(n_items)]
+
+    start = time.perf_counter()
+    serial = preprocess(list(items), CATEGORIES, workers=1)
+    base = time.perf_counter() - start
+    print(f"{len(items):>7} 条  串行 {base:.3f}s")
+
+    for workers in workers_list:
+        # 每轮用新的 NewsItem，避免上一轮写入的 alternates 影响比较
+        fresh = [NewsItem.from_raw(item) for item in syndicated_items(n_items)]
+        start = time.perf_counter()
+        result = preprocess_parallel(fresh, CATEGORIES, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        same = result == serial
+        print(f"{'':>7}    {workers:>2} 进程 {elapsed:.3f}s  加速 {base / elapsed:.2f}x  结果一致 {same}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="并行预处理基准")
+    p.add_argument("--items", type=int, nargs="+", default=[50000])
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--chunk-size", type=int, default=None)
+    args = p.parse_args()
+    for n in args.items:
+        run(n, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+摘要清洗对 prompt 体积的影响：同一批条目分别用原始摘要与清洗后摘要构建风险评估 prompt，
+对比字符数、估算 token 数与清洗耗时
+
+条目混合三类摘要：整篇文章 HTML（带图片、脚本、模板文字）、短 HTML 片段、纯文本
+
+用法：
+    python -m benchmarks.bench_sanitize --items 200 2000
+"""
+
+import argparse
+import random
+import time
+
+from llms.build_prompt import RISK_ASSESSMENT_TEMPLATE
+from preprocessing.sanitize import sanitize_block
+from utils.tokens import estimate_tokens
+
+
+def _summary(rnd: random.Random, i: int) -> str:
+    kind = rnd.random()
+    sentence = f"Officials said on Tuesday that talks over item {i} would continue next week. "
+    if kind < 0.5:
+        paragraphs = "".join(
+            f"<p>{sentence * rnd.randint(2, 4)}<a href='https://x.test/{i}?utm_source=rss'>link</a></p>"
+            f"<figure><img src='https://cdn.test/{i}-{p}.jpg' srcset='a 1x, b 2x'>"
+            f"<figcaption>Photo: Agency</figcaption></figure>"
+            for p in range(rnd.randint(6, 15))
+        )
+        return (
+            f"<div class='article'>{paragraphs}<script>trackView({i})</script>"
+            f"<img src='https://pixel.test/{i}.gif' width='1' height='1'>"
+            f"<p>The post Item {i} appeared first on Example News.</p></div>"
+        )
+    if kind < 0.8:
+        return f"<p>{sentence * 2}</p><p>Continue reading &raquo;</p>"
+    return sentence * 2
+
+
+def _prompt(items) -> str:
+    lines = [
+        f"{i + 1}. 标题：{item['title']}\n   摘要：{' '.join(str(item['summary']).split())}"
+        for i, item in enumerate(items)
+    ]
+    return RISK_ASSESSMENT_TEMPLATE.format(news_items="\n\n".join(lines))
+
+
+def run(n_items: int):
+    rnd = random.Random(0)
+    items = [
+        {"id": f"H{i + 1}", "title": f"Headline {i}", "summary": _summary(rnd, i)}
+        for i in range(n_items)
+    ]
+    raw_prompt = _prompt(items)
+
+    block = {"category": "bench", "items": [dict(it) for it in items]}
+    start = time.perf_counter()
+    sanitize_block(block)
+    elapsed = time.perf_counter() - start
+    clean_prompt = _prompt(block["items"])
+
+    raw_tokens, clean_tokens = estimate_tokens(raw_prompt), estimate_tokens(clean_prompt)
+    print(
+        f"{n_items:>6} 条  prompt {len(raw_prompt):>9} → {len(clean_prompt):>8} 字符  "
+        f"约 {raw_tokens:>8} → {clean_tokens:>7} tokens（{raw_tokens / clean_tokens:.1f}x）  清洗 {elapsed:.3f}s"
+    )
+
+
+def main():
+    p = argparse.ArgumentParser(description="摘要清洗基准")
+    p.add_argument("--items", type=int, nargs="+", default=[200, 2000])
+    args = p.parse_args()
+    for n in args.items:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
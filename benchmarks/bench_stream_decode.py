@@ -0,0 +1,100 @@
+"""
+对比 FreshRSS 响应的两种解码方式：
+
+- 整体解析：读入完整响应体再 json.loads（即 resp.json() 的路径）
+- 流式解析：StreamingDecoder 按块读取，逐条解码并做字段投影
+
+用法：
+    python -m benchmarks.bench_stream_decode --items 20000
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ingestion.stream_decode import StreamingDecoder
+
+CHUNK_SIZE = 65536
+
+
+def _synthetic_item(i: int) -> dict:
+    body = f"<p>Paragraph {i} with some <b>markup</b> and a tracking pixel.</p>" * 40
+    return {
+        "id": f"tag:google.com,2005:reader/item/{i:016x}",
+        "crawlTimeMsec": str(1700000000000 + i),
+        "timestampUsec": str(1700000000000000 + i * 1000),
+        "published": 1700000000 + i,
+        "title": f"Synthetic headline number {i} about markets and elections",
+        "canonical": [{"href": f"https://news.test/{i}", "type": "text/html"}],
+        "alternate": [{"href": f"https://news.test/{i}?amp", "type": "text/html"}],
+        "categories": ["user/-/state/com.google/reading-list", "user/-/label/Top"],
+        "origin": {"streamId": f"feed/{i % 50}", "htmlUrl": "https://news.test", "title": f"Feed {i % 50}"},
+        "summary": {"content": body[:800], "direction": "ltr"},
+        "content": {"content": body, "direction": "ltr"},
+        "enclosure": [{"href": f"https://cdn.test/{i}.jpg", "type": "image/jpeg"}],
+        "annotations": [],
+        "author": "Staff",
+    }
+
+
+def _write_payload(path: Path, n_items: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"id":"user/-/state/com.google/reading-list","updated":1700000000,"items":[')
+        for i in range(n_items):
+            if i:
+                f.write(",")
+            json.dump(_synthetic_item(i), f, ensure_ascii=False)
+        f.write('],"continuation":"next"}')
+
+
+def _iter_file(path: Path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _full_parse(path: Path) -> int:
+    body = path.read_bytes()
+    data = json.loads(body.decode("utf-8"))
+    return len(data["items"])
+
+
+def _stream_parse(path: Path) -> int:
+    data = StreamingDecoder(_iter_file(path)).decode()
+    return len(data["items"])
+
+
+def _measure(func, path: Path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FreshRSS 响应解码基准")
+    parser.add_argument("--items", type=int, default=20000, help="合成条目数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "reading_list.json"
+        _write_payload(path, args.items)
+        size_mb = path.stat().st_size / 1024 / 1024
+        print(f"响应体: {args.items} 条, {size_mb:.1f} MB")
+
+        for name, func in (("resp.json()", _full_parse), ("StreamingDecoder", _stream_parse)):
+            count, elapsed, peak = _measure(func, path)
+            print(f"{name:<18} 条目 {count:>7}  耗时 {elapsed:6.2f}s  峰值内存 {peak / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
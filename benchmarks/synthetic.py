@@ -0,0 +1,93 @@
+"""
+基准测试共用的合成 greader 条目生成器
+
+标题/摘要从一个混合了分类关键词、排除关键词与普通词的小词表中随机组合，
+来源与标签覆盖头条 / 政治 / 财经 / 科技 / 国际各分支，结果由 seed 决定。
+"""
+
+import random
+
+WORDS = (
+    "election vote market stock tech ai chip bank music song season preview video art culture nature "
+    "policy senate economy inflation government war peace summit trade crisis storm flood court ruling "
+    "beat wins athlete review film book 选举 政府 经济 股市 科技 人工智能 museum travel worklife"
+).split()
+
+SOURCES = [
+    "BBC News", "CBS News", "NBC Top", "Reuters Business", "Tech Crunch", "头条新闻",
+    "Il Sole economia", "ABC", "Politics Daily", "Science Mag", "Al Jazeera", "Le Monde",
+]
+
+LABELS = [
+    "user/-/label/Top",
+    "user/-/label/World",
+    "user/-/state/com.google/reading-list",
+]
+
+
+def synthetic_items(n: int, seed: int = 0) -> list[dict]:
+    """生成 n 条合成 greader 条目"""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        title = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 10)))
+        if rnd.random() < 0.05:
+            # 美媒节目型标题（日期前缀）
+            title = f"{rnd.randint(1, 12)}/{rnd.randint(1, 28)} " + title
+        summary = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(10, 40)))
+        link = f"https://news.test/{i}" + ("/video/" if rnd.random() < 0.02 else "")
+        item = {
+            "id": f"tag:google.com,2005:reader/item/{i:016x}",
+            "title": title.capitalize(),
+            "published": 1700000000 + i,
+            "origin": {"title": rnd.choice(SOURCES)},
+            "categories": rnd.sample(LABELS, 2),
+            "canonical": [{"href": link}],
+            "summary": {"content": f"<p>{summary}</p>"},
+        }
+        if rnd.random() < 0.3:
+            item["summaryText"] = summary
+        out.append(item)
+    return out
+
+
+def syndicated_items(n: int, max_copies: int = 5, seed: int = 0) -> list[dict]:
+    """
+    生成约 n 条带"转载"的合成条目：每条原稿被 1..max_copies 家来源转发，
+    转载稿的标题/摘要有少量改动（换词、加前后缀），用于近似去重 / 聚类基准
+
+    Returns:
+        list: 条目列表，每条带 "story" 字段标明所属原稿编号
+    """
+    rnd = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)] + WORDS
+    out = []
+    story = 0
+    while len(out) < n:
+        title = [rnd.choice(vocab) for _ in range(rnd.randint(8, 14))]
+        summary = [rnd.choice(vocab) for _ in range(rnd.randint(40, 60))]
+        for copy in range(rnd.randint(1, max_copies)):
+            t, s = list(title), list(summary)
+            if copy:
+                # 转载稿：替换少量词，偶尔加来源前后缀
+                for _ in range(rnd.randint(0, 2)):
+                    t[rnd.randrange(len(t))] = rnd.choice(vocab)
+                for _ in range(rnd.randint(0, 4)):
+                    s[rnd.randrange(len(s))] = rnd.choice(vocab)
+                if rnd.random() < 0.3:
+                    t.append(f"- {rnd.choice(SOURCES)}")
+            i = len(out)
+            out.append({
+                "id": f"tag:google.com,2005:reader/item/{i:016x}",
+                "title": " ".join(t),
+                "published": 1700000000 + i,
+                "origin": {"title": rnd.choice(SOURCES)},
+                "categories": rnd.sample(LABELS, 2),
+                "canonical": [{"href": f"https://news{copy}.test/{story}"}],
+                "summary": {"content": f"<p>{' '.join(s)}</p>"},
+                "story": story,
+            })
+            if len(out) >= n:
+                break
+        story += 1
+    return out
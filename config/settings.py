@@ -8,6 +8,22 @@ import os
 from pathlib import Path
 
 
+def _env_list(name: str, default: str = "") -> list[str]:
+    """读取逗号分隔的环境变量列表"""
+    return [x.strip() for x in os.getenv(name, default).split(",") if x.strip()]
+
+
+def _env_weights(name: str, default: str = "") -> dict[str, float]:
+    """读取 "键=数值" 逗号分隔的环境变量（如 "BBC News=1.5,Reuters=1.2"），键转为小写"""
+    weights = {}
+    for pair in _env_list(name, default):
+        key, sep, value = pair.rpartition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"{name} 格式错误: {pair}")
+        weights[key.strip().lower()] = float(value)
+    return weights
+
+
 class Settings:
     """应用配置类"""
 
@@ -25,6 +41,23 @@ class Settings:
     )
     FRESHRSS_EMAIL = os.getenv("FRESHRSS_EMAIL", "")
     FRESHRSS_PASSWORD = os.getenv("FRESHRSS_PASSWORD", "")
+    # FreshRSS token 缓存有效期（秒），到期或收到 401 才重新认证
+    FRESHRSS_AUTH_TTL = int(os.getenv("FRESHRSS_AUTH_TTL", "86400"))
+    # 分页拉取时每页条数（greader 参数 n）
+    FRESHRSS_PAGE_SIZE = int(os.getenv("FRESHRSS_PAGE_SIZE", "1000"))
+    # 增量拉取：只请求本地高水位之后的新条目，窗口由本地条目库重建
+    FRESHRSS_INCREMENTAL = os.getenv("FRESHRSS_INCREMENTAL", "false").lower() == "true"
+    # 增量拉取时高水位向前回退的秒数，兜住抓取时间乱序到达的条目
+    FRESHRSS_INCREMENTAL_OVERLAP = int(os.getenv("FRESHRSS_INCREMENTAL_OVERLAP", "300"))
+    # 流式解码响应并只保留预处理用到的字段，降低峰值内存
+    FRESHRSS_STREAM_DECODE = os.getenv("FRESHRSS_STREAM_DECODE", "true").lower() == "true"
+    FRESHRSS_STREAM_CHUNK_SIZE = int(os.getenv("FRESHRSS_STREAM_CHUNK_SIZE", "65536"))
+    # 按时间分片并发拉取：分片数（1 表示不分片）与并发线程数
+    FRESHRSS_SHARDS = int(os.getenv("FRESHRSS_SHARDS", "1"))
+    FRESHRSS_SHARD_WORKERS = int(os.getenv("FRESHRSS_SHARD_WORKERS", "4"))
+    # 录制/回放：live 正常拉取；record 拉取并写快照；replay 只读快照，不访问网络
+    FRESHRSS_MODE = os.getenv("FRESHRSS_MODE", "live")
+    FRESHRSS_SNAPSHOT = os.getenv("FRESHRSS_SNAPSHOT", "")
 
     # deepseek API 配置
     DEEPSEEK_API_URL = os.getenv(
@@ -40,11 +73,39 @@ class Settings:
 
     # API 超时配置
     API_TIMEOUT = int(os.getenv("API_TIMEOUT", "60"))
+    # LLM 请求的 keep-alive 连接池大小（同步 requests.Session 与异步 httpx 各一个，进程内共享，见 get_llm_client）
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "10"))
+    # 流式请求（DeepSeek SSE / Gemini generate_content_stream）：风控尽早抛出，记录首 token 耗时
+    LLM_STREAM = os.getenv("LLM_STREAM", "true").lower() == "true"
+    # LLM 响应缓存（SQLite）：相同 prompt 与参数的请求在 TTL 内直接重放，总大小超限时按 LRU 淘汰
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "86400"))
+    LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "64"))
 
     # 数据目录
     DATA_DIR = BASE_DIR / "data"
     LOGS_DIR = BASE_DIR / "logs"
 
+    # 历史条目库（SQLite + FTS5），记录每次运行的条目、分类与风险结果
+    ITEM_STORE_ENABLED = os.getenv("ITEM_STORE_ENABLED", "true").lower() == "true"
+    ITEM_STORE_PATH = Path(os.getenv("ITEM_STORE_PATH", str(DATA_DIR / "items.sqlite3")))
+    # 条目保留天数（按首次写入时间），每次运行开始时清理；0 为永久保留
+    ITEM_STORE_RETENTION_DAYS = float(os.getenv("ITEM_STORE_RETENTION_DAYS", "30"))
+    LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", str(DATA_DIR / "llm_cache.sqlite3")))
+
+    # 逐条风险判定缓存：按 story_key 保存 ds_risk，有效期内不再发给 Gemini
+    RISK_CACHE_ENABLED = os.getenv("RISK_CACHE_ENABLED", "true").lower() == "true"
+    RISK_CACHE_PATH = Path(os.getenv("RISK_CACHE_PATH", str(DATA_DIR / "risk_verdicts.sqlite3")))
+    RISK_CACHE_HOURS = float(os.getenv("RISK_CACHE_HOURS", "48"))
+
+    # 已投递新闻记录（按天轮换的 Bloom 过滤器）：最近 SEEN_FILTER_HOURS 小时内同分类已发过的新闻
+    # 在风险评估前去掉；容量/假阳性率为每个代际（每天）的设计值
+    SEEN_FILTER_ENABLED = os.getenv("SEEN_FILTER_ENABLED", "true").lower() == "true"
+    SEEN_FILTER_PATH = Path(os.getenv("SEEN_FILTER_PATH", str(DATA_DIR / "seen_stories")))
+    SEEN_FILTER_HOURS = int(os.getenv("SEEN_FILTER_HOURS", "24"))
+    SEEN_FILTER_CAPACITY = int(os.getenv("SEEN_FILTER_CAPACITY", "50000"))
+    SEEN_FILTER_FP_RATE = float(os.getenv("SEEN_FILTER_FP_RATE", "0.001"))
+
     # 日志配置
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -52,10 +113,58 @@ class Settings:
 
     # 新闻过滤配置
     RUSSIA_LABEL = "user/-/label/俄罗斯"
+    # 在 FreshRSS 请求中用 xt 参数排除的标签/状态（逗号分隔），俄罗斯标签始终包含
+    FRESHRSS_EXCLUDE_TARGETS = list(dict.fromkeys([RUSSIA_LABEL] + _env_list("FRESHRSS_EXCLUDE_TARGETS")))
+    FRESHRSS_SERVER_EXCLUDE = os.getenv("FRESHRSS_SERVER_EXCLUDE", "true").lower() == "true"
+
+    # 近似去重（MinHash + LSH）：估计 Jaccard 相似度阈值、签名长度、LSH 分段数、
+    # 每个 shingle 的 token 数、参与比较的摘要前缀长度
+    NEAR_DEDUPE_ENABLED = os.getenv("NEAR_DEDUPE_ENABLED", "true").lower() == "true"
+    NEAR_DEDUPE_THRESHOLD = float(os.getenv("NEAR_DEDUPE_THRESHOLD", "0.6"))
+    NEAR_DEDUPE_NUM_PERM = int(os.getenv("NEAR_DEDUPE_NUM_PERM", "16"))
+    NEAR_DEDUPE_BANDS = int(os.getenv("NEAR_DEDUPE_BANDS", "8"))
+    NEAR_DEDUPE_SHINGLE_SIZE = int(os.getenv("NEAR_DEDUPE_SHINGLE_SIZE", "2"))
+    NEAR_DEDUPE_SUMMARY_CHARS = int(os.getenv("NEAR_DEDUPE_SUMMARY_CHARS", "150"))
+
+    # 报道聚类（TF-IDF 余弦相似度）：同一分类内同一事件的多条报道合并为一条送入 prompt
+    CLUSTER_ENABLED = os.getenv("CLUSTER_ENABLED", "true").lower() == "true"
+    CLUSTER_THRESHOLD = float(os.getenv("CLUSTER_THRESHOLD", "0.4"))
+    CLUSTER_MAX_SIZE = int(os.getenv("CLUSTER_MAX_SIZE", "6"))
+
+    # 并行预处理（大窗口回填）：条目数达到阈值时分块在进程池中做去重键 / 分类 / MinHash 签名
+    # 默认关闭（1 表示始终串行）：只在多核机器上用 benchmarks.bench_parallel_preprocess 测过有收益后再开启
+    PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "1"))  # 0 表示 CPU 核数
+    PREPROCESS_PARALLEL_MIN_ITEMS = int(os.getenv("PREPROCESS_PARALLEL_MIN_ITEMS", "20000"))
+    PREPROCESS_CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", "5000"))
+
+    # 相关度排序：每个分类按 时效 × 来源权重 × 报道数 打分，只保留前 K 条并限制单一来源条数
+    RANK_ENABLED = os.getenv("RANK_ENABLED", "true").lower() == "true"
+    RANK_TOP_K = int(os.getenv("RANK_TOP_K", "60"))
+    RANK_PER_SOURCE_CAP = int(os.getenv("RANK_PER_SOURCE_CAP", "8"))  # 0 表示不限
+    RANK_HALF_LIFE_HOURS = float(os.getenv("RANK_HALF_LIFE_HOURS", "12"))
+    RANK_COVERAGE_WEIGHT = float(os.getenv("RANK_COVERAGE_WEIGHT", "0.5"))
+    RANK_SOURCE_WEIGHTS = _env_weights("RANK_SOURCE_WEIGHTS")  # 未列出的来源权重为 1
+
+    # 分类规则文件（TOML/JSON），运行中文件 mtime 变化时自动重新加载
+    CLASSIFY_RULES_PATH = Path(os.getenv("CLASSIFY_RULES_PATH", str(BASE_DIR / "config" / "classify_rules.toml")))
+    # 检查规则文件 mtime 的最小间隔（秒）
+    CLASSIFY_RULES_RELOAD_INTERVAL = float(os.getenv("CLASSIFY_RULES_RELOAD_INTERVAL", "5"))
+    # 规则关键词匹配后端：aho（需 pyahocorasick）/ scan（逐词子串）；留空时装了 pyahocorasick 用 aho，否则 scan
+    CLASSIFY_MATCHER_BACKEND = os.getenv("CLASSIFY_MATCHER_BACKEND", "")
+    # 记录每条分类规则的累计评估耗时（约增加三成分类耗时，排查规则性能时再开启）
+    CLASSIFY_RULE_TIMING = os.getenv("CLASSIFY_RULE_TIMING", "false").lower() == "true"
+
+    # 摘要清洗：去 HTML 后每条摘要的字符预算 / token 预算（估算值，0 表示不限）
+    SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "400"))
+    SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "0"))
 
     # LLM 请求配置
     DEFAULT_TEMPERATURE = float(os.getenv("DEFAULT_TEMPERATURE", "0.3"))
     DEFAULT_MAX_TOKENS = int(os.getenv("DEFAULT_MAX_TOKENS", "4000"))
+    # 摘要分块生成：素材超过 SUMMARY_CHUNK_TOKENS（估算值，0 表示不分块）时拆块并发生成，按接续编号拼接
+    SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+    # 分块生成后再请求一次模型，把各块整合为一篇（合并重复段落，引用编号不变）
+    SUMMARY_CONDENSE = os.getenv("SUMMARY_CONDENSE", "false").lower() == "true"
 
     # SMTP配置（从环境变量读取）
     SMTP_HOST = os.getenv("SMTP_HOST", "")
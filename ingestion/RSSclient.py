@@ -1,26 +1,145 @@
+import functools
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
 from config import settings
+from ingestion.auth_cache import AuthTokenCache
+from ingestion.incremental import IncrementalStore
+from ingestion.snapshot import default_snapshot_path, load_snapshot, save_snapshot
+from ingestion.stream_decode import StreamingDecoder, project_item
 from utils.logger import get_logger
 
 logger = get_logger("ingestion")
 
 
+def _snapshot_aware(method):
+    """
+    录制/回放装饰器：回放模式直接返回快照数据（投影后）；
+    录制模式只把最外层调用的结果写入快照（get_news 内部调用分片拉取时不重复写），
+    写入的是未投影的原始条目，返回给调用方前再投影，与回放结果一致
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, hours, *args, **kwargs):
+        if self.mode == "replay":
+            self._validate_hours(hours)
+            return self._replay_data()
+
+        self._snapshot_depth += 1
+        try:
+            data = method(self, hours, *args, **kwargs)
+        finally:
+            self._snapshot_depth -= 1
+
+        if self.mode == "record" and self._snapshot_depth == 0:
+            self._record(data, hours)
+            data["items"] = self._project_items(data.get("items", []))
+        return data
+
+    return wrapper
+
+
 class RSSClient:
-    def __init__(self, timeout=None):
+    # 同一进程内按 (认证地址, 账号) 复用 Session，多次 pipeline 调用共享连接与 token
+    _sessions = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, timeout=None, auth_cache=None, mode: str | None = None, snapshot_path=None):
+        """
+        Args:
+            timeout: 请求超时（秒）
+            auth_cache: token 缓存，默认 AuthTokenCache()
+            mode: live / record / replay，默认取 FRESHRSS_MODE
+            snapshot_path: 录制写入 / 回放读取的快照路径，默认取 FRESHRSS_SNAPSHOT
+        """
         self.newsapi = settings.FRESHRSS_URL
         self.auth_url = settings.FRESHRSS_AUTH_URL
         self.timeout = timeout or settings.API_TIMEOUT
-        logger.info(f"RSSClient 初始化，超时设置: {self.timeout}秒")
+        self.mode = (mode or settings.FRESHRSS_MODE or "live").lower()
+        if self.mode not in ("live", "record", "replay"):
+            raise ValueError(f"mode 必须是 live/record/replay，当前值: {self.mode}")
+        self.snapshot_path = snapshot_path or settings.FRESHRSS_SNAPSHOT or None
+        self._snapshot = None
+        self._snapshot_depth = 0
+        logger.info(f"RSSClient 初始化，超时设置: {self.timeout}秒，模式: {self.mode}")
+
+        if self.mode == "replay":
+            # 回放不访问网络，也不需要认证
+            if not self.snapshot_path:
+                raise ValueError("回放模式需要指定快照路径（FRESHRSS_SNAPSHOT 或 --replay）")
+            self.session = None
+            return
+
+        self.auth_cache = auth_cache or AuthTokenCache()
         self.session = self._get_session()
 
+    @property
+    def _auth_key(self) -> str:
+        return f"{self.auth_url}|{settings.FRESHRSS_EMAIL}"
+
     def _get_session(self):
-        session = requests.Session()
-        auth_token = self._get_freshrss_auth()
-        session.headers.update({"Authorization": auth_token})
-        logger.debug("FreshRSS 会话创建成功")
+        key = self._auth_key
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                # 连接池大小要覆盖分片并发数，避免并发请求互相等待连接
+                adapter = HTTPAdapter(pool_maxsize=max(settings.FRESHRSS_SHARD_WORKERS, 10))
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                # 当前 Authorization 头中 token 的过期时间，0 表示尚未认证
+                session.auth_expires_at = 0.0
+                self._sessions[key] = session
+                logger.debug("FreshRSS 会话创建成功")
+            else:
+                logger.debug("复用 FreshRSS 会话")
+
+        self._ensure_auth(session)
         return session
 
+    def _ensure_auth(self, session):
+        """session 尚未认证或 token 已过 TTL 时换上新 token（取 token 可能要 ClientLogin，不持锁）"""
+        if time.time() < session.auth_expires_at:
+            return
+        token, expires_at = self._get_cached_auth()
+        self._set_auth(session, token, expires_at)
+
+    def _set_auth(self, session, token: str, expires_at: float):
+        with self._sessions_lock:
+            session.headers["Authorization"] = token
+            session.auth_expires_at = expires_at
+
+    def _get_cached_auth(self) -> tuple[str, float]:
+        """优先使用缓存的 token，没有或已过期才 ClientLogin；返回 (token, 过期时间戳)"""
+        entry = self.auth_cache.get_entry(self._auth_key)
+        if entry:
+            logger.info("使用缓存的 FreshRSS token")
+            return entry
+
+        token = self._get_freshrss_auth()
+        return token, self.auth_cache.set(self._auth_key, token)
+
+    def _reauthenticate(self):
+        """token 被服务端拒绝（401）：清缓存并重新认证"""
+        logger.warning("FreshRSS token 已失效，重新认证")
+        self.auth_cache.invalidate(self._auth_key)
+        token = self._get_freshrss_auth()
+        self._set_auth(self.session, token, self.auth_cache.set(self._auth_key, token))
+
+    def _get(self, params: dict, stream: bool = False):
+        """GET stream/contents；token 过了 TTL 时先换新，收到 401 时重新认证并重试一次"""
+        self._ensure_auth(self.session)
+        resp = self.session.get(self.newsapi, params=params, timeout=self.timeout, stream=stream)
+        if resp.status_code == 401:
+            resp.close()
+            self._reauthenticate()
+            resp = self.session.get(self.newsapi, params=params, timeout=self.timeout, stream=stream)
+        return resp
+
     def _get_freshrss_auth(self):
         logger.info("开始 FreshRSS 认证")
         params = {
@@ -52,13 +171,8 @@ class RSSClient:
         logger.error("FreshRSS Auth token 未找到")
         raise RuntimeError("FreshRSS Auth token 未找到")
 
-    def get_news(self, hours: int, n: int | None = None):
-        """
-        获取最近 N 小时新闻
-        FreshRSS(greader) 参数：
-          ot: older than timestamp（Unix 秒）
-          n: 取回条数上限
-        """
+    @staticmethod
+    def _validate_hours(hours) -> int:
         if hours is None:
             raise ValueError("hours 不能为空")
         try:
@@ -68,28 +182,38 @@ class RSSClient:
 
         if hours_int <= 0:
             raise ValueError(f"hours 必须 > 0: {hours_int}")
+        return hours_int
 
-        seconds = hours_int * 3600
-        timestamp = int(time.time() - seconds)
-
-        # 你 dzt 里之前用过非常大的 n，这里保持兼容：不传则沿用你之前的“尽量多取”
-        if n is None:
-            n = 999999999999999
+    @staticmethod
+    def _add_exclude_targets(params: dict):
+        """
+        服务端排除（greader xt 参数，可重复）：带这些标签/状态的条目不会返回，
+        省掉传输和解码；客户端 filter_ru 仍保留兜底
+        """
+        if settings.FRESHRSS_SERVER_EXCLUDE and settings.FRESHRSS_EXCLUDE_TARGETS:
+            params["xt"] = list(settings.FRESHRSS_EXCLUDE_TARGETS)
 
-        logger.info(f"开始获取最近 {hours_int} 小时新闻，时间戳: {timestamp}，n={n}")
-        params = {
-            "output": "json",
-            "n": n,
-            "ot": timestamp,
-        }
+    def _fetch(self, params: dict) -> dict:
+        """
+        发起一次 stream/contents 请求并解析 JSON，统一转换异常
 
+        FRESHRSS_STREAM_DECODE 开启时边下载边逐条解码，并只保留预处理用到的字段
+        （录制模式保留完整条目，由 _project_items 在写入快照后投影）
+        """
         try:
-            resp = self.session.get(self.newsapi, params=params, timeout=self.timeout)
-            resp.raise_for_status()
-            data = resp.json()
-            item_count = len(data.get("items", []))
-            logger.info(f"成功获取 {item_count} 条新闻")
-            return data
+            if not settings.FRESHRSS_STREAM_DECODE:
+                resp = self._get(params)
+                resp.raise_for_status()
+                return resp.json()
+
+            resp = self._get(params, stream=True)
+            try:
+                resp.raise_for_status()
+                chunks = resp.iter_content(chunk_size=settings.FRESHRSS_STREAM_CHUNK_SIZE)
+                project = None if self.mode == "record" else project_item
+                return StreamingDecoder(chunks, project=project).decode()
+            finally:
+                resp.close()
         except requests.exceptions.Timeout:
             logger.error(f"获取新闻超时 (>{self.timeout}秒)")
             raise RuntimeError(f"获取新闻超时 (>{self.timeout}秒)")
@@ -105,6 +229,298 @@ class RSSClient:
         except requests.exceptions.RequestException as e:
             logger.error(f"获取新闻请求错误: {e}")
             raise RuntimeError(f"获取新闻请求错误: {e}")
+        except ValueError as e:
+            # 流式解码的格式错误（含 json.JSONDecodeError）
+            logger.error(f"FreshRSS 返回的数据格式错误: {e}")
+            raise RuntimeError("FreshRSS 返回的数据格式错误")
+
+    # ---------- 录制 / 回放 ----------
+
+    @staticmethod
+    def _project_items(items: list) -> list:
+        """与在线拉取相同的字段投影（FRESHRSS_STREAM_DECODE 关闭时保留完整条目）"""
+        if not settings.FRESHRSS_STREAM_DECODE:
+            return list(items)
+        return [project_item(item) for item in items]
+
+    def _replay_data(self) -> dict:
+        """回放：快照中保存的是原始条目，按当前配置投影后返回（浅拷贝，items 列表独立）"""
+        if self._snapshot is None:
+            _, self._snapshot = load_snapshot(self.snapshot_path)
+        data = dict(self._snapshot)
+        data["items"] = self._project_items(self._snapshot.get("items", []))
+        return data
+
+    def _record(self, data: dict, hours: int):
+        """录制：把本次拉取结果写入快照"""
+        path = self.snapshot_path or default_snapshot_path()
+        save_snapshot(path, data, hours)
+        self.snapshot_path = path
+
+    def iter_pages(
+        self,
+        hours: int,
+        page_size: int | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ):
+        """
+        分页获取最近 N 小时新闻，逐页产出（参数与返回见 _iter_pages）
+
+        回放模式按 page_size 切分快照条目；录制模式在全部页读完后写入快照（原始条目，产出的是投影后的条目）
+        """
+        if self.mode == "replay":
+            self._validate_hours(hours)
+            data = self._replay_data()
+            items = data.pop("items")
+            page_size = int(page_size or settings.FRESHRSS_PAGE_SIZE)
+            for i in range(0, len(items), page_size):
+                yield dict(data), items[i:i + page_size]
+            return
+
+        recorded = [] if self.mode == "record" else None
+        first_page = None
+        for page_data, items in self._iter_pages(hours, page_size=page_size, since=since, until=until):
+            if recorded is not None:
+                first_page = first_page if first_page is not None else dict(page_data)
+                recorded.extend(items)
+                items = self._project_items(items)
+            yield page_data, items
+
+        if recorded is not None:
+            data = first_page or {}
+            data["items"] = recorded
+            self._record(data, hours)
+
+    def _iter_pages(
+        self,
+        hours: int,
+        page_size: int | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ):
+        """
+        分页获取最近 N 小时新闻，逐页产出
+
+        每页用 n=page_size 请求，下一页带上上一页返回的 continuation（参数 c）。
+        消费者处理当前页时，下一页已在后台线程预取。
+
+        Args:
+            hours: 时间窗口（小时）
+            page_size: 每页条数，默认 FRESHRSS_PAGE_SIZE
+            since: 起始时间戳（Unix 秒），传入时代替 now - hours 作为 ot
+            until: 截止时间戳（Unix 秒），传入时作为 nt，用于按时间分片
+
+        Yields:
+            tuple: (page_data, items)，page_data 为该页顶层字段（不含 items）
+        """
+        hours_int = self._validate_hours(hours)
+        page_size = int(page_size or settings.FRESHRSS_PAGE_SIZE)
+        if page_size <= 0:
+            raise ValueError(f"page_size 必须 > 0: {page_size}")
+
+        timestamp = int(since) if since else int(time.time() - hours_int * 3600)
+        logger.info(f"开始分页获取最近 {hours_int} 小时新闻，时间戳: {timestamp}，每页 {page_size} 条")
+
+        def params_for(continuation):
+            params = {
+                "output": "json",
+                "n": page_size,
+                "ot": timestamp,
+            }
+            self._add_exclude_targets(params)
+            if until:
+                params["nt"] = int(until)
+            if continuation:
+                params["c"] = continuation
+            return params
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            future = executor.submit(self._fetch, params_for(None))
+            page_num = 0
+            total = 0
+            while future is not None:
+                data = future.result()
+                page_num += 1
+                items = data.pop("items", None) or []
+                continuation = data.pop("continuation", None)
+
+                # 先发出下一页请求，再把当前页交给消费者
+                future = executor.submit(self._fetch, params_for(continuation)) if continuation and items else None
+
+                total += len(items)
+                logger.debug(f"第 {page_num} 页: {len(items)} 条，累计 {total} 条")
+                yield data, items
+
+            logger.info(f"分页获取完成，共 {page_num} 页 {total} 条新闻")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def iter_news(self, hours: int, page_size: int | None = None):
+        """
+        逐条产出最近 N 小时新闻（分页拉取，峰值内存约为一页）
+        """
+        for _, items in self.iter_pages(hours, page_size=page_size):
+            yield from items
+
+    @_snapshot_aware
+    def get_news(self, hours: int, n: int | None = None):
+        """
+        获取最近 N 小时新闻
+        FreshRSS(greader) 参数：
+          ot: older than timestamp（Unix 秒）
+          n: 取回条数上限
+          c: continuation，分页游标
+          xt: exclude target，排除的标签/状态（见 FRESHRSS_EXCLUDE_TARGETS）
+
+        传入 n 时保持原来的单次请求；不传则按 FRESHRSS_PAGE_SIZE 分页拉全
+        （FRESHRSS_SHARDS > 1 时按时间分片并发拉取），
+        返回结构与单次请求相同（顶层字段 + items）。
+        """
+        hours_int = self._validate_hours(hours)
+
+        if n is None and settings.FRESHRSS_SHARDS > 1:
+            return self.get_news_sharded(hours_int)
+
+        if n is None:
+            data = None
+            items = []
+            for page_data, page_items in self._iter_pages(hours_int):
+                if data is None:
+                    data = page_data
+                items.extend(page_items)
+            data = data or {}
+            data["items"] = items
+            logger.info(f"成功获取 {len(items)} 条新闻")
+            return data
+
+        seconds = hours_int * 3600
+        timestamp = int(time.time() - seconds)
+
+        logger.info(f"开始获取最近 {hours_int} 小时新闻，时间戳: {timestamp}，n={n}")
+        params = {
+            "output": "json",
+            "n": n,
+            "ot": timestamp,
+        }
+        self._add_exclude_targets(params)
+
+        data = self._fetch(params)
+        item_count = len(data.get("items", []))
+        logger.info(f"成功获取 {item_count} 条新闻")
+        return data
+
+    def _fetch_shard(self, hours: int, index: int, since: int, until: int):
+        """拉取一个时间分片 [since, until] 的全部条目，返回 (条目列表, 耗时秒)"""
+        start = time.perf_counter()
+        items = []
+        for _, page_items in self._iter_pages(hours, since=since, until=until):
+            items.extend(page_items)
+        elapsed = time.perf_counter() - start
+        logger.info(f"分片 {index}: [{since}, {until}] {len(items)} 条，耗时 {elapsed:.2f}秒")
+        return items, elapsed
+
+    @_snapshot_aware
+    def get_news_sharded(self, hours: int, shards: int | None = None, workers: int | None = None):
+        """
+        把时间窗口切成 shards 段（ot/nt 区间），在线程池上并发拉取后按时间顺序合并
+
+        分片边界处的条目可能被相邻两片同时返回，合并时按 id 去重。
+
+        Args:
+            hours: 时间窗口（小时）
+            shards: 分片数，默认 FRESHRSS_SHARDS
+            workers: 并发线程数，默认 FRESHRSS_SHARD_WORKERS（不超过分片数）
+
+        Returns:
+            dict: 与 get_news 相同结构 {"items": [...]}，按时间从新到旧
+        """
+        hours_int = self._validate_hours(hours)
+        shards = max(1, int(shards or settings.FRESHRSS_SHARDS))
+        workers = max(1, min(shards, int(workers or settings.FRESHRSS_SHARD_WORKERS)))
+
+        now = int(time.time())
+        window_start = now - hours_int * 3600
+        step = (now - window_start) / shards
+
+        # 分片从新到旧排列，与 greader 默认返回顺序一致
+        ranges = []
+        for i in range(shards):
+            until = now - int(i * step)
+            since = window_start if i == shards - 1 else now - int((i + 1) * step)
+            ranges.append((since, until))
+
+        logger.info(f"开始分片获取最近 {hours_int} 小时新闻：{shards} 片，{workers} 线程")
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self._fetch_shard, hours_int, i + 1, since, until)
+                for i, (since, until) in enumerate(ranges)
+            ]
+            results = [future.result() for future in futures]
+
+        seen = set()
+        items = []
+        duplicates = 0
+        for shard_items, _ in results:
+            for item in shard_items:
+                item_id = item.get("id")
+                if item_id and item_id in seen:
+                    duplicates += 1
+                    continue
+                if item_id:
+                    seen.add(item_id)
+                items.append(item)
+
+        elapsed = time.perf_counter() - start
+        slowest = max(shard_elapsed for _, shard_elapsed in results)
+        logger.info(
+            f"分片获取完成：共 {len(items)} 条（边界重复 {duplicates} 条），"
+            f"总耗时 {elapsed:.2f}秒，最慢分片 {slowest:.2f}秒"
+        )
+        return {"items": items}
+
+    @_snapshot_aware
+    def get_news_incremental(self, hours: int, store=None):
+        """
+        增量获取最近 N 小时新闻
+
+        只向 FreshRSS 请求本地高水位之后的新条目（ot=高水位-重叠），
+        与本地条目库合并后，从本地库重建完整的 N 小时窗口。
+
+        Args:
+            hours: 时间窗口（小时）
+            store: IncrementalStore，默认使用 DATA_DIR 下的条目库
+
+        Returns:
+            dict: 与 get_news 相同结构 {"items": [...]}，按时间从新到旧
+        """
+        hours_int = self._validate_hours(hours)
+        store = store or IncrementalStore()
+        store.load()
+
+        window_start = int(time.time() - hours_int * 3600)
+        since = window_start
+        if store.high_water_mark:
+            since = max(window_start, store.high_water_mark - settings.FRESHRSS_INCREMENTAL_OVERLAP)
+
+        logger.info(
+            f"增量获取：高水位 {store.high_water_mark or '无'}，本次 ot={since}，"
+            f"本地已有 {len(store)} 条"
+        )
+
+        added = 0
+        for _, page_items in self._iter_pages(hours_int, since=since):
+            added += store.merge(page_items)
+
+        pruned = store.prune(window_start)
+        store.save()
+
+        items = store.window(window_start)
+        logger.info(f"增量获取完成：新增 {added} 条，淘汰 {pruned} 条，窗口内共 {len(items)} 条")
+        return {"items": items}
 
     def get_24h_news(self):
         # 向后兼容旧调用
@@ -3,5 +3,7 @@
 """
 
 from .RSSclient import RSSClient
+from .incremental import IncrementalStore
+from .snapshot import save_snapshot, load_snapshot
 
-__all__ = ["RSSClient"]
+__all__ = ["RSSClient", "IncrementalStore", "save_snapshot", "load_snapshot"]
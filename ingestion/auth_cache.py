@@ -0,0 +1,92 @@
+"""
+FreshRSS 认证 token 缓存
+
+进程内缓存 + 磁盘缓存（带 TTL，文件权限 0600），
+同一进程的多个 RSSClient、以及相邻的多次运行共用一个 token，
+只在 TTL 到期或服务端返回 401 时重新 ClientLogin。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger("ingestion.auth_cache")
+
+
+class AuthTokenCache:
+    """token 缓存：key 一般为 认证地址 + 账号"""
+
+    # 进程内缓存由所有实例共享：{key: (token, expires_at)}
+    _memory = {}
+    _lock = threading.Lock()
+
+    def __init__(self, path: Path | str | None = None, ttl: int | None = None):
+        self.path = Path(path) if path else settings.DATA_DIR / "ingestion" / "freshrss_auth.json"
+        self.ttl = settings.FRESHRSS_AUTH_TTL if ttl is None else int(ttl)
+
+    def get(self, key: str) -> str | None:
+        """取未过期的 token：先查进程内，再查磁盘"""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> tuple[str, float] | None:
+        """取未过期的 (token, expires_at)"""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and cached[1] > now:
+                return cached
+
+            entry = self._read_disk().get(key)
+            if entry and entry.get("expires_at", 0) > now and entry.get("token"):
+                self._memory[key] = (entry["token"], entry["expires_at"])
+                logger.debug("使用磁盘缓存的 FreshRSS token")
+                return self._memory[key]
+
+        return None
+
+    def set(self, key: str, token: str) -> float:
+        """写入进程内与磁盘缓存，返回过期时间戳"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._memory[key] = (token, expires_at)
+            entries = self._read_disk()
+            entries[key] = {"token": token, "expires_at": expires_at}
+            self._write_disk(entries)
+        return expires_at
+
+    def invalidate(self, key: str):
+        """token 失效（如收到 401）时清除"""
+        with self._lock:
+            self._memory.pop(key, None)
+            entries = self._read_disk()
+            if entries.pop(key, None) is not None:
+                self._write_disk(entries)
+
+    def _read_disk(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"FreshRSS token 缓存读取失败，忽略: {e}")
+            return {}
+
+    def _write_disk(self, entries: dict):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # 磁盘缓存只是优化，写失败不影响本次运行
+            logger.warning(f"FreshRSS token 缓存写入失败: {e}")
@@ -0,0 +1,126 @@
+"""
+增量拉取的本地条目库
+
+保存已拉取条目（按 id 去重）和高水位（最新的抓取/发布时间），
+下次运行只需向 FreshRSS 请求高水位之后的新条目。
+"""
+
+import json
+import os
+from pathlib import Path
+
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger("ingestion.incremental")
+
+
+def item_timestamp(item: dict) -> int:
+    """
+    条目时间戳（Unix 秒）：优先抓取时间（crawlTimeMsec / timestampUsec），其次 published
+    """
+    crawl_ms = item.get("crawlTimeMsec")
+    if crawl_ms:
+        try:
+            return int(crawl_ms) // 1000
+        except (TypeError, ValueError):
+            pass
+
+    ts_usec = item.get("timestampUsec")
+    if ts_usec:
+        try:
+            return int(ts_usec) // 1_000_000
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        return int(item.get("published") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class IncrementalStore:
+    """本地条目库：{id: item} + 高水位，整体存为一个 JSON 文件"""
+
+    def __init__(self, path: Path | str | None = None):
+        self.path = Path(path) if path else settings.DATA_DIR / "ingestion" / "reading_list.json"
+        self.high_water_mark = 0
+        self.items = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def load(self):
+        """读取本地库；文件不存在或损坏时从空库开始"""
+        self.high_water_mark = 0
+        self.items = {}
+
+        if not self.path.exists():
+            logger.info(f"本地条目库不存在，将全量拉取: {self.path}")
+            return self
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"本地条目库读取失败，将全量拉取: {e}")
+            return self
+
+        self.high_water_mark = int(data.get("high_water_mark") or 0)
+        for item in data.get("items", []):
+            item_id = item.get("id")
+            if item_id:
+                self.items[item_id] = item
+
+        logger.debug(f"加载本地条目库: {len(self.items)} 条，高水位 {self.high_water_mark}")
+        return self
+
+    def merge(self, new_items) -> int:
+        """
+        合并新拉取的条目（已见过的 id 跳过），同时推进高水位
+
+        Returns:
+            int: 实际新增条数
+        """
+        added = 0
+        for item in new_items:
+            item_id = item.get("id")
+            if not item_id or item_id in self.items:
+                continue
+            self.items[item_id] = item
+            added += 1
+            ts = item_timestamp(item)
+            if ts > self.high_water_mark:
+                self.high_water_mark = ts
+        return added
+
+    def prune(self, oldest_ts: int) -> int:
+        """
+        淘汰早于 oldest_ts 的条目
+
+        Returns:
+            int: 淘汰条数
+        """
+        stale = [item_id for item_id, item in self.items.items() if item_timestamp(item) < oldest_ts]
+        for item_id in stale:
+            del self.items[item_id]
+        return len(stale)
+
+    def window(self, oldest_ts: int) -> list:
+        """返回不早于 oldest_ts 的条目，按时间从新到旧（与 greader 默认顺序一致）"""
+        items = [item for item in self.items.values() if item_timestamp(item) >= oldest_ts]
+        items.sort(key=item_timestamp, reverse=True)
+        return items
+
+    def save(self):
+        """原子写入：先写临时文件再替换"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        data = {
+            "high_water_mark": self.high_water_mark,
+            "items": list(self.items.values()),
+        }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        logger.debug(f"本地条目库已保存: {len(self.items)} 条 -> {self.path}")
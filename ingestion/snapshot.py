@@ -0,0 +1,90 @@
+"""
+FreshRSS 响应快照（录制 / 回放）
+
+录制模式把 get_news 的原始返回写成 gzip 压缩的 JSON 快照（附 hours、时间、条数等元数据），
+条目是未经字段投影（KEPT_FIELDS）的完整响应内容，回放时再按当前配置投影，
+之后调整投影字段也能用旧快照复现。回放模式从快照读取，下游流程无需网络和 FreshRSS 凭证即可复现。
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger("ingestion.snapshot")
+
+SNAPSHOT_VERSION = 1
+
+
+def default_snapshot_path() -> Path:
+    """录制时的默认路径：data/snapshots/freshrss_YYYY-MM-DD_HHMMSS.json.gz"""
+    ts = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    return settings.DATA_DIR / "snapshots" / f"freshrss_{ts}.json.gz"
+
+
+def save_snapshot(path: Path | str, data: dict, hours: int) -> dict:
+    """
+    写入快照
+
+    Args:
+        path: 快照文件路径（.json.gz）
+        data: get_news 返回的原始数据
+        hours: 拉取时的时间窗口
+
+    Returns:
+        dict: 快照元数据
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    meta = {
+        "version": SNAPSHOT_VERSION,
+        "hours": int(hours),
+        "recorded_at": datetime.now().isoformat(),
+        "timestamp": int(datetime.now().timestamp()),
+        "item_count": len(data.get("items", [])),
+    }
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump({"meta": meta, "data": data}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    logger.info(f"已录制 FreshRSS 快照: {path}（{meta['item_count']} 条，hours={meta['hours']}）")
+    return meta
+
+
+def load_snapshot(path: Path | str) -> tuple[dict, dict]:
+    """
+    读取快照
+
+    Returns:
+        tuple: (meta, data)
+
+    Raises:
+        RuntimeError: 文件不存在或格式错误
+    """
+    path = Path(path)
+    if not path.exists():
+        raise RuntimeError(f"FreshRSS 快照不存在: {path}")
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise RuntimeError(f"FreshRSS 快照读取失败: {e}")
+
+    meta = snapshot.get("meta") or {}
+    data = snapshot.get("data") or {}
+    if meta.get("version") != SNAPSHOT_VERSION:
+        raise RuntimeError(f"不支持的快照版本: {meta.get('version')}")
+
+    logger.info(
+        f"回放 FreshRSS 快照: {path}（{meta.get('item_count')} 条，"
+        f"hours={meta.get('hours')}，录制于 {meta.get('recorded_at')}）"
+    )
+    return meta, data
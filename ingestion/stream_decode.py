@@ -0,0 +1,182 @@
+"""
+FreshRSS 响应的流式 JSON 解码
+
+从响应字节流中逐条解析 items，每条只保留预处理会读取的字段，
+不必同时持有原始响应文本、完整解码结果和用不到的 greader 字段。
+"""
+
+import codecs
+import json
+
+# 预处理（filter_ru / dedupe_items / Classify）和增量拉取会读取的字段
+KEPT_FIELDS = (
+    "id",
+    "title",
+    "published",
+    "crawlTimeMsec",
+    "timestampUsec",
+    "categories",
+    "summaryText",
+    "link",
+    "source",
+)
+
+_WHITESPACE = " \t\n\r"
+_COMPACT_THRESHOLD = 1 << 20
+
+
+def _hrefs(links):
+    """canonical / alternate 只保留 href"""
+    if not isinstance(links, list):
+        return None
+    return [{"href": link.get("href")} for link in links if isinstance(link, dict)]
+
+
+def project_item(item: dict) -> dict:
+    """
+    字段投影：丢弃 content、enclosure、annotations 等不用的字段
+
+    Returns:
+        dict: 结构与 greader 条目一致，但只含 KEPT_FIELDS 及精简后的 summary/origin/链接
+    """
+    out = {key: item[key] for key in KEPT_FIELDS if key in item}
+
+    summary = item.get("summary")
+    if isinstance(summary, dict):
+        out["summary"] = {"content": summary.get("content", "")}
+    elif summary is not None:
+        out["summary"] = summary
+
+    origin = item.get("origin")
+    if isinstance(origin, dict):
+        out["origin"] = {"title": origin.get("title")}
+
+    for key in ("canonical", "alternate"):
+        links = _hrefs(item.get(key))
+        if links:
+            out[key] = links
+
+    return out
+
+
+class StreamingDecoder:
+    """
+    增量解码 {"...": ..., "items": [...], ...} 形式的 greader 响应
+
+    iter_items() 逐条产出投影后的 item；遍历结束后 meta 中是其余顶层字段
+    （id、updated、continuation 等）。
+    """
+
+    def __init__(self, chunks, project=project_item):
+        """
+        Args:
+            chunks: 字节块迭代器（如 resp.iter_content(chunk_size)）
+            project: 条目投影函数，传 None 则保留完整条目
+        """
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._project = project
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self.meta = {}
+
+    # ---------- 缓冲区 ----------
+
+    def _read_more(self) -> bool:
+        """读入下一个非空块；流结束返回 False"""
+        while not self._eof:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                tail = self._utf8.decode(b"", final=True)
+                if tail:
+                    self._buf += tail
+                    return True
+                return False
+            text = self._utf8.decode(chunk)
+            if text:
+                if self._pos > _COMPACT_THRESHOLD:
+                    self._buf = self._buf[self._pos:]
+                    self._pos = 0
+                self._buf += text
+                return True
+        return False
+
+    def _peek(self) -> str:
+        """跳过空白并返回下一个字符"""
+        while True:
+            buf = self._buf
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._read_more():
+                raise ValueError("FreshRSS 响应提前结束")
+
+    def _expect(self, char: str):
+        got = self._peek()
+        if got != char:
+            raise ValueError(f"FreshRSS 响应格式错误: 位置 {self._pos} 期望 {char!r}，实际 {got!r}")
+        self._pos += 1
+
+    def _value(self):
+        """解码一个完整 JSON 值；值恰好到缓冲区末尾时多读一块再解，避免数字被截断"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._read_more():
+                    raise
+                continue
+            if end == len(self._buf) and self._read_more():
+                continue
+            self._pos = end
+            return value
+
+    # ---------- 解析 ----------
+
+    def _iter_array(self):
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            item = self._value()
+            yield self._project(item) if self._project else item
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("]")
+            return
+
+    def iter_items(self):
+        """逐条产出 items；其余顶层字段写入 self.meta"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "items" and self._peek() == "[":
+                yield from self._iter_array()
+            else:
+                self.meta[key] = self._value()
+            if self._peek() == ",":
+                self._pos += 1
+                continue
+            self._expect("}")
+            return
+
+    def decode(self) -> dict:
+        """解码整页：返回 meta + 投影后的 items，结构与 resp.json() 相同"""
+        items = list(self.iter_items())
+        data = dict(self.meta)
+        data["items"] = items
+        return data
@@ -1,5 +1,9 @@
 import datetime
 
+from config import settings
+from utils.html_sanitizer import sanitize_summary
+from utils.tokens import estimate_tokens
+
 
 # ========== 工具函数 ==========
 
@@ -9,11 +13,17 @@ def _clean_text(s):
 
 
 def _extract_summary(item):
-    """提取新闻摘要内容"""
-    summary = item.get("summary", "")
-    if isinstance(summary, dict):
-        return summary.get("content", "")
-    return summary or ""
+    """
+    提取新闻摘要内容（支持 dict 与 NewsItem）
+
+    去 HTML 并按 SUMMARY_MAX_CHARS / SUMMARY_MAX_TOKENS 截断；流水线中已清洗过的摘要
+    走纯文本快路径，结果不变
+    """
+    return sanitize_summary(
+        item.get("summary", ""),
+        max_chars=settings.SUMMARY_MAX_CHARS,
+        max_tokens=settings.SUMMARY_MAX_TOKENS,
+    )
 
 
 def _get_item_risk(item, risk_map, index):
@@ -37,7 +47,7 @@ def _filter_by_risk(items, risk_map, risk_filter):
 
 RISK_ASSESSMENT_TEMPLATE = """你是一个"DeepSeek 风控失败概率判定器"。
 
-下面是一组国际新闻条目，每一条都有唯一编号，并包含标题与摘要。
+下面是一组国际新闻条目，每一条都有唯一编号，并包含标题与摘要；部分条目还列出了同一事件的"相关报道"标题。
 你的任务是：逐条判断，如果把该条新闻交给 DeepSeek 模型进行改写或重组，
 是否"很可能触发 DeepSeek 的内容安全机制，从而导致 DeepSeek 完全不返回任何内容"。
 
@@ -46,6 +56,7 @@ RISK_ASSESSMENT_TEMPLATE = """你是一个"DeepSeek 风控失败概率判定器"
 - 【以摘要内容为主要依据】，标题仅作辅助参考
 - 不需要考虑 Gemini 的风控规则
 - 不需要解释原因
+- 有"相关报道"的条目，相关报道会一并交给 DeepSeek：其中任一篇可能触发风控，该条即判为 high
 
 请重点参考 DeepSeek 的常见失败模式，例如：
 - 明显的违反中共主张的"统一"、"团结"等
@@ -92,6 +103,22 @@ HEADLINE_TEMPLATE = """你是一名严谨的新闻编辑，请用中文撰写栏
 {news_items}"""
 
 
+CONDENSE_TEMPLATE = """你是一名严谨的新闻编辑。下面的"{category}"栏目（日期：{date}）由多位编辑分段撰写，
+请整合为一篇连贯的栏目稿。
+【整合要求】
+1) 合并重复或同一事件的段落，删去重复表述，不新增事实
+2) 行文克制、中性，不评论、不预测、不下结论
+3) 保留所有引用：<a href="#refN">[N]</a> 的编号原样保留，不得改写、新增或删除
+
+【格式要求】
+- 只输出 HTML
+- 必须以 <h1>{date} {category}</h1> 开头
+- 正文只能由若干 <p>...</p> 组成
+
+以下是待整合的稿件：
+
+{html}"""
+
 
 # ========== Prompt 构建函数 ==========
 
@@ -112,12 +139,19 @@ def build_ds_risk_prompt(headline_block):
     if not news:
         return None
 
-    # 格式化新闻条目
-    news_lines = [
-        f"{i + 1}. 标题：{_clean_text(item.get('title'))}\n"
-        f"   摘要：{_clean_text(_extract_summary(item))}"
-        for i, item in enumerate(news)
-    ]
+    # 格式化新闻条目；聚类合并的条目连同相关报道标题一起判定（结果作用于整簇，
+    # 这些报道会作为"相关报道"进入同一风险等级的摘要素材）
+    news_lines = []
+    for i, item in enumerate(news):
+        line = (
+            f"{i + 1}. 标题：{_clean_text(item.get('title'))}\n"
+            f"   摘要：{_clean_text(_extract_summary(item))}"
+        )
+        members = item.get("members") or []
+        if members:
+            related = "；".join(_clean_text(m.get("title")) for m in members)
+            line += f"\n   相关报道：{related}"
+        news_lines.append(line)
 
     prompt = RISK_ASSESSMENT_TEMPLATE.format(
         news_items="\n\n".join(news_lines)
@@ -128,13 +162,68 @@ def build_ds_risk_prompt(headline_block):
     }
 
 
-def build_headline_prompt(input_block, risk_filter="low"):
+def _headline_material(item, n):
+    """第 n 条素材：(引用, prompt 中的素材文本)"""
+    title = _clean_text(item.get("title"))
+    summary = _clean_text(_extract_summary(item))
+    link = item.get("link") or ""
+
+    ref = {"n": n, "title": title, "url": link}
+    line = f"【{n}】\n标题：{title}\n摘要：{summary}\n"
+
+    # 聚类合并的条目：列出相关报道标题，引用中保留各自链接
+    members = item.get("members") or []
+    if members:
+        ref["related"] = [
+            {"title": _clean_text(m.get("title")), "url": m.get("link") or ""}
+            for m in members
+        ]
+        related = "；".join(r["title"] for r in ref["related"])
+        line += f"相关报道：{related}\n"
+
+    return ref, line
+
+
+def _headline_prompt(input_block, materials, total, risk_filter, chunk=None):
+    date_str = (
+        input_block.get("dateStr") or
+        input_block.get("date") or
+        datetime.datetime.utcnow().strftime("%Y-%m-%d")
+    )
+    category = input_block.get("category") or "头条"
+
+    prompt = HEADLINE_TEMPLATE.format(
+        date=date_str,
+        category=category,
+        news_items="\n".join(line for _, line in materials)
+    )
+
+    meta = {
+        "total": total,
+        "filtered": len(materials),
+        "risk_filter": risk_filter,
+    }
+    if chunk is not None:
+        meta["chunk"] = chunk
+
+    return {
+        "section": "headline",
+        "category": category,
+        "dateStr": date_str,
+        "prompt": prompt,
+        "refs": [ref for ref, _ in materials],
+        "meta": meta,
+    }
+
+
+def build_headline_prompt(input_block, risk_filter="low", start_index=1):
     """
     构建头条新闻生成 prompt
 
     Args:
         input_block: 包含 section 和 items 的新闻数据块
         risk_filter: 风险等级过滤器，"low" 或 "high"
+        start_index: 第一条素材的编号（分块生成时各块接续编号，引用全局一致）
 
     Returns:
         dict: 包含 prompt、refs 和 meta 信息，如果输入无效或无匹配新闻则返回 None
@@ -142,12 +231,6 @@ def build_headline_prompt(input_block, risk_filter="low"):
     if not input_block or input_block.get("section") != "headline":
         return None
 
-    date_str = (
-        input_block.get("dateStr") or
-        input_block.get("date") or
-        datetime.datetime.utcnow().strftime("%Y-%m-%d")
-    )
-
     all_news = input_block.get("items", [])
     risk_map = input_block.get("ds_risk_map")
 
@@ -157,34 +240,68 @@ def build_headline_prompt(input_block, risk_filter="low"):
         return None
 
     # 构造素材和引用
-    refs = []
-    news_lines = []
+    materials = [
+        _headline_material(item, n)
+        for n, item in enumerate(filtered_news, start=start_index)
+    ]
+    return _headline_prompt(input_block, materials, len(all_news), risk_filter)
 
-    for idx, item in enumerate(filtered_news, start=1):
-        title = _clean_text(item.get("title"))
-        summary = _clean_text(_extract_summary(item))
-        link = item.get("link") or ""
 
-        refs.append({"n": idx, "title": title, "url": link})
-        news_lines.append(f"【{idx}】\n标题：{title}\n摘要：{summary}\n")
+def build_headline_prompts(input_block, risk_filter="low", chunk_tokens=None):
+    """
+    按素材 token 预算把头条 prompt 拆成若干块（map-reduce 摘要的 map 阶段）
 
-    category = input_block.get("category") or "头条"
+    各块编号接续（第二块从上一块最后编号 + 1 开始），生成结果可直接按顺序拼接，
+    引用编号与合并后的 refs 一致。素材总量不超过预算时只返回一块。
 
-    prompt = HEADLINE_TEMPLATE.format(
-        date=date_str,
-        category=category,
-        news_items="\n".join(news_lines)
-    )
+    Args:
+        input_block: 包含 section 和 items 的新闻数据块
+        risk_filter: 风险等级过滤器，"low" 或 "high"
+        chunk_tokens: 每块素材的 token 预算（估算值，0 表示不分块），默认 settings.SUMMARY_CHUNK_TOKENS
 
-    return {
-        "section": "headline",
-        "category": category,
-        "dateStr": date_str,
-        "prompt": prompt,
-        "refs": refs,
-        "meta": {
-            "total": len(all_news),
-            "filtered": len(filtered_news),
-            "risk_filter": risk_filter,
-        },
-    }
+    Returns:
+        list: build_headline_prompt 格式的 dict 列表（meta 中带 chunk 序号）；无匹配新闻时为空列表
+    """
+    if not input_block or input_block.get("section") != "headline":
+        return []
+
+    chunk_tokens = settings.SUMMARY_CHUNK_TOKENS if chunk_tokens is None else chunk_tokens
+    all_news = input_block.get("items", [])
+    filtered_news = _filter_by_risk(all_news, input_block.get("ds_risk_map"), risk_filter)
+
+    chunks = []
+    current, used = [], 0
+    for n, item in enumerate(filtered_news, start=1):
+        ref, line = _headline_material(item, n)
+        cost = estimate_tokens(line)
+        if current and chunk_tokens and used + cost > chunk_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        current.append((ref, line))
+        used += cost
+    if current:
+        chunks.append(current)
+
+    return [
+        _headline_prompt(input_block, materials, len(all_news), risk_filter, chunk=i)
+        for i, materials in enumerate(chunks)
+    ]
+
+
+def build_condense_prompt(html, date_str=None, category=None):
+    """
+    构建分块摘要的压缩整合 prompt（map-reduce 摘要的可选 reduce 阶段）
+
+    Args:
+        html: 各块拼接后的 HTML
+        date_str: 日期（YYYY-MM-DD），默认当前 UTC 日期
+        category: 栏目名，默认"头条"
+
+    Returns:
+        str: prompt 文本
+    """
+    return CONDENSE_TEMPLATE.format(
+        date=date_str or datetime.datetime.utcnow().strftime("%Y-%m-%d"),
+        category=category or "头条",
+        html=html,
+    )
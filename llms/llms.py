@@ -1,29 +1,131 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
 import requests
 from google import genai
 from google.genai import types
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 from .tokens import get_deepseek_token, get_gemini_token
 from .exceptions import ContentFilteredException
 from utils.deepseek_check import check_deepseek_response
 from config import settings
+from monitoring.metrics import metrics
+from storage.llm_cache import LLMCache, cache_key
 from utils.logger import get_logger
 
 logger = get_logger("llms")
 
+# 显式指定，代码就这样了不做切换了,不认为儿子会用reasoner模型
+DEEPSEEK_MODEL = "deepseek-chat"
+
+
+# ---------- 连接建立计时：新建连接的 TCP（+ TLS）耗时计入 llm_connect_deepseek ----------
+
+def _record_connect(seconds: float, new_connection: bool = True):
+    metrics.record_timing("llm_connect_deepseek", seconds)
+    if new_connection:
+        metrics.increment_counter("llm_connections_deepseek")
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """keep-alive 连接池，新建连接时记录建连耗时"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _connect_trace():
+    """httpx 请求的 trace 回调：新建连接时记录 TCP / TLS 握手耗时（复用连接时不触发）"""
+    started = {}
+
+    async def trace(event_name, info):
+        step, _, phase = event_name.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif phase == "complete" and step in started:
+            _record_connect(
+                time.perf_counter() - started.pop(step),
+                new_connection=step == "connection.connect_tcp",
+            )
+
+    return trace
+
 
 class LLMClient:
 #openai兼容，sb儿子总不至于用A家模型吧
 
-    def __init__(self, timeout=None):
+    def __init__(self, timeout=None, cache=None):
+        """
+        Args:
+            timeout: 请求超时（秒），默认 settings.API_TIMEOUT
+            cache: LLMCache；不传时按 settings.LLM_CACHE_ENABLED 打开默认缓存，传 False 不使用缓存
+        """
         self.deepseek_api_url = settings.DEEPSEEK_API_URL
         self.timeout = timeout or settings.API_TIMEOUT
 
-        # 配置 Gemini
+        # 响应缓存：相同 provider / 模型 / prompt / 参数的请求直接重放（含风控结果）
+        if cache is None:
+            cache = LLMCache() if settings.LLM_CACHE_ENABLED else False
+        self.cache = None if cache is False else cache
+
+        # DeepSeek 同步请求的 keep-alive 连接池（避免每次请求重新 TCP + TLS 握手）
+        self.session = requests.Session()
+        adapter = _PooledAdapter(
+            pool_connections=settings.LLM_MAX_CONNECTIONS,
+            pool_maxsize=settings.LLM_MAX_CONNECTIONS,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # 配置 Gemini（同步请求用；异步请求用 _async_clients 中按事件循环创建的客户端）
         self.gemini_client = genai.Client(api_key=get_gemini_token())
 
+        # 异步资源：httpx 连接池与 genai 异步客户端，绑定创建它们的事件循环（见 _async_clients）
+        self._http = None
+        self._genai_async = None
+        self._async_loop = None
+        self._loop_guard = None
+
         logger.info(f"LLMClient 初始化完成，超时设置: {self.timeout}秒")
 
-    def request_deepseek(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999) -> str:
+    # ---------- 共用：请求构建 / 响应检查 / 错误转换 ----------
+
+    @staticmethod
+    def _deepseek_request(prompt: str, temperature: float, max_tokens, stream: bool = False) -> tuple[dict, dict]:
         if not prompt:
             raise ValueError("prompt 不能为空")
 
@@ -33,54 +135,346 @@ class LLMClient:
         }
 
         data = {
-            "model": "deepseek-chat",#显式指定，代码就这样了不做切换了,不认为儿子会用reasoner模型
+            "model": DEEPSEEK_MODEL,
             "messages": [
                 {"role": "user", "content": prompt}
             ],
             "temperature": temperature,
             "max_tokens": max_tokens,
-            "stream": False
+            "stream": stream
         }
+        return headers, data
+
+    @staticmethod
+    def _deepseek_content(result: dict, status_code: int) -> str:
+        try:
+            choice = result["choices"][0]
+            content = choice["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise RuntimeError(f"DeepSeek API 返回数据结构异常: {e}")
+
+        # 生成到一半被截断（finish_reason=content_filter）同样视为触发风控
+        if choice.get("finish_reason") == "content_filter":
+            raise ContentFilteredException("finish_reason=content_filter")
+
+        # 检查内容安全
+        check_result = check_deepseek_response(content, status_code)
+        if check_result["is_filtered"]:
+            raise ContentFilteredException(check_result["reason"])
+
+        return content
+
+    def _requests_error(self, e: requests.exceptions.RequestException) -> Exception:
+        """requests 异常转换为 RuntimeError（HTTP 400 为 ContentFilteredException）"""
+        if isinstance(e, requests.exceptions.Timeout):
+            return RuntimeError(f"DeepSeek API 请求超时 (>{self.timeout}秒)")
+        if isinstance(e, requests.exceptions.ConnectionError):
+            return RuntimeError("无法连接到 DeepSeek API")
+        if isinstance(e, requests.exceptions.HTTPError):
+            if e.response.status_code == 400:
+                return ContentFilteredException(f"HTTP 400: {str(e)}")
+            return RuntimeError(f"DeepSeek API 请求失败: {e}")
+        if isinstance(e, requests.exceptions.JSONDecodeError):
+            return RuntimeError("DeepSeek API 返回的数据格式错误")
+        return RuntimeError(f"DeepSeek API 请求错误: {e}")
+
+    def _httpx_error(self, e: httpx.HTTPError) -> Exception:
+        """_requests_error 的 httpx 版本"""
+        if isinstance(e, httpx.TimeoutException):
+            return RuntimeError(f"DeepSeek API 请求超时 (>{self.timeout}秒)")
+        if isinstance(e, httpx.ConnectError):
+            return RuntimeError("无法连接到 DeepSeek API")
+        if isinstance(e, httpx.HTTPStatusError):
+            if e.response.status_code == 400:
+                return ContentFilteredException(f"HTTP 400: {str(e)}")
+            return RuntimeError(f"DeepSeek API 请求失败: {e}")
+        return RuntimeError(f"DeepSeek API 请求错误: {e}")
+
+    def _gemini_error(self, e: Exception) -> RuntimeError:
+        error_msg = str(e)
+
+        # 处理常见错误类型
+        if "timeout" in error_msg.lower():
+            return RuntimeError(f"Gemini API 请求超时 (>{self.timeout}秒)")
+        elif "connection" in error_msg.lower():
+            return RuntimeError("无法连接到 Gemini API")
+        elif "api key" in error_msg.lower() or "authentication" in error_msg.lower():
+            return RuntimeError("Gemini API 认证失败，请检查 API Key")
+        else:
+            return RuntimeError(f"Gemini API 请求错误: {error_msg}")
+
+    # ---------- 共用：流式解析 / 风控检测 / 计时 ----------
+
+    @staticmethod
+    def _is_sse(response) -> bool:
+        return response.headers.get("content-type", "").startswith("text/event-stream")
+
+    @staticmethod
+    def _sse_delta(line: str):
+        """
+        解析一行 DeepSeek SSE，返回增量文本（keep-alive 等无文本的行为 ""），流结束返回 None
+
+        finish_reason 为 content_filter 时立即抛出 ContentFilteredException
+        """
+        if not line or not line.startswith("data:"):
+            return ""
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return None
+        try:
+            choice = json.loads(payload)["choices"][0]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise RuntimeError(f"DeepSeek 流式数据结构异常: {e}")
+
+        if choice.get("finish_reason") == "content_filter":
+            raise ContentFilteredException("finish_reason=content_filter")
+        return (choice.get("delta") or {}).get("content") or ""
+
+    @staticmethod
+    def _watch_stream(provider: str, pieces, require_content: bool = False):
+        """
+        转发流式文本块，记录首个文本块耗时（llm_ttft_<provider>）与总耗时（llm_total_<provider>）
+
+        require_content: 开头的空白块先缓存不转发；整个流没有非空白内容时抛出 ContentFilteredException，
+            这样触发风控的响应不会有任何内容流到下游，fallback 可以立即开始
+        """
+        start = time.perf_counter()
+        pending = ""
+        started = False
+        for piece in pieces:
+            if not started:
+                pending += piece
+                if require_content and not pending.strip():
+                    continue
+                started = True
+                metrics.record_timing(f"llm_ttft_{provider}", time.perf_counter() - start)
+                piece = pending
+            yield piece
 
+        metrics.record_timing(f"llm_total_{provider}", time.perf_counter() - start)
+        metrics.increment_counter(f"llm_stream_{provider}")
+        if require_content and not started:
+            raise ContentFilteredException("响应文本为空")
+
+    @staticmethod
+    async def _awatch_stream(provider: str, pieces, require_content: bool = False):
+        """_watch_stream 的异步版本（pieces 为异步迭代器）"""
+        start = time.perf_counter()
+        pending = ""
+        started = False
+        async for piece in pieces:
+            if not started:
+                pending += piece
+                if require_content and not pending.strip():
+                    continue
+                started = True
+                metrics.record_timing(f"llm_ttft_{provider}", time.perf_counter() - start)
+                piece = pending
+            yield piece
+
+        metrics.record_timing(f"llm_total_{provider}", time.perf_counter() - start)
+        metrics.increment_counter(f"llm_stream_{provider}")
+        if require_content and not started:
+            raise ContentFilteredException("响应文本为空")
+
+    # ---------- 共用：响应缓存 ----------
+
+    def _cache_lookup(self, provider: str, model, prompt: str, temperature, max_tokens):
+        """返回 (缓存键, 载荷)；未启用缓存或未命中时载荷为 None"""
+        if self.cache is None:
+            return None, None
+        key = cache_key(provider, model, prompt, temperature=temperature, max_tokens=max_tokens)
+        return key, self.cache.get(key, provider)
+
+    def _cache_store(self, key, provider: str, model, payload: dict):
+        if self.cache is not None and key is not None:
+            self.cache.put(key, provider, model, payload)
+
+    @staticmethod
+    def _replay(payload: dict) -> str:
+        """缓存的单次请求结果：风控结果重新抛出异常，否则返回内容"""
+        if "filtered" in payload:
+            raise ContentFilteredException(payload["filtered"])
+        return payload["content"]
+
+    def _cached_call(self, provider: str, model, prompt: str, temperature, max_tokens, call):
+        """经缓存执行同步请求 call()；正常响应与风控结果都写入缓存，其他错误不缓存"""
+        key, cached = self._cache_lookup(provider, model, prompt, temperature, max_tokens)
+        if cached is not None:
+            return self._replay(cached)
+        try:
+            content = call()
+        except ContentFilteredException as e:
+            self._cache_store(key, provider, model, {"filtered": e.reason})
+            raise
+        self._cache_store(key, provider, model, {"content": content})
+        return content
+
+    async def _acached_call(self, provider: str, model, prompt: str, temperature, max_tokens, call):
+        """_cached_call 的异步版本（call 返回协程）"""
+        key, cached = self._cache_lookup(provider, model, prompt, temperature, max_tokens)
+        if cached is not None:
+            return self._replay(cached)
+        try:
+            content = await call()
+        except ContentFilteredException as e:
+            self._cache_store(key, provider, model, {"filtered": e.reason})
+            raise
+        self._cache_store(key, provider, model, {"content": content})
+        return content
+
+    def _cached_stream(self, provider: str, model, prompt: str, temperature, max_tokens, open_stream):
+        """经缓存执行流式请求：命中时整段产出一次；流正常结束或触发风控时写入缓存"""
+        key, cached = self._cache_lookup(provider, model, prompt, temperature, max_tokens)
+        if cached is not None:
+            yield self._replay(cached)
+            return
+        parts = []
         try:
-            response = requests.post(self.deepseek_api_url, headers=headers, json=data, timeout=self.timeout)
+            for piece in open_stream():
+                parts.append(piece)
+                yield piece
+        except ContentFilteredException as e:
+            self._cache_store(key, provider, model, {"filtered": e.reason})
+            raise
+        self._cache_store(key, provider, model, {"content": "".join(parts)})
+
+    async def _acached_stream(self, provider: str, model, prompt: str, temperature, max_tokens, open_stream):
+        """_cached_stream 的异步版本（open_stream 返回异步迭代器）"""
+        key, cached = self._cache_lookup(provider, model, prompt, temperature, max_tokens)
+        if cached is not None:
+            yield self._replay(cached)
+            return
+        parts = []
+        try:
+            async for piece in open_stream():
+                parts.append(piece)
+                yield piece
+        except ContentFilteredException as e:
+            self._cache_store(key, provider, model, {"filtered": e.reason})
+            raise
+        self._cache_store(key, provider, model, {"content": "".join(parts)})
+
+    @staticmethod
+    def _fallback_plan(primary: str) -> str:
+        if primary not in ["deepseek", "gemini"]:
+            raise ValueError(f"primary 必须是 'deepseek' 或 'gemini'，当前值: {primary}")
+        return "gemini" if primary == "deepseek" else "deepseek"
+
+    @staticmethod
+    def _fallback_model(primary: str, fallback_name: str) -> str:
+        """fallback 结果的缓存模型名：主模型与备用模型任一更换都不会命中旧结果"""
+        models = {"deepseek": DEEPSEEK_MODEL, "gemini": settings.GEMINI_MODEL}
+        return f"{models[primary]}->{models[fallback_name]}"
+
+    # ---------- 同步 API ----------
+
+    def request_deepseek(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999) -> str:
+        headers, data = self._deepseek_request(prompt, temperature, max_tokens, stream=settings.LLM_STREAM)
+        return self._cached_call(
+            "deepseek", data["model"], prompt, temperature, max_tokens,
+            lambda: self._post_deepseek(headers, data),
+        )
+
+    def stream_deepseek(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999):
+        """
+        流式请求 DeepSeek（SSE），逐块产出文本
+
+        触发风控（HTTP 400、finish_reason=content_filter、无任何内容）时抛出 ContentFilteredException；
+        前两种在收到响应头 / 对应数据块时立即抛出，空响应在流结束时抛出，且此前不会产出任何内容
+        """
+        headers, data = self._deepseek_request(prompt, temperature, max_tokens, stream=True)
+        yield from self._cached_stream(
+            "deepseek", data["model"], prompt, temperature, max_tokens,
+            lambda: self._stream_post_deepseek(headers, data),
+        )
+
+    def _post_deepseek(self, headers: dict, data: dict) -> str:
+        if data.get("stream"):
+            return "".join(self._stream_post_deepseek(headers, data))
+
+        try:
+            response = self.session.post(self.deepseek_api_url, headers=headers, json=data, timeout=self.timeout)
 
             # 检查 HTTP 400 状态码
             if response.status_code == 400:
                 raise ContentFilteredException("HTTP 400 状态码")
 
             response.raise_for_status()
-            result = response.json()
-            content = result["choices"][0]["message"]["content"]
+            return self._deepseek_content(response.json(), response.status_code)
 
-            # 检查内容安全
-            check_result = check_deepseek_response(content, response.status_code)
-            if check_result["is_filtered"]:
-                raise ContentFilteredException(check_result["reason"])
+        except (ContentFilteredException, RuntimeError):
+            raise
+        except requests.exceptions.RequestException as e:
+            raise self._requests_error(e)
 
-            return content
+    def _stream_post_deepseek(self, headers: dict, data: dict):
+        return self._watch_stream("deepseek", self._iter_deepseek_sse(headers, data), require_content=True)
+
+    def _iter_deepseek_sse(self, headers: dict, data: dict):
+        try:
+            with self.session.post(
+                self.deepseek_api_url, headers=headers, json=data, timeout=self.timeout, stream=True
+            ) as response:
+                if response.status_code == 400:
+                    raise ContentFilteredException("HTTP 400 状态码")
+                response.raise_for_status()
 
-        except ContentFilteredException:
+                # 服务端忽略 stream 参数时按普通响应处理
+                if not self._is_sse(response):
+                    yield self._deepseek_content(response.json(), response.status_code)
+                    return
+
+                for line in response.iter_lines(decode_unicode=True):
+                    piece = self._sse_delta(line)
+                    if piece is None:
+                        break
+                    if piece:
+                        yield piece
+
+        except (ContentFilteredException, RuntimeError):
             raise
-        except requests.exceptions.Timeout:
-            raise RuntimeError(f"DeepSeek API 请求超时 (>{self.timeout}秒)")
-        except requests.exceptions.ConnectionError:
-            raise RuntimeError("无法连接到 DeepSeek API")
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 400:
-                raise ContentFilteredException(f"HTTP 400: {str(e)}")
-            raise RuntimeError(f"DeepSeek API 请求失败: {e}")
-        except requests.exceptions.JSONDecodeError:
-            raise RuntimeError("DeepSeek API 返回的数据格式错误")
-        except (KeyError, IndexError) as e:
-            raise RuntimeError(f"DeepSeek API 返回数据结构异常: {e}")
         except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"DeepSeek API 请求错误: {e}")
+            raise self._requests_error(e)
 
     def request_gemini(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999) -> str:
         if not prompt:
             raise ValueError("prompt 不能为空")
 
+        return self._cached_call(
+            "gemini", settings.GEMINI_MODEL, prompt, temperature, max_tokens,
+            lambda: self._generate_gemini(prompt),
+        )
+
+    def stream_gemini(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999):
+        """流式请求 Gemini（generate_content_stream），逐块产出文本"""
+        if not prompt:
+            raise ValueError("prompt 不能为空")
+
+        yield from self._cached_stream(
+            "gemini", settings.GEMINI_MODEL, prompt, temperature, max_tokens,
+            lambda: self._stream_gemini(prompt),
+        )
+
+    def _stream_gemini(self, prompt: str):
+        return self._watch_stream("gemini", self._iter_gemini_stream(prompt))
+
+    def _iter_gemini_stream(self, prompt: str):
+        try:
+            for chunk in self.gemini_client.models.generate_content_stream(
+                model=settings.GEMINI_MODEL,
+                contents=prompt,
+            ):
+                if chunk.text:
+                    yield chunk.text
+
+        except Exception as e:
+            raise self._gemini_error(e)
+
+    def _generate_gemini(self, prompt: str) -> str:
+        if settings.LLM_STREAM:
+            return "".join(self._stream_gemini(prompt))
+
         try:
             # 生成内容
             response = self.gemini_client.models.generate_content(
@@ -91,17 +485,7 @@ class LLMClient:
             return response.text
 
         except Exception as e:
-            error_msg = str(e)
-
-            # 处理常见错误类型
-            if "timeout" in error_msg.lower():
-                raise RuntimeError(f"Gemini API 请求超时 (>{self.timeout}秒)")
-            elif "connection" in error_msg.lower():
-                raise RuntimeError("无法连接到 Gemini API")
-            elif "api key" in error_msg.lower() or "authentication" in error_msg.lower():
-                raise RuntimeError("Gemini API 认证失败，请检查 API Key")
-            else:
-                raise RuntimeError(f"Gemini API 请求错误: {error_msg}")
+            raise self._gemini_error(e)
 
     def request_with_fallback(self, prompt: str, temperature: float = 0.7, max_tokens: int = 2000, primary: str = "deepseek"):
         """
@@ -126,18 +510,22 @@ class LLMClient:
             ValueError: 参数错误
             RuntimeError: 两个模型都失败时抛出
         """
-        if primary not in ["deepseek", "gemini"]:
-            raise ValueError(f"primary 必须是 'deepseek' 或 'gemini'，当前值: {primary}")
-
         # 确定主模型和备用模型
-        if primary == "deepseek":
-            primary_func = self.request_deepseek
-            fallback_func = self.request_gemini
-            fallback_name = "gemini"
-        else:
-            primary_func = self.request_gemini
-            fallback_func = self.request_deepseek
-            fallback_name = "deepseek"
+        fallback_name = self._fallback_plan(primary)
+
+        # 整个 fallback 结果（含使用的模型与风控原因）按 prompt 缓存，重放时不发请求
+        model = self._fallback_model(primary, fallback_name)
+        key, cached = self._cache_lookup(f"fallback_{primary}", model, prompt, temperature, max_tokens)
+        if cached is not None:
+            return cached
+        result = self._request_with_fallback(prompt, temperature, max_tokens, primary, fallback_name)
+        self._cache_store(key, f"fallback_{primary}", model, result)
+        return result
+
+    def _request_with_fallback(self, prompt, temperature, max_tokens, primary, fallback_name):
+        funcs = {"deepseek": self.request_deepseek, "gemini": self.request_gemini}
+        primary_func = funcs[primary]
+        fallback_func = funcs[fallback_name]
 
         # 尝试主模型
         try:
@@ -150,8 +538,7 @@ class LLMClient:
             }
         except ContentFilteredException as e:
             # 主模型触发风控，fallback 到备用模型
-            print(f"⚠ {primary} 触发内容安全机制: {e.reason}")
-            print(f"→ 自动切换到 {fallback_name}")
+            logger.warning(f"{primary} 触发内容安全机制: {e.reason}，自动切换到 {fallback_name}")
 
             try:
                 content = fallback_func(prompt, temperature, max_tokens)
@@ -164,4 +551,284 @@ class LLMClient:
             except Exception as fallback_error:
                 raise RuntimeError(
                     f"{primary} 触发风控，{fallback_name} 也失败了: {fallback_error}"
-                )
\ No newline at end of file
+                )
+
+    # ---------- 异步 API ----------
+
+    async def _async_clients(self):
+        """
+        当前事件循环上的 (httpx.AsyncClient, genai 异步客户端)，同一事件循环内复用连接池
+
+        二者的连接都不能跨事件循环使用：创建时在事件循环上挂一个守卫（见 _release_on_loop_shutdown），
+        asyncio.run 结束前自动释放；也可以在运行结束时显式调用 aclose()
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            if self._http is not None:
+                # 上一个事件循环没有走 asyncio.run 的收尾（也没有调用 aclose()）：尽力关闭旧资源
+                logger.warning("事件循环已更换但旧的异步连接未释放（请在运行结束时调用 aclose()），尝试关闭")
+                await self.aclose()
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                ),
+            )
+            self._genai_async = genai.Client(api_key=get_gemini_token())
+            self._async_loop = loop
+            self._loop_guard = self._release_on_loop_shutdown(loop)
+            await self._loop_guard.__anext__()
+        return self._http, self._genai_async.aio
+
+    async def _async_http(self) -> httpx.AsyncClient:
+        return (await self._async_clients())[0]
+
+    async def _gemini_aio(self):
+        return (await self._async_clients())[1]
+
+    async def _release_on_loop_shutdown(self, loop):
+        """
+        挂起在 yield 处的异步生成器，事件循环会登记它；asyncio.run 关闭事件循环前
+        （shutdown_asyncgens）会 aclose 它，此时在 finally 中释放该循环上的异步资源
+        """
+        try:
+            yield
+        finally:
+            if self._async_loop is loop:
+                self._loop_guard = None
+                await self._close_async(*self._detach_async())
+
+    def _detach_async(self):
+        """摘下当前的异步资源，返回 (httpx 客户端, genai 客户端)"""
+        stale = (self._http, self._genai_async)
+        self._http = self._genai_async = self._async_loop = None
+        return stale
+
+    @staticmethod
+    async def _close_async(http, genai_client):
+        """关闭一组异步资源（所属事件循环已关闭时关闭可能失败，忽略即可）"""
+        if http is not None:
+            try:
+                await http.aclose()
+            except Exception as e:
+                logger.debug(f"关闭 httpx 连接池失败（忽略）: {e}")
+        if genai_client is not None:
+            try:
+                await genai_client.aio.aclose()
+            except Exception as e:
+                logger.debug(f"关闭 Gemini 异步客户端失败（忽略）: {e}")
+            genai_client.close()
+
+    def close(self):
+        """关闭同步连接池"""
+        self.session.close()
+
+    async def aclose(self):
+        """
+        释放全部异步资源（httpx 连接池与 genai 异步客户端，在创建它们的事件循环中调用）
+
+        之后再调用异步方法时按当时的事件循环重新创建
+        """
+        stale = self._detach_async()
+        guard, self._loop_guard = self._loop_guard, None
+        if guard is not None:
+            await guard.aclose()
+        await self._close_async(*stale)
+
+    async def arequest_deepseek(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999) -> str:
+        """request_deepseek 的异步版本（异常语义与缓存行为相同）"""
+        headers, data = self._deepseek_request(prompt, temperature, max_tokens, stream=settings.LLM_STREAM)
+        return await self._acached_call(
+            "deepseek", data["model"], prompt, temperature, max_tokens,
+            lambda: self._apost_deepseek(headers, data),
+        )
+
+    async def astream_deepseek(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999):
+        """stream_deepseek 的异步版本"""
+        headers, data = self._deepseek_request(prompt, temperature, max_tokens, stream=True)
+        async for piece in self._acached_stream(
+            "deepseek", data["model"], prompt, temperature, max_tokens,
+            lambda: self._astream_post_deepseek(headers, data),
+        ):
+            yield piece
+
+    async def _apost_deepseek(self, headers: dict, data: dict) -> str:
+        if data.get("stream"):
+            return "".join([piece async for piece in self._astream_post_deepseek(headers, data)])
+
+        try:
+            http = await self._async_http()
+            response = await http.post(
+                self.deepseek_api_url, headers=headers, json=data, extensions={"trace": _connect_trace()}
+            )
+
+            # 检查 HTTP 400 状态码
+            if response.status_code == 400:
+                raise ContentFilteredException("HTTP 400 状态码")
+
+            response.raise_for_status()
+            return self._deepseek_content(response.json(), response.status_code)
+
+        except (ContentFilteredException, RuntimeError):
+            raise
+        except json.JSONDecodeError:
+            raise RuntimeError("DeepSeek API 返回的数据格式错误")
+        except httpx.HTTPError as e:
+            raise self._httpx_error(e)
+
+    def _astream_post_deepseek(self, headers: dict, data: dict):
+        return self._awatch_stream("deepseek", self._aiter_deepseek_sse(headers, data), require_content=True)
+
+    async def _aiter_deepseek_sse(self, headers: dict, data: dict):
+        try:
+            http = await self._async_http()
+            async with http.stream(
+                "POST", self.deepseek_api_url, headers=headers, json=data,
+                extensions={"trace": _connect_trace()},
+            ) as response:
+                if response.status_code == 400:
+                    raise ContentFilteredException("HTTP 400 状态码")
+                response.raise_for_status()
+
+                # 服务端忽略 stream 参数时按普通响应处理
+                if not self._is_sse(response):
+                    await response.aread()
+                    yield self._deepseek_content(response.json(), response.status_code)
+                    return
+
+                async for line in response.aiter_lines():
+                    piece = self._sse_delta(line)
+                    if piece is None:
+                        break
+                    if piece:
+                        yield piece
+
+        except (ContentFilteredException, RuntimeError):
+            raise
+        except json.JSONDecodeError:
+            raise RuntimeError("DeepSeek API 返回的数据格式错误")
+        except httpx.HTTPError as e:
+            raise self._httpx_error(e)
+
+    async def arequest_gemini(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999) -> str:
+        """request_gemini 的异步版本（genai 的 client.aio）"""
+        if not prompt:
+            raise ValueError("prompt 不能为空")
+
+        return await self._acached_call(
+            "gemini", settings.GEMINI_MODEL, prompt, temperature, max_tokens,
+            lambda: self._agenerate_gemini(prompt),
+        )
+
+    async def astream_gemini(self, prompt: str, temperature: float = 0.7, max_tokens = 999999999):
+        """stream_gemini 的异步版本（genai 的 client.aio）"""
+        if not prompt:
+            raise ValueError("prompt 不能为空")
+
+        async for piece in self._acached_stream(
+            "gemini", settings.GEMINI_MODEL, prompt, temperature, max_tokens,
+            lambda: self._astream_gemini(prompt),
+        ):
+            yield piece
+
+    def _astream_gemini(self, prompt: str):
+        return self._awatch_stream("gemini", self._aiter_gemini_stream(prompt))
+
+    async def _aiter_gemini_stream(self, prompt: str):
+        try:
+            aio = await self._gemini_aio()
+            stream = await aio.models.generate_content_stream(
+                model=settings.GEMINI_MODEL,
+                contents=prompt,
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+
+        except Exception as e:
+            raise self._gemini_error(e)
+
+    async def _agenerate_gemini(self, prompt: str) -> str:
+        if settings.LLM_STREAM:
+            return "".join([piece async for piece in self._astream_gemini(prompt)])
+
+        try:
+            aio = await self._gemini_aio()
+            response = await aio.models.generate_content(
+                model=settings.GEMINI_MODEL,
+                contents=prompt,
+            )
+
+            return response.text
+
+        except Exception as e:
+            raise self._gemini_error(e)
+
+    async def arequest_with_fallback(self, prompt: str, temperature: float = 0.7, max_tokens: int = 2000, primary: str = "deepseek"):
+        """request_with_fallback 的异步版本（返回结构、异常语义与缓存行为相同）"""
+        fallback_name = self._fallback_plan(primary)
+
+        model = self._fallback_model(primary, fallback_name)
+        key, cached = self._cache_lookup(f"fallback_{primary}", model, prompt, temperature, max_tokens)
+        if cached is not None:
+            return cached
+        result = await self._arequest_with_fallback(prompt, temperature, max_tokens, primary, fallback_name)
+        self._cache_store(key, f"fallback_{primary}", model, result)
+        return result
+
+    async def _arequest_with_fallback(self, prompt, temperature, max_tokens, primary, fallback_name):
+        funcs = {"deepseek": self.arequest_deepseek, "gemini": self.arequest_gemini}
+
+        try:
+            content = await funcs[primary](prompt, temperature, max_tokens)
+            return {
+                "content": content,
+                "model_used": primary,
+                "is_fallback": False,
+                "filter_reason": None
+            }
+        except ContentFilteredException as e:
+            logger.warning(f"{primary} 触发内容安全机制: {e.reason}，自动切换到 {fallback_name}")
+
+            try:
+                content = await funcs[fallback_name](prompt, temperature, max_tokens)
+                return {
+                    "content": content,
+                    "model_used": fallback_name,
+                    "is_fallback": True,
+                    "filter_reason": e.reason
+                }
+            except Exception as fallback_error:
+                raise RuntimeError(
+                    f"{primary} 触发风控，{fallback_name} 也失败了: {fallback_error}"
+                )
+
+
+# ---------- 进程内共享实例 ----------
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(timeout=None) -> LLMClient:
+    """
+    进程内共享的 LLMClient（按超时区分）
+
+    同步的 DeepSeek 连接池、Gemini 客户端与响应缓存只创建一次，各分类、各工作流复用同一实例；
+    异步连接（httpx 连接池、genai 异步客户端）按事件循环创建，每次运行结束时由 aclose() 释放
+    """
+    timeout = timeout or settings.API_TIMEOUT
+    with _clients_lock:
+        client = _clients.get(timeout)
+        if client is None:
+            client = _clients[timeout] = LLMClient(timeout=timeout)
+        return client
+
+
+def reset_llm_clients():
+    """关闭并清空共享实例（token / 配置变更后重新创建）"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
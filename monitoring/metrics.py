@@ -16,6 +16,7 @@ class MetricsCollector:
     def __init__(self):
         self.metrics = defaultdict(list)
         self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
         self.start_time = datetime.now()
 
     def record_event(self, event_type: str, data: Dict[str, Any] = None):
@@ -45,6 +46,16 @@ class MetricsCollector:
         self.counters[counter_name] += value
         logger.debug(f"计数器 {counter_name}: {self.counters[counter_name]}")
 
+    def record_timing(self, timer_name: str, seconds: float):
+        """
+        累加耗时
+
+        Args:
+            timer_name: 计时器名称
+            seconds: 本次耗时（秒）
+        """
+        self.timings[timer_name] += seconds
+
     def record_fallback(self, reason: str, primary_model: str, fallback_model: str):
         """
         记录 fallback 事件
@@ -118,6 +129,7 @@ class MetricsCollector:
         return {
             "runtime_seconds": runtime,
             "counters": dict(self.counters),
+            "timings": dict(self.timings),
             "fallback_rate": fallback_rate,
             "total_events": sum(len(events) for events in self.metrics.values()),
             "event_types": list(self.metrics.keys())
@@ -136,6 +148,10 @@ class MetricsCollector:
         logger.info("\n计数器:")
         for name, value in sorted(summary['counters'].items()):
             logger.info(f"  {name}: {value}")
+        if summary['timings']:
+            logger.info("\n累计耗时:")
+            for name, value in sorted(summary['timings'].items()):
+                logger.info(f"  {name}: {value:.4f} 秒")
         logger.info("=" * 60)
 
 
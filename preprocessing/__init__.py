@@ -3,7 +3,8 @@
 """
 
 from .filters import filter_ru
-from .dedupe import dedupe_items
+from .dedupe import dedupe_items, near_dedupe_items
 from .classify import Classify
+from .news_item import NewsItem, as_news_item
 
-__all__ = ["filter_ru", "dedupe_items", "Classify"]
+__all__ = ["filter_ru", "dedupe_items", "near_dedupe_items", "Classify", "NewsItem", "as_news_item"]
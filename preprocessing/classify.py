@@ -1,4 +1,8 @@
-import re
+from .news_item import as_news_item
+from .rules import get_rule_engine
+
+# 分类优先级：头条 > 政治 > 财经 > 科技 > 国际（具体规则见 config/classify_rules.toml）
+CATEGORIES = ["头条", "政治", "财经", "科技", "国际"]
 
 
 class Classify:
@@ -9,71 +13,27 @@ class Classify:
     支持5个类别：头条、政治、财经、科技、国际
     """
 
-    def __init__(self, category):
+    def __init__(self, category, engine=None):
         """
         Args:
             category: 要提取的类别（头条/政治/财经/科技/国际）
+            engine: 使用的规则引擎，默认在创建时取一次 get_rule_engine()（规则文件热加载只在此时检查，
+                同一分类器处理的条目始终使用同一套规则）
         """
         self.category = category
+        self.engine = engine or get_rule_engine()
 
     def _is_hard_excluded(self, item):
         """
         硬排除：娱乐、体育、节目等明确不要的内容
 
+        Args:
+            item: NewsItem 或原始 greader 条目
+
         Returns:
             bool: True表示应该完全排除
         """
-        title = (item.get("title") or "").lower()
-        src = (item.get("origin", {}).get("title") or "").lower()
-        link = (
-            item.get("canonical", [{}])[0].get("href") or
-            item.get("alternate", [{}])[0].get("href") or
-            item.get("link") or ""
-        ).lower()
-
-        # 收集所有文本
-        text_parts = [
-            title,
-            item.get("summaryText", ""),
-            item.get("summary", {}).get("content", "") if isinstance(item.get("summary"), dict) else "",
-            str(item.get("summary", "")),
-            link
-        ]
-        full_text = " ".join(str(p) for p in text_parts if p).lower()
-
-        # 硬排除关键词：娱乐、体育、节目
-        hard_exclude = [
-            # 节目/预告
-            "sneak peek", "preview", "episode", "season",
-            # 体育
-            "super bowl", "nfl", "olympic", "world cup",
-            "beat ", "wins ", "defeats ", "athlete",
-            "curling", "skating",
-            # 娱乐
-            "music", "singer", "band", "album", "song",
-            "eagles", "henley",
-            # 展览/宠物
-            "dog show", "kennel", "show where", "wins gold",
-            # 电视栏目
-            "60 minutes", "48 hours",
-            "face the nation", "sunday morning",
-            "the takeout", "weekend news",
-            "almanac", "passage:",
-        ]
-
-        if any(kw in full_text for kw in hard_exclude):
-            return True
-
-        # CBS视频和文字稿
-        if "cbsnews.com/video/" in link or "60-minutes-transcript" in link:
-            return True
-
-        # 美媒节目型标题（日期前缀）
-        if ("cbs" in src or "bbc" in src):
-            if re.match(r"^\d{1,2}/\d{1,2}", title) or re.match(r"^\d{4}:\s", title):
-                return True
-
-        return False
+        return self.engine.is_excluded(as_news_item(item))
 
     def _is_soft_content(self, item):
         """
@@ -82,29 +42,7 @@ class Classify:
         Returns:
             bool: True表示是软内容
         """
-        title = (item.get("title") or "").lower()
-        src = (item.get("origin", {}).get("title") or "").lower()
-
-        # 软内容关键词
-        soft_keywords = [
-            "video", "interview", "transcript",
-            "nature", "art", "museum", "culture",
-            "review", "book", "film", "celebrity", "entertainment"
-        ]
-
-        if any(kw in title for kw in soft_keywords):
-            return True
-
-        # BBC软内容栏目
-        if "bbc" in src and any(kw in title for kw in ["culture", "future", "travel", "worklife"]):
-            return True
-
-        # 美媒娱乐/生活
-        if any(s in src for s in ["cbs", "nbc", "abc"]):
-            if any(kw in title for kw in ["celebrity", "sports", "entertainment"]):
-                return True
-
-        return False
+        return self.engine.is_soft(as_news_item(item))
 
     def _classify_item(self, item):
         """
@@ -115,104 +53,93 @@ class Classify:
         Returns:
             str: 类别名称
         """
-        title = (item.get("title") or "").lower()
-        src = (item.get("origin", {}).get("title") or "").lower()
-        categories = item.get("categories", [])
-        cats = " ".join(str(c).lower() for c in categories)
-
-        # 1. 头条：来源标记为top 且 不是软内容
-        if ("top" in src or "top" in cats or "头条" in src or "头条" in cats) and not self._is_soft_content(item):
-            return "头条"
-
-        # 2. 政治
-        political_keywords = [
-            "election", "vote", "parliament", "government",
-            "president", "prime minister", "policy", "sanction",
-            "cabinet", "congress", "senate", "politic",
-            "选举", "政府", "总统", "议会", "内阁", "制裁"
-        ]
-        if (any(kw in title for kw in political_keywords) or
-            "politics" in src or "politica" in src):
-            return "政治"
-
-        # 3. 财经
-        econ_keywords = [
-            "economy", "economic", "market", "stock",
-            "inflation", "bank", "finance", "business",
-            "economia", "borsa", "mercato",
-            "经济", "股市", "通胀", "银行"
-        ]
-        if (any(kw in title for kw in econ_keywords) or
-            "business" in src or "economia" in src):
-            return "财经"
-
-        # 4. 科技
-        tech_keywords = [
-            "tech", "technology", "ai", "artificial intelligence",
-            "software", "chip", "science", "scienza",
-            "科技", "人工智能", "半导体"
-        ]
-        if (any(kw in title for kw in tech_keywords) or
-            "tech" in src or "science" in src or "scienza" in src):
-            return "科技"
-
-        # 5. 国际（兜底）
-        return "国际"
+        return self.engine.categorize(as_news_item(item))
 
-    def _process_headlines(self, raw_items):
+    def classify_one(self, item):
         """
-        处理新闻：硬排除 → 分类 → 筛选
+        单条新闻的最终类别：无标题或被硬排除时返回 None
 
         Args:
-            raw_items: 原始新闻列表
+            item: NewsItem 或原始 greader 条目
 
         Returns:
-            dict: {"section": "headline", "items": [...]}
+            str | None: 类别名称
         """
-        result = []
+        item = as_news_item(item)
+
+        # 跳过无标题
+        if not item.title:
+            return None
+
+        # 硬排除（娱乐、体育、节目等）+ 分类，共用同一次字段扫描
+        return self.engine.evaluate(item)
+
+    @staticmethod
+    def _to_result(item, n):
+        """构建输出条目（链接、摘要、来源已在 NewsItem 中提取好）"""
+        result = {
+            "id": f"H{n}",
+            "title": item.title,
+            "summary": item.summary,
+            "link": item.link,
+            "source": item.source,
+            "published": item.published,
+            "item_id": item.id,
+        }
+        if item.alternates:
+            result["alternates"] = list(item.alternates)
+        return result
 
-        for item in raw_items:
-            # 跳过无标题
-            if not item.get("title"):
-                continue
+    @classmethod
+    def partition(cls, raw_items, categories=None, labels=None, engine=None):
+        """
+        单次遍历完成所有类别的划分：每条新闻只做一次硬排除与分类
 
-            # 第一步：硬排除（娱乐、体育、节目等）
-            if self._is_hard_excluded(item):
-                continue
+        各类别内编号规则与 _process_headlines 相同（H1、H2 ... 按原顺序）
 
-            # 第二步：分类
-            item_category = self._classify_item(item)
+        Args:
+            raw_items: 新闻可迭代对象（NewsItem 或原始 greader 条目）
+            categories: 需要输出的类别，默认全部 5 类
+            labels: 预先算好的类别（与 raw_items 一一对应，如并行预处理的结果），传入时不再重新分类
+            engine: 使用的规则引擎，默认取一次 get_rule_engine()
 
-            # 第三步：筛选目标类别
-            if item_category != self.category:
+        Returns:
+            dict: {类别: {"section": "headline", "items": [...]}}，按 categories 顺序
+        """
+        categories = list(categories or CATEGORIES)
+        buckets = {cat: [] for cat in categories}
+        # raw_items 可以是生成器（见 preprocessing.stages），只遍历一次
+        items = map(as_news_item, raw_items)
+        # 整个批次只取一次规则引擎：热加载不会在批次中途替换规则
+        engine = engine or get_rule_engine()
+        if labels is None:
+            classifier = cls(category=None, engine=engine)
+            pairs = ((item, classifier.classify_one(item)) for item in items)
+        else:
+            pairs = zip(items, labels, strict=True)
+
+        for item, label in pairs:
+            bucket = buckets.get(label)
+            if bucket is None:
                 continue
+            bucket.append(cls._to_result(item, len(bucket) + 1))
 
-            # 提取链接
-            link = (
-                item.get("canonical", [{}])[0].get("href") or
-                item.get("alternate", [{}])[0].get("href") or
-                item.get("link") or ""
-            )
-
-            # 提取摘要
-            summary = item.get("summaryText")
-            if not summary:
-                if isinstance(item.get("summary"), dict):
-                    summary = item.get("summary", {}).get("content", "")
-                else:
-                    summary = item.get("summary", "")
-
-            # 构建结果
-            result.append({
-                "id": f"H{len(result) + 1}",
-                "title": item["title"],
-                "summary": summary or "",
-                "link": link,
-                "source": item.get("origin", {}).get("title") or item.get("source") or "",
-                "published": item.get("published"),
-            })
+        if labels is None:
+            engine.flush_metrics()
 
         return {
-            "section": "headline",
-            "items": result,
+            cat: {"section": "headline", "items": items}
+            for cat, items in buckets.items()
         }
+
+    def _process_headlines(self, raw_items):
+        """
+        处理新闻：硬排除 → 分类 → 筛选
+
+        Args:
+            raw_items: 新闻列表（NewsItem 或原始 greader 条目）
+
+        Returns:
+            dict: {"section": "headline", "items": [...]}
+        """
+        return self.partition(raw_items, [self.category], engine=self.engine)[self.category]
@@ -0,0 +1,167 @@
+"""
+同一分类内的报道聚类（TF-IDF + 余弦相似度）
+
+分类之后、风险评估之前，把同一事件的多角度报道合并为一条：代表条目保留标题与摘要，
+其余条目放入 members，构建标题 prompt 时作为"相关报道"列出并保留各自的引用链接。
+
+TF-IDF 向量为稀疏 dict，两两相似度通过倒排索引一次性累加（稀疏矩阵 X·Xᵀ），
+只计算至少共享一个词的条目对。
+"""
+
+import math
+import re
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+logger = get_logger("preprocessing.cluster")
+
+# 英文按词、中文按连续汉字串切分（汉字串再切成二元组）
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+_STOPWORDS = frozenset(
+    "a an the and or of to in on at for from by with as is are was were be been has have had "
+    "it its this that these those after over into about than says said will would new not no "
+    "but up out more he she they we you his her their our".split()
+)
+
+# 标题在向量中的权重倍数（标题比摘要更能代表事件）
+_TITLE_WEIGHT = 2
+
+
+def _tokens(text: str) -> list[str]:
+    out = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token.isascii():
+            if len(token) > 1 and token not in _STOPWORDS:
+                out.append(token)
+        elif len(token) == 1:
+            out.append(token)
+        else:
+            out.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return out
+
+
+def _term_counts(item) -> dict:
+    counts = {}
+    for token in _tokens(item.get("title") or ""):
+        counts[token] = counts.get(token, 0) + _TITLE_WEIGHT
+    for token in _tokens(item.get("summary") or ""):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def tfidf_vectors(items) -> list[dict]:
+    """
+    每条新闻的 L2 归一化 TF-IDF 稀疏向量 {词: 权重}
+
+    tf 取 1 + log(次数)，idf 取平滑形式 log((1 + N) / (1 + df)) + 1
+    """
+    counts = [_term_counts(item) for item in items]
+    df = {}
+    for c in counts:
+        for term in c:
+            df[term] = df.get(term, 0) + 1
+
+    n = len(items)
+    idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items()}
+
+    vectors = []
+    for c in counts:
+        vec = {term: (1 + math.log(tf)) * idf[term] for term, tf in c.items()}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        vectors.append({term: w / norm for term, w in vec.items()})
+    return vectors
+
+
+def cosine_pairs(vectors, threshold: float) -> list[tuple[float, int, int]]:
+    """
+    余弦相似度 >= threshold 的条目对 (相似度, i, j)，i < j，按相似度从高到低
+
+    按词建立倒排表，逐条累加与之前条目的点积（等价于稀疏矩阵 X·Xᵀ 的上三角）
+    """
+    postings = {}
+    pairs = []
+    for j, vec in enumerate(vectors):
+        dots = {}
+        for term, w in vec.items():
+            plist = postings.get(term)
+            if plist is None:
+                postings[term] = [(j, w)]
+                continue
+            for i, wi in plist:
+                dots[i] = dots.get(i, 0.0) + w * wi
+            plist.append((j, w))
+        pairs.extend((sim, i, j) for i, sim in dots.items() if sim >= threshold)
+    pairs.sort(key=lambda p: (-p[0], p[1], p[2]))
+    return pairs
+
+
+def cluster_items(items, threshold: float | None = None, max_size: int | None = None) -> list[list[int]]:
+    """
+    按相似度从高到低合并条目（簇大小不超过 max_size），返回各簇的下标列表，
+    簇内与簇间都保持原顺序
+    """
+    threshold = settings.CLUSTER_THRESHOLD if threshold is None else threshold
+    max_size = max_size or settings.CLUSTER_MAX_SIZE
+
+    parent = list(range(len(items)))
+    size = [1] * len(items)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for _, i, j in cosine_pairs(tfidf_vectors(items), threshold):
+        root_i, root_j = find(i), find(j)
+        if root_i == root_j or size[root_i] + size[root_j] > max_size:
+            continue
+        keep, drop = min(root_i, root_j), max(root_i, root_j)
+        parent[drop] = keep
+        size[keep] += size[drop]
+
+    clusters = {}
+    for idx in range(len(items)):
+        clusters.setdefault(find(idx), []).append(idx)
+    return list(clusters.values())
+
+
+def cluster_block(block: dict, threshold: float | None = None, max_size: int | None = None) -> dict:
+    """
+    把分类 block 中同一事件的报道合并为一条
+
+    每簇第一条为代表，其余条目放入代表条目的 members；合并后重新编号 H1、H2 ...
+
+    Args:
+        block: {"category": ..., "items": [...]}（Classify 输出）
+        threshold: 合并所需的余弦相似度，默认 settings.CLUSTER_THRESHOLD
+        max_size: 每簇最多条数，默认 settings.CLUSTER_MAX_SIZE
+
+    Returns:
+        dict: 新 block（原 block 不修改）
+    """
+    items = block.get("items", [])
+    if len(items) < 2:
+        return block
+
+    clusters = cluster_items(items, threshold, max_size)
+    if len(clusters) == len(items):
+        return block
+
+    merged = []
+    for n, members in enumerate(clusters, start=1):
+        entry = dict(items[members[0]], id=f"H{n}")
+        if len(members) > 1:
+            entry["members"] = [
+                {key: items[idx].get(key) for key in ("title", "link", "source", "item_id")}
+                for idx in members[1:]
+            ]
+        merged.append(entry)
+
+    category = block.get("category", "unknown")
+    metrics.increment_counter(f"cluster_merged_{category}", len(items) - len(merged))
+    logger.info(f"分类 [{category}] 报道聚类：{len(items)} 条合并为 {len(merged)} 条")
+    return dict(block, items=merged)
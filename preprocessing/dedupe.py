@@ -1,4 +1,14 @@
+import hashlib
 import re
+import zlib
+from itertools import repeat
+from operator import and_, eq, itemgetter
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+logger = get_logger("preprocessing.dedupe")
 
 
 def normalize_title(title: str) -> str:
@@ -23,19 +33,234 @@ def normalize_title(title: str) -> str:
     return title
 
 
-def dedupe_items(data: dict):
-    all_items = data.get("items", [])
+def story_key(title: str, link: str) -> str:
+    """
+    跨运行识别同一条新闻的键：规范化标题 + 链接哈希
+
+    Args:
+        title: 原始标题
+        link: 链接（canonical 优先，见 NewsItem.link）
+
+    Returns:
+        str: 键
+    """
+    link_hash = hashlib.sha1((link or "").strip().encode("utf-8")).hexdigest()[:16]
+    return f"{normalize_title(title)}|{link_hash}"
 
-    seen = set()
-    deduped = []
 
-    for item in all_items:
-        norm = normalize_title(item.get("title"))
+def _item_norm_title(item) -> str:
+    """NewsItem 直接用预计算的规范化标题，原始 dict 现算"""
+    if isinstance(item, dict):
+        return normalize_title(item.get("title"))
+    return item.norm_title
 
+
+def iter_dedupe(items):
+    """dedupe_items 的惰性版本：按规范化标题逐条产出首次出现的条目"""
+    seen = set()
+    for item in items:
+        norm = _item_norm_title(item)
         if norm not in seen:
             seen.add(norm)
-            deduped.append(item)
+            yield item
+
+
+def dedupe_items(data: dict):
+    data["items"] = list(iter_dedupe(data.get("items", [])))
+
+    return data
+
+# ---------- 近似去重（MinHash + LSH） ----------
+
+# 非 ASCII 文本的分词：CJK 按单字，其余按字母数字串；纯 ASCII 文本直接按空白切分
+_TOKEN_RE = re.compile(r"[\u3400-\u9fff\uf900-\ufaff]|[^\W_]+")
+_TAG_RE = re.compile(r"<[^>]+>")
+# 空桶填充时的偏移，避免借用的值与原桶值相同而虚增相似度
+_DENSIFY_OFFSET = 0x9E3779B97F4A7C15
+
+
+class _TokenHashes(dict):
+    """token -> crc32 缓存（crc32 与进程无关，同一批数据每次运行得到相同的分组）"""
+
+    MAX_SIZE = 500000
+
+    def __missing__(self, token):
+        if len(self) >= self.MAX_SIZE:
+            self.clear()
+        value = self[token] = zlib.crc32(token.encode("utf-8"))
+        return value
+
+
+_token_hashes = _TokenHashes()
+
+
+def _item_fields(item):
+    if isinstance(item, dict):
+        summary = item.get("summaryText") or item.get("summary") or ""
+        if isinstance(summary, dict):
+            summary = summary.get("content", "") or ""
+        return normalize_title(item.get("title")), summary, item.get("link") or ""
+    return item.norm_title, item.summary, item.link
+
+
+def _shingles(item, shingle_size: int, summary_chars: int) -> set:
+    """标题 + 摘要前 summary_chars 字的 token shingle 哈希集合"""
+    norm_title, summary, _ = _item_fields(item)
+    summary = summary[:summary_chars]
+    if "<" in summary:
+        summary = _TAG_RE.sub(" ", summary)
+    text = f"{norm_title} {summary.lower()}"
+
+    tokens = text.split() if text.isascii() else _TOKEN_RE.findall(text)
+    ids = list(map(_token_hashes.__getitem__, tokens))
+    if len(ids) < shingle_size:
+        return set(ids)
+    # 整数元组的 hash 不受 PYTHONHASHSEED 影响
+    return set(map(hash, zip(*(ids[i:] for i in range(shingle_size)))))
+
+
+def _signature(hashes: set, num_perm: int) -> tuple | None:
+    """
+    单次置换 MinHash（one permutation hashing）：
+    哈希按低位分到 num_perm 个桶，每桶取最小值；空桶用右侧最近的非空桶值加偏移填充
+    """
+    if not hashes:
+        return None
+    ordered = sorted(hashes, reverse=True)
+    # 倒序写入 dict，每个桶最后留下的就是最小值
+    bin_min = dict(zip(map(and_, ordered, repeat(num_perm - 1)), ordered))
+    sig = list(map(bin_min.get, range(num_perm)))
+
+    if len(bin_min) < num_perm:
+        for i in range(num_perm):
+            if sig[i] is None:
+                step = 1
+                while (i + step) % num_perm not in bin_min:
+                    step += 1
+                sig[i] = bin_min[(i + step) % num_perm] + step * _DENSIFY_OFFSET
+    return tuple(sig)
+
+
+def _similarity(a: tuple, b: tuple) -> float:
+    return sum(map(eq, a, b)) / len(a)
+
+
+def _set_alternates(item, links: list):
+    if isinstance(item, dict):
+        item["alternates"] = links
+    else:
+        item.alternates = tuple(links)
+
+
+def minhash_signatures(
+    items,
+    num_perm: int | None = None,
+    shingle_size: int | None = None,
+    summary_chars: int | None = None,
+) -> list:
+    """
+    每条新闻的 MinHash 签名（无可用 token 时为 None），参数不传时取 settings.NEAR_DEDUPE_*
+
+    签名只依赖 crc32 与整数元组哈希，在不同进程中计算结果相同，
+    并行预处理可在子进程中算好后传给 near_dedupe_items
+    """
+    num_perm = num_perm or settings.NEAR_DEDUPE_NUM_PERM
+    shingle_size = shingle_size or settings.NEAR_DEDUPE_SHINGLE_SIZE
+    summary_chars = settings.NEAR_DEDUPE_SUMMARY_CHARS if summary_chars is None else summary_chars
+    return [_signature(_shingles(item, shingle_size, summary_chars), num_perm) for item in items]
+
+
+def near_dedupe_items(
+    data: dict,
+    threshold: float | None = None,
+    num_perm: int | None = None,
+    bands: int | None = None,
+    shingle_size: int | None = None,
+    summary_chars: int | None = None,
+    signatures: list | None = None,
+):
+    """
+    近似去重：同一条通稿被多家媒体转载、标题略有不同时只保留一条
+
+    对标题 + 摘要开头做 shingle，计算 MinHash 签名，LSH 分段找候选对，
+    估计相似度 >= threshold 的归为一簇。每簇保留最靠前的一条，其余条目的链接
+    写入代表条目的 alternates。参数不传时取 settings.NEAR_DEDUPE_*。
+
+    Args:
+        data: {"items": [...]}（NewsItem 或 dict），应已做过精确去重
+        threshold: 合并所需的估计 Jaccard 相似度
+        num_perm: 签名长度（2 的幂）
+        bands: LSH 分段数（须整除 num_perm）
+        shingle_size: 每个 shingle 的 token 数
+        summary_chars: 参与比较的摘要前缀长度
+        signatures: 预先算好的签名（与 items 一一对应，见 minhash_signatures），传入时不再重算
+
+    Returns:
+        dict: data（items 已替换为去重后的列表）
+    """
+    threshold = settings.NEAR_DEDUPE_THRESHOLD if threshold is None else threshold
+    num_perm = num_perm or settings.NEAR_DEDUPE_NUM_PERM
+    bands = bands or settings.NEAR_DEDUPE_BANDS
+
+    if num_perm & (num_perm - 1):
+        raise ValueError(f"num_perm 必须是 2 的幂，当前值: {num_perm}")
+    if num_perm % bands:
+        raise ValueError(f"bands 必须整除 num_perm，当前值: bands={bands}, num_perm={num_perm}")
+    rows = num_perm // bands
+
+    items = data.get("items", [])
+    if signatures is None:
+        signatures = minhash_signatures(items, num_perm, shingle_size, summary_chars)
+    elif len(signatures) != len(items):
+        raise ValueError(f"signatures 数量 {len(signatures)} 与条目数 {len(items)} 不一致")
+
+    # LSH：逐段以签名片段为键，同键条目与该键下最靠前的条目组成候选对
+    valid = [idx for idx, sig in enumerate(signatures) if sig is not None]
+    sigs = [signatures[idx] for idx in valid]
+    candidates = set()
+    for band in range(bands):
+        keys = list(map(itemgetter(slice(band * rows, (band + 1) * rows)), sigs))
+        # 倒序构建 dict，每个键最后留下的是最靠前的条目
+        first = dict(zip(reversed(keys), reversed(valid)))
+        candidates.update(
+            (head, idx) for head, idx in zip(map(first.__getitem__, keys), valid) if head != idx
+        )
+
+    # 并查集，根始终是簇内最靠前的条目
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for head, other in sorted(candidates):
+        root_a, root_b = find(head), find(other)
+        if root_a == root_b:
+            continue
+        if _similarity(signatures[head], signatures[other]) >= threshold:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    kept = []
+    alternates = {}
+    for idx, item in enumerate(items):
+        root = find(idx)
+        if root == idx:
+            kept.append(item)
+            continue
+        link = _item_fields(item)[2]
+        if link:
+            alternates.setdefault(root, []).append(link)
+
+    for root, links in alternates.items():
+        own = _item_fields(items[root])[2]
+        _set_alternates(items[root], [link for link in dict.fromkeys(links) if link != own])
 
-    data["items"] = deduped
+    dropped = len(items) - len(kept)
+    if dropped:
+        metrics.increment_counter("near_dedupe_dropped", dropped)
+        logger.info(f"近似去重：{len(items)} 条合并为 {len(kept)} 条（{len(alternates)} 簇）")
 
-    return data
\ No newline at end of file
+    data["items"] = kept
+    return data
@@ -1,14 +1,35 @@
-RUSSIA_LABEL = "user/-/label/俄罗斯"
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
 
+logger = get_logger("filters")
+
+RUSSIA_LABEL = settings.RUSSIA_LABEL
+
+
+def iter_filter_ru(items):
+    """filter_ru 的惰性版本：逐条产出，遍历结束时记录兜底过滤条数"""
+    dropped = 0
+    for item in items:
+        if RUSSIA_LABEL in item.get("categories", []):
+            dropped += 1
+            continue
+        yield item
+
+    if dropped:
+        metrics.increment_counter("filter_ru_client_dropped", dropped)
+        if settings.FRESHRSS_SERVER_EXCLUDE:
+            logger.warning(f"服务端排除后仍有 {dropped} 条俄罗斯标签条目，已在客户端过滤")
 
 
 def filter_ru(data):
-    items = data.get("items", [])
+    """
+    过滤俄罗斯标签条目
 
-    filtered = [
-        item for item in items
-        if RUSSIA_LABEL not in item.get("categories", [])
-    ]
+    请求时已通过 xt 在服务端排除（FRESHRSS_SERVER_EXCLUDE），这里作为兜底；
+    兜底仍然拦下的条数记入 filter_ru_client_dropped 计数器
+    """
+    filtered = list(iter_filter_ru(data.get("items", [])))
 
     new_data = data.copy()
     new_data["items"] = filtered
@@ -0,0 +1,115 @@
+"""
+多组关键词匹配器
+
+把若干组关键词一次性编译，对一段文本返回所有命中的组名（子串语义，与 `kw in text` 一致）。
+每个组对应一个二进制位（bits），match_mask 返回命中组的位掩码，供规则引擎按位判定。
+
+后端：
+- aho：安装了 pyahocorasick 时使用 Aho–Corasick 自动机，一次扫描得到全部命中组
+- scan：未安装时退回逐组子串扫描（CPython 的 `in` 为 C 实现，组内命中即停）
+"""
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - 取决于运行环境
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """编译后的多组关键词匹配器"""
+
+    def __init__(self, groups: dict, backend: str | None = None):
+        """
+        Args:
+            groups: {组名: [关键词, ...]}
+            backend: "aho" / "scan"，默认有 pyahocorasick 时用 aho
+        """
+        self.groups = {name: tuple(keywords) for name, keywords in groups.items()}
+        self.bits = {name: 1 << i for i, name in enumerate(self.groups)}
+        self._full = (1 << len(self.groups)) - 1
+        self._keywords = tuple(dict.fromkeys(kw for keywords in self.groups.values() for kw in keywords))
+
+        if backend is None:
+            backend = "aho" if ahocorasick is not None else "scan"
+        if backend == "aho" and ahocorasick is None:
+            raise ValueError("backend=aho 需要安装 pyahocorasick")
+        if backend not in ("aho", "scan"):
+            raise ValueError(f"backend 必须是 aho 或 scan，当前值: {backend}")
+        self.backend = backend
+
+        # 关键词 -> 所属组的位掩码（同一关键词可能属于多个组）
+        owners = {}
+        for name, keywords in self.groups.items():
+            for kw in keywords:
+                owners[kw] = owners.get(kw, 0) | self.bits[name]
+        self._scan_groups = tuple((self.bits[name], keywords) for name, keywords in self.groups.items())
+
+        if backend == "aho":
+            self._automaton = ahocorasick.Automaton()
+            for kw, mask in owners.items():
+                self._automaton.add_word(kw, mask)
+            if owners:
+                self._automaton.make_automaton()
+            self._empty = not owners
+
+    def match(self, text: str) -> frozenset:
+        """
+        返回 text 中命中的全部组名
+
+        Args:
+            text: 待匹配文本（调用方负责大小写归一）
+
+        Returns:
+            frozenset: 命中的组名
+        """
+        mask = self.match_mask(text)
+        return frozenset(name for name, bit in self.bits.items() if mask & bit)
+
+    def match_mask(self, text: str) -> int:
+        """
+        text 中命中组的位掩码（组 name 命中当且仅当 mask & bits[name]）
+
+        Args:
+            text: 待匹配文本（调用方负责大小写归一）
+
+        Returns:
+            int: 位掩码
+        """
+        if not text:
+            return 0
+
+        mask = 0
+        if self.backend == "aho":
+            if self._empty:
+                return 0
+            full = self._full
+            for _, bits in self._automaton.iter(text):
+                mask |= bits
+                if mask == full:
+                    break
+            return mask
+
+        # scan：逐组扫描，组内命中第一个关键词即停
+        for bit, keywords in self._scan_groups:
+            for kw in keywords:
+                if kw in text:
+                    mask |= bit
+                    break
+        return mask
+
+    def search(self, text: str) -> bool:
+        """是否命中任一关键词（命中第一个即返回）"""
+        if not text:
+            return False
+
+        if self.backend == "aho":
+            if self._empty:
+                return False
+            for _ in self._automaton.iter(text):
+                return True
+            return False
+
+        for kw in self._keywords:
+            if kw in text:
+                return True
+        return False
@@ -0,0 +1,94 @@
+"""
+精简新闻条目
+
+原始 greader 条目在拉取后立即转换为 NewsItem：只保留后续流程需要的字段，
+链接、摘要、来源的提取以及小写/规范化变体都只计算一次。
+"""
+
+from dataclasses import dataclass
+
+from .dedupe import normalize_title
+
+
+def _extract_link(item: dict) -> str:
+    """链接优先级：canonical → alternate → link"""
+    return (
+        (item.get("canonical") or [{}])[0].get("href") or
+        (item.get("alternate") or [{}])[0].get("href") or
+        item.get("link") or ""
+    )
+
+
+def _summary_content(item: dict) -> str:
+    summary = item.get("summary")
+    if isinstance(summary, dict):
+        return summary.get("content", "") or ""
+    return summary or ""
+
+
+@dataclass(slots=True)
+class NewsItem:
+    """拉取后归一化的新闻条目"""
+
+    id: str
+    title: str
+    summary: str
+    link: str
+    source: str
+    categories: tuple
+    published: int | None
+
+    # 预计算的变体，供过滤 / 去重 / 分类直接使用
+    title_lower: str
+    source_lower: str
+    link_lower: str
+    categories_lower: str
+    text_lower: str
+    norm_title: str
+
+    # 近似去重时被合并条目的链接（见 dedupe.near_dedupe_items）
+    alternates: tuple = ()
+
+    @classmethod
+    def from_raw(cls, item: dict) -> "NewsItem":
+        """从 greader 原始条目构建"""
+        title = item.get("title") or ""
+        summary_text = item.get("summaryText") or ""
+        summary_content = _summary_content(item)
+        link = _extract_link(item)
+        origin_title = (item.get("origin") or {}).get("title") or ""
+        categories = tuple(item.get("categories") or ())
+
+        title_lower = title.lower()
+        link_lower = link.lower()
+        text_lower = " ".join(
+            p for p in (title_lower, summary_text, summary_content, link_lower) if p
+        ).lower()
+
+        return cls(
+            id=item.get("id") or "",
+            title=title,
+            summary=summary_text or summary_content,
+            link=link,
+            source=origin_title or item.get("source") or "",
+            categories=categories,
+            published=item.get("published"),
+            title_lower=title_lower,
+            source_lower=origin_title.lower(),
+            link_lower=link_lower,
+            categories_lower=" ".join(str(c).lower() for c in categories),
+            text_lower=text_lower,
+            norm_title=normalize_title(title),
+        )
+
+    def get(self, key: str, default=None):
+        """兼容按 dict 方式读取字段（build_prompt、filters 等沿用 item.get）"""
+        value = getattr(self, key, default)
+        return default if value is None else value
+
+
+def as_news_item(item) -> NewsItem:
+    """dict 转 NewsItem；已是 NewsItem 则原样返回"""
+    if isinstance(item, NewsItem):
+        return item
+    return NewsItem.from_raw(item)
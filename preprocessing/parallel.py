@@ -0,0 +1,140 @@
+"""
+并行预处理（大窗口回填）
+
+把条目按顺序切块，在 ProcessPoolExecutor 中对每块做：块内精确去重 → 分类 → MinHash 签名；
+主进程按块顺序合并（全局精确去重只保留首次出现的规范化标题），再用子进程算好的签名
+做全局近似去重，最后按原顺序分桶编号。输出与串行路径（dedupe_items → near_dedupe_items
+→ Classify.partition）完全一致，包括各分类内的 H 编号。
+
+条目以字段元组传给子进程（比直接 pickle NewsItem 快约一倍），子进程只回传下标、类别与签名。
+规则命中统计包含后来被全局去重去掉的条目，因此与串行路径相比会略多。
+
+默认不启用（PREPROCESS_WORKERS=1）：进程启动与条目序列化的开销在单核上无法摊回
+（1 核、3 万条：串行约 1.1–1.7s，2 进程约 2.3–3.0s），需在多核机器上实测后再开启。
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from operator import attrgetter
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+from .classify import Classify
+from .dedupe import iter_dedupe, minhash_signatures, near_dedupe_items
+from .news_item import NewsItem
+from .rules import record_rule_metrics
+from .stages import chain, iter_near_dedupe
+
+logger = get_logger("preprocessing.parallel")
+
+_ROW = attrgetter(*NewsItem.__slots__)
+
+
+def resolve_workers(workers: int | None = None) -> int:
+    """进程数：不传取 settings.PREPROCESS_WORKERS，0 表示 CPU 核数"""
+    workers = settings.PREPROCESS_WORKERS if workers is None else workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def should_parallelize(n_items: int, workers: int | None = None) -> bool:
+    """条目数达到 PREPROCESS_PARALLEL_MIN_ITEMS 且可用进程数大于 1 时走并行路径"""
+    return n_items >= settings.PREPROCESS_PARALLEL_MIN_ITEMS and resolve_workers(workers) > 1
+
+
+def _process_chunk(rows, near: bool, near_params: tuple):
+    """
+    子进程：块内精确去重，对留下的条目分类并计算 MinHash 签名
+
+    Returns:
+        tuple: (留下的块内下标, 类别列表, 签名列表或 None, 规则统计)
+    """
+    items = [NewsItem(*row) for row in rows]
+
+    seen = set()
+    kept = []
+    for idx, item in enumerate(items):
+        if item.norm_title not in seen:
+            seen.add(item.norm_title)
+            kept.append(idx)
+    survivors = [items[idx] for idx in kept]
+
+    classifier = Classify(category=None)
+    labels = [classifier.classify_one(item) for item in survivors]
+    signatures = minhash_signatures(survivors, *near_params) if near else None
+    return kept, labels, signatures, classifier.engine.take_metrics()
+
+
+def preprocess_parallel(items, categories, workers: int | None = None, chunk_size: int | None = None) -> dict:
+    """
+    并行执行 精确去重 → 近似去重 → 分类
+
+    Args:
+        items: NewsItem 列表（应已过滤）
+        categories: 需要输出的类别
+        workers: 进程数，默认 settings.PREPROCESS_WORKERS
+        chunk_size: 每块条数，默认 settings.PREPROCESS_CHUNK_SIZE
+
+    Returns:
+        dict: 与 Classify.partition 相同的 {类别: {"section": "headline", "items": [...]}}
+    """
+    workers = resolve_workers(workers)
+    chunk_size = max(1, chunk_size or settings.PREPROCESS_CHUNK_SIZE)
+    near = settings.NEAR_DEDUPE_ENABLED
+    near_params = (
+        settings.NEAR_DEDUPE_NUM_PERM,
+        settings.NEAR_DEDUPE_SHINGLE_SIZE,
+        settings.NEAR_DEDUPE_SUMMARY_CHARS,
+    )
+
+    starts = range(0, len(items), chunk_size)
+    chunks = [list(map(_ROW, items[start:start + chunk_size])) for start in starts]
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks) or 1)) as executor:
+        results = list(executor.map(_process_chunk, chunks, repeat(near), repeat(near_params)))
+
+    # 全局合并：按块顺序保留每个规范化标题的首次出现，与串行 dedupe_items 相同
+    seen = set()
+    deduped, labels, signatures = [], [], []
+    for offset, (kept, chunk_labels, chunk_sigs, rule_stats) in zip(starts, results):
+        record_rule_metrics(*rule_stats)
+        for pos, idx in enumerate(kept):
+            item = items[offset + idx]
+            if item.norm_title in seen:
+                continue
+            seen.add(item.norm_title)
+            deduped.append(item)
+            labels.append(chunk_labels[pos])
+            if near:
+                signatures.append(chunk_sigs[pos])
+
+    if near:
+        label_of = {id(item): label for item, label in zip(deduped, labels)}
+        deduped = near_dedupe_items({"items": deduped}, signatures=signatures)["items"]
+        labels = [label_of[id(item)] for item in deduped]
+
+    metrics.record_timing("preprocess_parallel", time.perf_counter() - start_time)
+    logger.info(f"并行预处理：{len(items)} 条，{len(chunks)} 块，{workers} 进程，去重后 {len(deduped)} 条")
+
+    return Classify.partition(deduped, categories, labels=labels)
+
+
+def preprocess(items, categories, workers: int | None = None) -> dict:
+    """
+    精确去重 → 近似去重 → 分类；条目较多时走进程池，否则（或进程池不可用时）串行
+
+    Returns:
+        dict: 与 Classify.partition 相同
+    """
+    if should_parallelize(len(items), workers):
+        try:
+            return preprocess_parallel(items, categories, workers)
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning(f"进程池不可用，改为串行预处理: {e}")
+
+    return Classify.partition(chain(items, iter_dedupe, iter_near_dedupe), categories)
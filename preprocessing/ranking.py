@@ -0,0 +1,118 @@
+"""
+分类内的相关度排序与截断
+
+条目得分 = 来源权重 × (时效 + RANK_COVERAGE_WEIGHT × log2(1 + 转载/相关报道数))
+
+- 时效：按发布时间指数衰减，半衰期 RANK_HALF_LIFE_HOURS，取值 (0, 1]；无发布时间记 0
+- 来源权重：RANK_SOURCE_WEIGHTS（按来源名小写匹配），未列出的为 1
+- 报道数：近似去重合并进来的 alternates 与聚类合并进来的 members 条数
+
+用堆按得分从高到低取前 K 条，同一来源超过 RANK_PER_SOURCE_CAP 的跳过；
+保留下来的条目维持原顺序并重新编号 H1、H2 ...，这样 prompt 大小与 LLM 输出长度有上界。
+"""
+
+import heapq
+import math
+import time
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+logger = get_logger("preprocessing.ranking")
+
+
+def score_item(
+    item,
+    now: float,
+    half_life_hours: float,
+    coverage_weight: float,
+    source_weights: dict,
+) -> float:
+    """单条新闻的相关度得分（item 为分类输出的 dict）"""
+    published = item.get("published")
+    if published:
+        age_hours = max(0.0, now - float(published)) / 3600
+        recency = 0.5 ** (age_hours / half_life_hours) if half_life_hours > 0 else 1.0
+    else:
+        recency = 0.0
+
+    copies = len(item.get("alternates") or ()) + len(item.get("members") or ())
+    weight = source_weights.get((item.get("source") or "").lower(), 1.0)
+    return weight * (recency + coverage_weight * math.log2(1 + copies))
+
+
+def select_top_k(
+    block: dict,
+    k: int | None = None,
+    per_source_cap: int | None = None,
+    now: float | None = None,
+) -> tuple[dict, list]:
+    """
+    按相关度保留分类 block 的前 k 条（每个来源最多 per_source_cap 条，来源为空的条目不受上限限制）
+
+    Args:
+        block: {"category": ..., "items": [...]}（Classify / cluster_block 输出）
+        k: 保留条数，默认 settings.RANK_TOP_K
+        per_source_cap: 每个来源最多条数（0 为不限），默认 settings.RANK_PER_SOURCE_CAP
+        now: 计算时效的当前时间（Unix 秒），默认当前时间
+
+    Returns:
+        tuple: (新 block, 被去掉的条目列表)；无需截断时原样返回 block
+    """
+    k = settings.RANK_TOP_K if k is None else k
+    per_source_cap = settings.RANK_PER_SOURCE_CAP if per_source_cap is None else per_source_cap
+    now = time.time() if now is None else now
+
+    items = block.get("items", [])
+    if len(items) <= k and not per_source_cap:
+        return block, []
+
+    # 堆元素 (-得分, 原下标)：得分相同时靠前的条目优先
+    heap = [
+        (
+            -score_item(
+                item,
+                now,
+                settings.RANK_HALF_LIFE_HOURS,
+                settings.RANK_COVERAGE_WEIGHT,
+                settings.RANK_SOURCE_WEIGHTS,
+            ),
+            idx,
+        )
+        for idx, item in enumerate(items)
+    ]
+    heapq.heapify(heap)
+
+    selected = []
+    per_source = {}
+    capped = 0
+    while heap and len(selected) < k:
+        _, idx = heapq.heappop(heap)
+        source = (items[idx].get("source") or "").lower()
+        # 没有来源的条目互不相关，不共用一个上限
+        if source and per_source_cap:
+            if per_source.get(source, 0) >= per_source_cap:
+                capped += 1
+                continue
+            per_source[source] = per_source.get(source, 0) + 1
+        selected.append(idx)
+
+    if len(selected) == len(items):
+        return block, []
+
+    selected.sort()
+    keep = set(selected)
+    dropped = [item for idx, item in enumerate(items) if idx not in keep]
+    renumbered = [dict(items[idx], id=f"H{n}") for n, idx in enumerate(selected, start=1)]
+
+    category = block.get("category", "unknown")
+    metrics.increment_counter(f"rank_dropped_{category}", len(dropped))
+    logger.info(
+        f"分类 [{category}] 相关度截断：{len(items)} 条保留 {len(selected)} 条"
+        f"（来源上限跳过 {capped} 条，其余按得分截断）"
+    )
+    for item in dropped:
+        logger.debug(f"分类 [{category}] 去掉: {item.get('source')} | {item.get('title')}")
+
+    return dict(block, items=renumbered), dropped
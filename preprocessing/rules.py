@@ -0,0 +1,302 @@
+"""
+分类规则引擎
+
+规则从 TOML/JSON 文件加载（默认 config/classify_rules.toml）。加载时把全部规则的关键词
+按字段编译成一个 KeywordMatcher（组名为规则名），正则编译成 re.Pattern。
+评估一条新闻时按文件顺序逐条判定规则：字段在首条用到它的规则处扫描一次（之后的规则复用），
+各字段的命中位拼成一个位掩码（每个"规则 × 字段"一位），关键词条件为一次按位比较、正则单独匹配，
+命中即短路（被前面的规则排除的新闻不会扫描后面才用到的字段）。
+长时间运行的进程中，规则文件 mtime 变化后下一个分类批次开始时自动重新加载；
+新文件解析失败时保留旧规则并记录错误。
+
+每条规则命中时计数一次（短路后未评估的规则不计），计数器名为 classify_rule_hit_<规则名>；
+每条规则的累计评估耗时记在 classify_rule_<规则名>（默认关闭，CLASSIFY_RULE_TIMING=true 开启；
+各规则共用的关键词扫描耗时单独记在 classify_rule_keyword_scan）。
+统计先在引擎内累积，由 flush_metrics() 批量写入 monitoring.metrics。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import tomllib
+from pathlib import Path
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+from .matcher import KeywordMatcher
+
+logger = get_logger("preprocessing.rules")
+
+# 规则字段 -> NewsItem 上预计算的小写属性
+FIELDS = {
+    "text": "text_lower",
+    "title": "title_lower",
+    "source": "source_lower",
+    "link": "link_lower",
+    "labels": "categories_lower",
+}
+
+ACTIONS = ("exclude", "top", "soft", "category")
+
+TOP_CATEGORY = "头条"
+
+# 关键词扫描（各规则共用）的计时器名，与 classify_rule_<规则名> 一起写入
+_SCAN_TIMER = "keyword_scan"
+
+
+class Rule:
+    """编译后的单条规则"""
+
+    __slots__ = ("name", "action", "category", "keywords", "patterns", "need")
+
+    def __init__(self, spec: dict):
+        self.name = spec.get("name") or ""
+        self.action = spec.get("action")
+        self.category = spec.get("category")
+        if not self.name:
+            raise ValueError(f"规则缺少 name: {spec}")
+        if self.action not in ACTIONS:
+            raise ValueError(f"规则 {self.name} 的 action 无效: {self.action}")
+        if self.action == "category" and not self.category:
+            raise ValueError(f"规则 {self.name} 缺少 category")
+
+        # 条件：关键词（由引擎统一编译扫描）在前、正则在后，须全部满足
+        self.keywords = {}
+        self.patterns = {}
+        for field in FIELDS:
+            keywords = spec.get(field)
+            if keywords:
+                self.keywords[field] = tuple(str(kw).lower() for kw in keywords)
+            pattern = spec.get(f"{field}_regex")
+            if pattern:
+                self.patterns[field] = re.compile(pattern)
+        if not self.keywords and not self.patterns:
+            raise ValueError(f"规则 {self.name} 没有任何匹配条件")
+        # 关键词条件在引擎位掩码中对应的位（由 RuleEngine 编译时填入），须全部命中
+        self.need = 0
+
+    def matches(self, item, mask: int) -> bool:
+        """
+        Args:
+            item: NewsItem
+            mask: 本条新闻的关键词命中位掩码（须已扫描本规则用到的字段，见 RuleEngine._scan）
+        """
+        if mask & self.need != self.need:
+            return False
+        for field, pattern in self.patterns.items():
+            if not pattern.search(getattr(item, FIELDS[field])):
+                return False
+        return True
+
+
+class RuleEngine:
+    """从规则文件编译出的分类器"""
+
+    def __init__(self, path: Path | str | None = None, backend: str | None = None, reload_interval: float | None = None):
+        """
+        Args:
+            path: 规则文件路径（.toml / .json），默认 settings.CLASSIFY_RULES_PATH
+            backend: KeywordMatcher 后端，默认 settings.CLASSIFY_MATCHER_BACKEND（为空时由 KeywordMatcher 自动选择）
+            reload_interval: 检查文件 mtime 的最小间隔（秒），默认 settings.CLASSIFY_RULES_RELOAD_INTERVAL
+        """
+        self.path = Path(path) if path else settings.CLASSIFY_RULES_PATH
+        self.backend = backend or settings.CLASSIFY_MATCHER_BACKEND or None
+        self.timing = settings.CLASSIFY_RULE_TIMING
+        self.reload_interval = (
+            settings.CLASSIFY_RULES_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        )
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._timings = {}
+        self._next_check = 0.0
+        self._mtime = None
+
+        try:
+            self._load()
+        except (OSError, ValueError) as e:
+            raise RuntimeError(f"分类规则加载失败: {self.path}: {e}") from e
+
+    # ---------- 加载 ----------
+
+    def _read(self) -> dict:
+        raw = self.path.read_bytes()
+        if self.path.suffix == ".json":
+            return json.loads(raw.decode("utf-8"))
+        return tomllib.loads(raw.decode("utf-8"))
+
+    def _load(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        self._compile(self._read())
+        self._mtime = mtime
+        logger.info(f"分类规则已加载: {self.path}（{len(self.rules)} 条）")
+
+    def _compile(self, data: dict):
+        rules = [Rule(spec) for spec in data.get("rules", [])]
+        names = [rule.name for rule in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("规则 name 重复")
+
+        # 每个字段一个匹配器：{规则名: 该规则在此字段的关键词}，一次扫描得到全部命中规则
+        groups = {}
+        for rule in rules:
+            for field, keywords in rule.keywords.items():
+                groups.setdefault(field, {})[rule.name] = keywords
+        # 各字段匹配器的位依次平移，拼成一个位掩码
+        scans = []
+        offset = 0
+        for field, group in groups.items():
+            matcher = KeywordMatcher(group, backend=self.backend)
+            for rule in rules:
+                if field in rule.keywords:
+                    rule.need |= matcher.bits[rule.name] << offset
+            span = ((1 << len(group)) - 1) << offset
+            scans.append((FIELDS[field], matcher, offset, span))
+            offset += len(group)
+
+        # 重新加载只在 get_rule_engine() 中检查；分类批次开始时取一次引擎（见 Classify.partition），
+        # 批次内不再调用 get_rule_engine，规则不会在批次中途被替换
+        self.rules = rules
+        self._scans = scans
+        self.fallback = data.get("fallback", "国际")
+        self._by_action = {action: [r for r in rules if r.action == action] for action in ACTIONS}
+
+    def maybe_reload(self) -> bool:
+        """
+        规则文件 mtime 变化时重新加载（按 reload_interval 节流）
+
+        Returns:
+            bool: 是否发生了重新加载
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            self._next_check = now + self.reload_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                logger.error(f"无法读取分类规则文件，继续使用当前规则: {e}")
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                self._load()
+            except (OSError, ValueError) as e:
+                # 避免对同一个坏文件反复报错
+                self._mtime = mtime
+                logger.error(f"分类规则重新加载失败，继续使用当前规则: {e}")
+                return False
+        metrics.increment_counter("classify_rules_reload")
+        return True
+
+    # ---------- 评估 ----------
+
+    def _scan(self, item, state: list, need: int):
+        """
+        扫描 need 涉及且尚未扫描的字段
+
+        Args:
+            item: NewsItem
+            state: [命中位掩码, 已扫描字段的位范围]，单条新闻的各次判定共用
+            need: 规则的关键词位
+        """
+        start = time.perf_counter() if self.timing else 0.0
+        for attr, matcher, offset, span in self._scans:
+            if need & span & ~state[1]:
+                state[0] |= matcher.match_mask(getattr(item, attr)) << offset
+                state[1] |= span
+        if self.timing:
+            self._timings[_SCAN_TIMER] = self._timings.get(_SCAN_TIMER, 0.0) + time.perf_counter() - start
+
+    def _first(self, action: str, item, state: list) -> Rule | None:
+        """按文件顺序返回第一条命中的 action 类规则（无则 None）"""
+        timing = self.timing
+        for rule in self._by_action[action]:
+            need = rule.need
+            if need & ~state[1]:
+                self._scan(item, state, need)
+            if timing:
+                start = time.perf_counter()
+                ok = rule.matches(item, state[0])
+                self._timings[rule.name] = self._timings.get(rule.name, 0.0) + time.perf_counter() - start
+            else:
+                # 关键词位未全中时不必进入 matches（多数规则在这里就被排除）
+                ok = state[0] & need == need and rule.matches(item, state[0])
+            if ok:
+                self._hits[rule.name] = self._hits.get(rule.name, 0) + 1
+                return rule
+        return None
+
+    def is_excluded(self, item) -> bool:
+        """是否命中任一硬排除规则"""
+        return self._first("exclude", item, [0, 0]) is not None
+
+    def is_soft(self, item) -> bool:
+        """是否命中任一软内容规则"""
+        return self._first("soft", item, [0, 0]) is not None
+
+    def categorize(self, item, state: list | None = None) -> str:
+        """
+        分类（不做硬排除）：头条 > category 规则（按文件顺序）> fallback
+        """
+        if state is None:
+            state = [0, 0]
+        if self._first("top", item, state) and not self._first("soft", item, state):
+            return TOP_CATEGORY
+        rule = self._first("category", item, state)
+        return rule.category if rule else self.fallback
+
+    def evaluate(self, item) -> str | None:
+        """
+        硬排除 + 分类
+
+        Args:
+            item: NewsItem
+
+        Returns:
+            str | None: 类别；被硬排除时返回 None
+        """
+        state = [0, 0]
+        if self._first("exclude", item, state):
+            return None
+        return self.categorize(item, state)
+
+    # ---------- 统计 ----------
+
+    def take_metrics(self) -> tuple[dict, dict]:
+        """取出并清空累积的统计：({规则名: 命中次数}, {规则名: 耗时秒数})"""
+        hits, self._hits = self._hits, {}
+        timings, self._timings = self._timings, {}
+        return hits, timings
+
+    def flush_metrics(self):
+        """把累积的规则命中次数与耗时写入 monitoring.metrics"""
+        record_rule_metrics(*self.take_metrics())
+
+
+def record_rule_metrics(hits: dict, timings: dict):
+    """把规则统计写入 monitoring.metrics（也用于汇总子进程中的统计）"""
+    for name, count in hits.items():
+        metrics.increment_counter(f"classify_rule_hit_{name}", count)
+    for name, seconds in timings.items():
+        metrics.record_timing(f"classify_rule_{name}", seconds)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """进程内共享的规则引擎（按需检查规则文件是否更新）"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RuleEngine()
+                return _engine
+    _engine.maybe_reload()
+    return _engine
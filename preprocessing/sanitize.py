@@ -0,0 +1,42 @@
+"""
+摘要清洗阶段：分类之后、构建 prompt 之前，对每个分类 block 的摘要去 HTML 并按预算截断
+"""
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.html_sanitizer import sanitize_summary
+from utils.logger import get_logger
+
+logger = get_logger("preprocessing.sanitize")
+
+
+def sanitize_block(block: dict, max_chars: int | None = None, max_tokens: int | None = None) -> int:
+    """
+    原地清洗 block 中每条新闻的 summary，并按分类记录去掉的字符数
+
+    Args:
+        block: {"category": ..., "items": [...]}（Classify 输出）
+        max_chars: 字符预算，默认 settings.SUMMARY_MAX_CHARS
+        max_tokens: token 预算，默认 settings.SUMMARY_MAX_TOKENS
+
+    Returns:
+        int: 本 block 去掉的字符总数
+    """
+    max_chars = settings.SUMMARY_MAX_CHARS if max_chars is None else max_chars
+    max_tokens = settings.SUMMARY_MAX_TOKENS if max_tokens is None else max_tokens
+    category = block.get("category", "unknown")
+
+    before = after = 0
+    for item in block.get("items", []):
+        raw = item.get("summary") or ""
+        clean = sanitize_summary(raw, max_chars=max_chars, max_tokens=max_tokens)
+        before += len(raw)
+        after += len(clean)
+        item["summary"] = clean
+
+    removed = before - after
+    if removed > 0:
+        metrics.increment_counter(f"summary_chars_removed_{category}", removed)
+    if before:
+        logger.info(f"分类 [{category}] 摘要清洗：{before} → {after} 字符（去掉 {removed}）")
+    return removed
@@ -0,0 +1,42 @@
+"""
+惰性预处理阶段
+
+每个阶段接收一个条目可迭代对象、返回迭代器，按顺序串联：
+
+    items = chain(raw, iter_filter_ru, iter_dedupe, iter_near_dedupe)
+    partitioned = Classify.partition(items, categories)
+
+条目逐个流过各阶段，中间不生成列表副本；只有确实需要全量数据的地方才物化：
+近似去重（LSH 需要全部签名）和分类结果（prompt 构建需要完整 block）。
+"""
+
+from config import settings
+
+from .dedupe import iter_dedupe, near_dedupe_items
+from .filters import iter_filter_ru
+
+__all__ = ["chain", "iter_filter_ru", "iter_dedupe", "iter_near_dedupe"]
+
+
+def chain(items, *stages):
+    """
+    依次套用各阶段
+
+    Args:
+        items: 条目可迭代对象（NewsItem 或 dict）
+        stages: 若干 iterable -> iterator 的函数
+
+    Returns:
+        iterator: 最后一个阶段的输出
+    """
+    for stage in stages:
+        items = stage(items)
+    return iter(items)
+
+
+def iter_near_dedupe(items):
+    """近似去重（NEAR_DEDUPE_ENABLED=false 时原样透传）；LSH 需要全部条目，此处物化一次"""
+    if not settings.NEAR_DEDUPE_ENABLED:
+        yield from items
+        return
+    yield from near_dedupe_items({"items": list(items)})["items"]
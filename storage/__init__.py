@@ -0,0 +1,10 @@
+"""
+本地存储模块
+"""
+
+from .item_store import ItemStore
+from .seen_filter import BloomFilter, SeenStories
+from .llm_cache import LLMCache
+from .risk_cache import RiskVerdictCache
+
+__all__ = ["ItemStore", "BloomFilter", "SeenStories", "LLMCache", "RiskVerdictCache"]
@@ -0,0 +1,275 @@
+"""
+SQLite 历史条目库
+
+拉取阶段写入每条新闻（标题/摘要带 FTS5 全文索引），并记录每次运行包含哪些条目、
+各自的分类与风险评估结果。可用于：
+- 查询"某条新闻为什么昨天没出现"（item_history）
+- 全文检索历史新闻（search）
+- 不访问 FreshRSS，直接用库中条目重跑某个时间窗口（load_items）
+
+库不会无限增长：每次 start_run 时删除首次出现早于 retention_days 天的条目及过期的运行记录
+（默认 settings.ITEM_STORE_RETENTION_DAYS，0 为永久保留）。
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from config import settings
+from preprocessing.news_item import NewsItem
+from utils.logger import get_logger
+
+logger = get_logger("storage.item_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    summary TEXT,
+    link TEXT,
+    source TEXT,
+    categories TEXT,
+    published INTEGER,
+    first_seen INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_items_published ON items(published);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, summary, content='items', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+END;
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at INTEGER,
+    hours INTEGER,
+    categories TEXT
+);
+
+CREATE TABLE IF NOT EXISTS run_items (
+    run_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    category TEXT,
+    ref_id TEXT,
+    ds_risk TEXT,
+    PRIMARY KEY (run_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_run_items_item ON run_items(item_id);
+"""
+
+# executemany 每批条数
+_BATCH_SIZE = 500
+
+
+def _batches(rows, size=_BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+class ItemStore:
+    """历史条目库（单个 SQLite 文件）"""
+
+    def __init__(self, path: Path | str | None = None, retention_days: float | None = None):
+        """
+        Args:
+            path: 数据库文件路径，默认 settings.ITEM_STORE_PATH
+            retention_days: 保留天数，默认 settings.ITEM_STORE_RETENTION_DAYS（0 为永久保留）
+        """
+        self.path = Path(path) if path else settings.ITEM_STORE_PATH
+        self.retention_days = settings.ITEM_STORE_RETENTION_DAYS if retention_days is None else retention_days
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        # WAL + NORMAL：批量写入时不必每次 fsync，对运行时间影响很小
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        logger.debug(f"历史条目库已打开: {self.path}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- 写入 ----------
+
+    def start_run(self, run_id: str, hours: int, categories=None):
+        """登记一次运行（同时清理超出保留期的记录）"""
+        self.prune()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs(run_id, started_at, hours, categories) VALUES (?, ?, ?, ?)",
+                (run_id, int(time.time()), int(hours), json.dumps(list(categories or []), ensure_ascii=False)),
+            )
+
+    def prune(self, now: float | None = None) -> int:
+        """
+        删除首次出现早于保留期的条目（含全文索引）及过期运行的记录
+
+        Returns:
+            int: 删除的条目数
+        """
+        if not self.retention_days:
+            return 0
+        cutoff = int((now or time.time()) - self.retention_days * 86400)
+        with self.conn:
+            removed = self.conn.execute("DELETE FROM items WHERE first_seen < ?", (cutoff,)).rowcount
+            self.conn.execute(
+                "DELETE FROM run_items WHERE run_id IN (SELECT run_id FROM runs WHERE started_at < ?)",
+                (cutoff,),
+            )
+            self.conn.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,))
+        if removed:
+            logger.info(f"历史条目库：清理 {removed} 条超过 {self.retention_days:g} 天的条目")
+        return removed
+
+    def add_items(self, items, run_id: str | None = None) -> int:
+        """
+        批量写入拉取到的条目（已存在的 id 跳过），并登记本次运行的成员关系
+
+        Args:
+            items: NewsItem 列表
+            run_id: 运行 id，传入时写入 run_items
+
+        Returns:
+            int: 新写入条数
+        """
+        now = int(time.time())
+        item_rows = [
+            (
+                item.id,
+                item.title,
+                item.summary,
+                item.link,
+                item.source,
+                json.dumps(list(item.categories), ensure_ascii=False),
+                item.published,
+                now,
+            )
+            for item in items
+            if item.id
+        ]
+        if not item_rows:
+            return 0
+
+        added = 0
+        with self.conn:
+            for batch in _batches(item_rows):
+                # INSERT OR IGNORE 跳过的行不计入 rowcount
+                added += self.conn.executemany(
+                    "INSERT OR IGNORE INTO items"
+                    "(id, title, summary, link, source, categories, published, first_seen) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                ).rowcount
+
+            if run_id:
+                for batch in _batches(item_rows):
+                    self.conn.executemany(
+                        "INSERT OR IGNORE INTO run_items(run_id, item_id) VALUES (?, ?)",
+                        [(run_id, row[0]) for row in batch],
+                    )
+
+        return added
+
+    def record_classification(self, run_id: str, blocks):
+        """记录分类结果：每个 block 中的条目写入 category 与 H 编号（聚类 members 记为所在条目的编号）"""
+        rows = [
+            (block.get("category"), item.get("id"), run_id, entry.get("item_id"))
+            for block in blocks
+            for item in block.get("items", [])
+            for entry in [item, *(item.get("members") or [])]
+            if entry.get("item_id")
+        ]
+        with self.conn:
+            for batch in _batches(rows):
+                self.conn.executemany(
+                    "UPDATE run_items SET category = ?, ref_id = ? WHERE run_id = ? AND item_id = ?",
+                    batch,
+                )
+
+    def record_risk(self, run_id: str, items):
+        """记录风险评估结果（ds_risk，聚类 members 与所在条目相同）"""
+        rows = [
+            (item.get("ds_risk"), run_id, entry.get("item_id"))
+            for item in items
+            for entry in [item, *(item.get("members") or [])]
+            if entry.get("item_id")
+        ]
+        with self.conn:
+            for batch in _batches(rows):
+                self.conn.executemany(
+                    "UPDATE run_items SET ds_risk = ? WHERE run_id = ? AND item_id = ?",
+                    batch,
+                )
+
+    # ---------- 查询 ----------
+
+    @staticmethod
+    def _to_news_item(row) -> NewsItem:
+        return NewsItem.from_raw({
+            "id": row["id"],
+            "title": row["title"],
+            "summaryText": row["summary"],
+            "link": row["link"],
+            "origin": {"title": row["source"]},
+            "categories": json.loads(row["categories"] or "[]"),
+            "published": row["published"],
+        })
+
+    def load_items(self, since: int, until: int | None = None) -> list[NewsItem]:
+        """
+        读取发布时间在 [since, until] 内的条目，按发布时间从新到旧
+
+        Returns:
+            list: NewsItem 列表，可直接交给 filter_ru / dedupe_items / Classify
+        """
+        until = int(until or time.time())
+        rows = self.conn.execute(
+            "SELECT * FROM items WHERE published BETWEEN ? AND ? ORDER BY published DESC",
+            (int(since), until),
+        ).fetchall()
+        return [self._to_news_item(row) for row in rows]
+
+    def search(self, query: str, since: int | None = None, until: int | None = None, limit: int = 50) -> list[dict]:
+        """
+        全文检索标题与摘要（FTS5 语法）
+
+        Returns:
+            list: [{"id", "title", "link", "source", "published"}, ...]，按相关度排序
+        """
+        sql = (
+            "SELECT items.id, items.title, items.link, items.source, items.published "
+            "FROM items_fts JOIN items ON items.rowid = items_fts.rowid "
+            "WHERE items_fts MATCH ?"
+        )
+        params = [query]
+        if since is not None:
+            sql += " AND items.published >= ?"
+            params.append(int(since))
+        if until is not None:
+            sql += " AND items.published <= ?"
+            params.append(int(until))
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(int(limit))
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def item_history(self, item_id: str) -> list[dict]:
+        """某条新闻出现在哪些运行中，以及每次的分类与风险结果"""
+        rows = self.conn.execute(
+            "SELECT runs.run_id, runs.started_at, run_items.category, run_items.ref_id, run_items.ds_risk "
+            "FROM run_items JOIN runs ON runs.run_id = run_items.run_id "
+            "WHERE run_items.item_id = ? ORDER BY runs.started_at",
+            (item_id,),
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,126 @@
+"""
+LLM 响应缓存（SQLite，按内容寻址）
+
+键为 (provider, model, prompt, 生成参数) 的 SHA-256，值为 JSON 载荷：
+- {"content": "..."}：正常响应
+- {"filtered": "原因"}：触发内容安全机制（重放时重新抛出 ContentFilteredException）
+- request_with_fallback 的完整结果（含 model_used / is_fallback / filter_reason）
+
+超过 TTL 的条目视为未命中并删除；总大小超过上限时按最近使用时间（LRU）淘汰。
+命中 / 未命中计入 llm_cache_hit_<provider> / llm_cache_miss_<provider>，淘汰条数计入 llm_cache_evicted。
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import settings
+from monitoring.metrics import metrics
+from utils.logger import get_logger
+
+logger = get_logger("storage.llm_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+
+def cache_key(provider: str, model: str | None, prompt: str, **params) -> str:
+    """provider + model + prompt + 生成参数的 SHA-256"""
+    raw = json.dumps([provider, model, prompt, params], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """LLM 响应缓存（单个 SQLite 文件，可跨线程使用）"""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+    ):
+        """
+        Args:
+            path: SQLite 文件路径，默认 settings.LLM_CACHE_PATH
+            ttl: 有效期（秒），默认 settings.LLM_CACHE_TTL
+            max_bytes: 载荷总大小上限，默认 settings.LLM_CACHE_MAX_MB
+        """
+        self.path = Path(path) if path else settings.LLM_CACHE_PATH
+        self.ttl = float(settings.LLM_CACHE_TTL if ttl is None else ttl)
+        self.max_bytes = int(max_bytes if max_bytes is not None else settings.LLM_CACHE_MAX_MB * 1024 * 1024)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def get(self, key: str, provider: str = "llm", now: float | None = None) -> dict | None:
+        """
+        读取缓存载荷；未命中或已过期返回 None（过期条目顺带删除）
+        """
+        now = time.time() if now is None else now
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT payload, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                metrics.increment_counter(f"llm_cache_miss_{provider}")
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+
+        metrics.increment_counter(f"llm_cache_hit_{provider}")
+        return json.loads(row[0])
+
+    def put(self, key: str, provider: str, model: str | None, payload: dict, now: float | None = None):
+        """写入缓存载荷，总大小超限时按 LRU 淘汰"""
+        now = time.time() if now is None else now
+        data = json.dumps(payload, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses(key, provider, model, payload, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, data, size, now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        victims = []
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_used, created_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        metrics.increment_counter("llm_cache_evicted", len(victims))
+        logger.debug(f"LLM 缓存超出上限，淘汰 {len(victims)} 条")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
@@ -0,0 +1,101 @@
+"""
+逐条风险判定缓存（SQLite）
+
+风险评估 prompt 中的编号是位置编号（1、2 ... 对应 H1、H2），无法跨运行复用；
+这里以 story_key（规范化标题 + 链接哈希）为键保存每条新闻的 ds_risk，
+有效期内再次出现的新闻直接使用缓存结果，只有新条目发给 Gemini。
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from config import settings
+from preprocessing.dedupe import story_key
+from utils.logger import get_logger
+
+logger = get_logger("storage.risk_cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    key TEXT PRIMARY KEY,
+    risk TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_verdicts_updated ON verdicts(updated_at);
+"""
+
+# IN (...) 每批键数（低于 SQLite 变量个数上限）
+_BATCH_SIZE = 500
+
+VERDICTS = ("low", "high")
+
+
+class RiskVerdictCache:
+    """story_key -> ds_risk（单个 SQLite 文件，可跨线程使用）"""
+
+    def __init__(self, path: Path | str | None = None, hours: float | None = None):
+        """
+        Args:
+            path: SQLite 文件路径，默认 settings.RISK_CACHE_PATH
+            hours: 判定结果有效期（小时），默认 settings.RISK_CACHE_HOURS
+        """
+        self.path = Path(path) if path else settings.RISK_CACHE_PATH
+        self.ttl = float(settings.RISK_CACHE_HOURS if hours is None else hours) * 3600
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def key(item) -> str:
+        """
+        分类输出条目（dict）的内容键
+
+        聚类合并的条目连同 members 一起判定，键中包含各 member 的 story_key：
+        簇的组成变化后视为新条目重新评估
+        """
+        key = story_key(item.get("title") or "", item.get("link") or "")
+        members = item.get("members") or []
+        if members:
+            member_keys = sorted(story_key(m.get("title") or "", m.get("link") or "") for m in members)
+            key += "|" + hashlib.sha1("\n".join(member_keys).encode("utf-8")).hexdigest()[:16]
+        return key
+
+    def get_many(self, keys, now: float | None = None) -> dict:
+        """
+        批量读取有效期内的判定结果
+
+        Returns:
+            dict: {键: "low" / "high"}，未缓存或已过期的键不出现
+        """
+        now = time.time() if now is None else now
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _BATCH_SIZE):
+                batch = keys[i:i + _BATCH_SIZE]
+                rows = self.conn.execute(
+                    f"SELECT key, risk FROM verdicts WHERE updated_at >= ? AND key IN ({','.join('?' * len(batch))})",
+                    (now - self.ttl, *batch),
+                )
+                found.update(rows)
+        return found
+
+    def put_many(self, verdicts: dict, now: float | None = None):
+        """写入判定结果（只保存 low / high），并清理过期条目"""
+        now = time.time() if now is None else now
+        rows = [(key, risk, now) for key, risk in verdicts.items() if risk in VERDICTS]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO verdicts(key, risk, updated_at) VALUES (?, ?, ?)", rows
+            )
+            self.conn.execute("DELETE FROM verdicts WHERE updated_at < ?", (now - self.ttl,))
@@ -0,0 +1,218 @@
+"""
+已投递新闻的跨运行记录（按天轮换的持久化 Bloom 过滤器）
+
+每天（UTC）一个代际文件 data/seen_stories/YYYY-MM-DD.bloom，只在当天的代际中写入，
+查询时检查覆盖最近 N 小时的各代际（按天取整，所以实际回看窗口会略长于 N 小时）。
+超出保留期的代际文件在保存时删除，内存与磁盘占用都有上界。
+
+键为 "分类 + story_key"，同一条新闻在不同分类下分别计算。Bloom 过滤器只有假阳性：
+极少数新条目可能被误判为已投递（概率由 SEEN_FILTER_FP_RATE 控制），已投递的条目不会漏判。
+"""
+
+import hashlib
+import math
+import os
+import struct
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import settings
+from monitoring.metrics import metrics
+from preprocessing.dedupe import story_key
+from utils.logger import get_logger
+
+logger = get_logger("storage.seen_filter")
+
+_MAGIC = b"BLM1"
+# magic, 哈希函数个数 k, 已写入条数, 位数 m
+_HEADER = struct.Struct("<4sIIQ")
+
+
+class BloomFilter:
+    """定长 Bloom 过滤器（bytearray 位图，双重哈希）"""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        if capacity <= 0 or not 0 < fp_rate < 1:
+            raise ValueError(f"Bloom 参数无效: capacity={capacity}, fp_rate={fp_rate}")
+        m = math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))
+        self.m = (m + 7) // 8 * 8
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray(self.m // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.k, self.count, self.m) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int) -> "BloomFilter":
+        magic, k, count, m = _HEADER.unpack_from(data)
+        if magic != _MAGIC or len(data) - _HEADER.size != m // 8:
+            raise ValueError("Bloom 文件格式无效")
+        bloom = cls.__new__(cls)
+        bloom.m, bloom.k, bloom.count, bloom.capacity = m, k, count, capacity
+        bloom.bits = bytearray(data[_HEADER.size:])
+        return bloom
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class SeenStories:
+    """已投递新闻集合：按天一个 BloomFilter 代际"""
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        hours: int | None = None,
+        capacity: int | None = None,
+        fp_rate: float | None = None,
+    ):
+        """
+        Args:
+            path: 代际文件目录，默认 settings.SEEN_FILTER_PATH
+            hours: 回看窗口（小时），默认 settings.SEEN_FILTER_HOURS
+            capacity: 每个代际的设计容量（条），默认 settings.SEEN_FILTER_CAPACITY
+            fp_rate: 设计容量下的假阳性率，默认 settings.SEEN_FILTER_FP_RATE
+        """
+        self.path = Path(path) if path else settings.SEEN_FILTER_PATH
+        self.hours = int(settings.SEEN_FILTER_HOURS if hours is None else hours)
+        self.capacity = int(capacity or settings.SEEN_FILTER_CAPACITY)
+        self.fp_rate = float(fp_rate or settings.SEEN_FILTER_FP_RATE)
+        self._generations = {}
+        self._dirty = set()
+
+    @staticmethod
+    def key(category: str, item) -> str:
+        """分类 + story_key（item 为分类输出的 dict 或 NewsItem）"""
+        return f"{category}\x1f{story_key(item.get('title') or '', item.get('link') or '')}"
+
+    # ---------- 代际 ----------
+
+    def _days(self, now: float) -> list[str]:
+        """覆盖 [now - hours, now] 的代际（从新到旧）"""
+        days = []
+        ts = now
+        start = now - self.hours * 3600
+        while True:
+            day = _day(ts)
+            if day not in days:
+                days.append(day)
+            if ts <= start:
+                break
+            ts = max(start, ts - 86400)
+        return days
+
+    def _file(self, day: str) -> Path:
+        return self.path / f"{day}.bloom"
+
+    def _generation(self, day: str, create: bool = False) -> BloomFilter | None:
+        bloom = self._generations.get(day)
+        if bloom is not None:
+            return bloom
+
+        file = self._file(day)
+        if file.exists():
+            try:
+                bloom = BloomFilter.from_bytes(file.read_bytes(), self.capacity)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"已投递记录读取失败，按空记录处理: {file}: {e}")
+        if bloom is None:
+            if not create:
+                return None
+            bloom = BloomFilter(self.capacity, self.fp_rate)
+        self._generations[day] = bloom
+        return bloom
+
+    # ---------- 查询 / 写入 ----------
+
+    def seen(self, key: str, now: float | None = None) -> bool:
+        """最近 hours 小时内的代际中是否（可能）已有该键"""
+        now = time.time() if now is None else now
+        for day in self._days(now):
+            bloom = self._generation(day)
+            if bloom is not None and key in bloom:
+                return True
+        return False
+
+    def add(self, keys, now: float | None = None):
+        """把键写入当天的代际"""
+        now = time.time() if now is None else now
+        day = _day(now)
+        bloom = self._generation(day, create=True)
+        before = bloom.count
+        for key in keys:
+            bloom.add(key)
+        if before <= bloom.capacity < bloom.count:
+            logger.warning(f"已投递记录 {day} 超出设计容量 {bloom.capacity}，假阳性率将升高")
+        self._dirty.add(day)
+
+    def drop_delivered(self, block: dict, now: float | None = None) -> tuple[dict, list]:
+        """
+        去掉分类 block 中最近 hours 小时已投递过的条目，剩余条目重新编号 H1、H2 ...
+
+        Args:
+            block: {"category": ..., "items": [...]}（Classify 输出）
+
+        Returns:
+            tuple: (新 block, 被去掉的条目列表)
+        """
+        category = block.get("category", "")
+        kept, dropped = [], []
+        for item in block.get("items", []):
+            (dropped if self.seen(self.key(category, item), now) else kept).append(item)
+
+        if not dropped:
+            return block, []
+
+        renumbered = [dict(item, id=f"H{n}") for n, item in enumerate(kept, start=1)]
+        metrics.increment_counter(f"seen_dropped_{category}", len(dropped))
+        logger.info(f"分类 [{category}] 去掉 {len(dropped)} 条已投递新闻，剩余 {len(kept)} 条")
+        return dict(block, items=renumbered), dropped
+
+    def mark_delivered(self, block: dict, now: float | None = None):
+        """记录 block 中的条目（含聚类合并进来的 members）已投递"""
+        category = block.get("category", "")
+        self.add(
+            (
+                self.key(category, entry)
+                for item in block.get("items", [])
+                for entry in [item, *(item.get("members") or [])]
+            ),
+            now,
+        )
+
+    # ---------- 持久化 ----------
+
+    def save(self, now: float | None = None):
+        """写回有改动的代际（原子替换），并删除超出保留期的代际文件"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        for day in sorted(self._dirty):
+            file = self._file(day)
+            tmp = file.with_suffix(".bloom.tmp")
+            tmp.write_bytes(self._generations[day].to_bytes())
+            os.replace(tmp, file)
+        self._dirty.clear()
+
+        keep = set(self._days(time.time() if now is None else now))
+        for file in self.path.glob("*.bloom"):
+            if file.stem not in keep:
+                file.unlink(missing_ok=True)
+                self._generations.pop(file.stem, None)
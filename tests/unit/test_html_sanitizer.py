@@ -0,0 +1,94 @@
+"""
+测试摘要 HTML 清洗与 token 估算
+"""
+
+from monitoring.metrics import metrics
+from preprocessing.sanitize import sanitize_block
+from utils.html_sanitizer import html_to_text, sanitize_summary, strip_boilerplate
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+
+class TestHtmlToText:
+    """测试去标签与实体"""
+
+    def test_strip_tags_and_entities(self):
+        """测试去标签、解码实体、跳过脚本和图片说明"""
+        html = (
+            "<div><p>Rates &amp; markets</p><script>track()</script>"
+            "<figure><img src='x.jpg'><figcaption>Photo credit</figcaption></figure>"
+            "<p>Second&nbsp;paragraph</p></div>"
+        )
+        assert html_to_text(html) == "Rates & markets Second paragraph"
+
+    def test_plain_text_fast_path(self):
+        """测试纯文本只合并空白"""
+        assert html_to_text("  plain \n text ") == "plain text"
+
+    def test_limit_stops_early(self):
+        """测试收集到上限后停止解析"""
+        html = "<p>" + "word " * 5000 + "</p><p>TAIL</p>"
+        text = html_to_text(html, limit=100)
+        assert "TAIL" not in text
+        assert len(text) < 5000
+
+
+class TestSanitizeSummary:
+    """测试模板文字去除与预算截断"""
+
+    def test_boilerplate(self):
+        """测试去掉常见模板文字"""
+        assert strip_boilerplate("Body text. The post Title appeared first on Site.") == "Body text."
+        assert strip_boilerplate("正文内容。阅读全文>>") == "正文内容。"
+        assert strip_boilerplate("Body. Continue reading...") == "Body."
+
+    def test_char_budget(self):
+        """测试字符预算（含省略号）且重复清洗结果不变"""
+        text = sanitize_summary("<p>" + "alpha beta " * 100 + "</p>", max_chars=60)
+        assert len(text) <= 60
+        assert text.endswith("…")
+        assert sanitize_summary(text, max_chars=60) == text
+
+    def test_token_budget(self):
+        """测试 token 预算"""
+        text = sanitize_summary("中文摘要" * 100, max_tokens=30)
+        assert estimate_tokens(text) <= 30
+        assert sanitize_summary(text, max_tokens=30) == text
+
+    def test_greader_dict(self):
+        """测试 greader 的 {"content": ...} 形式"""
+        assert sanitize_summary({"content": "<b>Hi</b>"}) == "Hi"
+
+
+class TestTokens:
+    """测试 token 估算"""
+
+    def test_estimate(self):
+        """测试中英文估算"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("中文") == 2
+        assert estimate_tokens("abcdefgh") == 2
+
+    def test_truncate(self):
+        """测试按 token 截取前缀"""
+        assert truncate_to_tokens("abcdefgh", 1) == "abcd"
+        assert truncate_to_tokens("short", 10) == "short"
+
+
+class TestSanitizeBlock:
+    """测试分类 block 的摘要清洗阶段"""
+
+    def test_counts_removed_chars(self):
+        """测试原地清洗并按分类记录去掉的字符数"""
+        before = metrics.counters.get("summary_chars_removed_科技", 0)
+        block = {
+            "category": "科技",
+            "items": [
+                {"id": "H1", "title": "t", "summary": "<p>New <b>chip</b></p><img src='a.png'>"},
+                {"id": "H2", "title": "t", "summary": "plain"},
+            ],
+        }
+        removed = sanitize_block(block, max_chars=400, max_tokens=0)
+
+        assert [it["summary"] for it in block["items"]] == ["New chip", "plain"]
+        assert removed == len("<p>New <b>chip</b></p><img src='a.png'>") - len("New chip")
+        assert metrics.counters["summary_chars_removed_科技"] == before + removed
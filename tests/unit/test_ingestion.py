@@ -0,0 +1,380 @@
+"""
+测试数据获取模块
+"""
+
+import json
+import os
+import stat
+import time
+
+import pytest
+from config import settings
+from ingestion.RSSclient import RSSClient
+from ingestion.auth_cache import AuthTokenCache
+from ingestion.incremental import IncrementalStore, item_timestamp
+from ingestion.snapshot import load_snapshot
+from ingestion.stream_decode import StreamingDecoder, project_item
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+    def iter_content(self, chunk_size=1):
+        body = json.dumps(self.payload, ensure_ascii=False).encode("utf-8")
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """按 continuation 返回预设分页数据"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+        # 测试中 token 不过期
+        self.auth_expires_at = float("inf")
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls.append(dict(params))
+        key = params.get("c")
+        return FakeResponse(dict(self.pages[key]))
+
+
+def _make_client(pages):
+    client = RSSClient.__new__(RSSClient)
+    client.newsapi = "http://freshrss.test/reading-list"
+    client.timeout = 5
+    client.session = FakeSession(pages)
+    client.mode = "live"
+    client.snapshot_path = None
+    client._snapshot = None
+    client._snapshot_depth = 0
+    return client
+
+
+PAGES = {
+    None: {"id": "reading-list", "items": [{"id": "a"}, {"id": "b"}], "continuation": "p2"},
+    "p2": {"id": "reading-list", "items": [{"id": "c"}], "continuation": "p3"},
+    "p3": {"id": "reading-list", "items": []},
+}
+
+
+class TestPagedFetch:
+    """测试分页拉取"""
+
+    def test_iter_news_follows_continuation(self):
+        """测试按 continuation 逐页拉取"""
+        client = _make_client(PAGES)
+        ids = [item["id"] for item in client.iter_news(hours=24, page_size=2)]
+        assert ids == ["a", "b", "c"]
+        assert [call.get("c") for call in client.session.calls] == [None, "p2", "p3"]
+        assert all(call["n"] == 2 for call in client.session.calls)
+
+    def test_get_news_keeps_dict_shape(self):
+        """测试 get_news 返回结构不变"""
+        client = _make_client(PAGES)
+        data = client.get_news(hours=24)
+        assert data["id"] == "reading-list"
+        assert [item["id"] for item in data["items"]] == ["a", "b", "c"]
+        assert "continuation" not in data
+
+    def test_get_news_with_explicit_n(self):
+        """测试显式传入 n 时只请求一次"""
+        client = _make_client(PAGES)
+        data = client.get_news(hours=24, n=10)
+        assert len(data["items"]) == 2
+        assert len(client.session.calls) == 1
+
+    def test_invalid_hours(self):
+        """测试非法 hours"""
+        client = _make_client(PAGES)
+        with pytest.raises(ValueError):
+            list(client.iter_news(hours=0))
+
+
+class TestIncrementalStore:
+    """测试增量拉取本地条目库"""
+
+    def test_item_timestamp_prefers_crawl_time(self):
+        """测试时间戳优先取抓取时间"""
+        assert item_timestamp({"crawlTimeMsec": "1700000000123", "published": 1}) == 1700000000
+        assert item_timestamp({"timestampUsec": "1700000000123456"}) == 1700000000
+        assert item_timestamp({"published": 1700000000}) == 1700000000
+        assert item_timestamp({}) == 0
+
+    def test_merge_prune_window_roundtrip(self, tmp_path):
+        """测试合并、淘汰、窗口重建与持久化"""
+        store = IncrementalStore(tmp_path / "store.json").load()
+        added = store.merge([
+            {"id": "a", "published": 100},
+            {"id": "b", "published": 300},
+            {"id": "a", "published": 100},
+        ])
+        assert added == 2
+        assert store.high_water_mark == 300
+
+        assert store.prune(200) == 1
+        store.merge([{"id": "c", "published": 400}])
+        store.save()
+
+        reloaded = IncrementalStore(tmp_path / "store.json").load()
+        assert reloaded.high_water_mark == 400
+        assert [item["id"] for item in reloaded.window(200)] == ["c", "b"]
+
+    def test_get_news_incremental_requests_since_high_water_mark(self, tmp_path):
+        """测试增量拉取只请求高水位之后的条目"""
+        now = int(time.time())
+        store = IncrementalStore(tmp_path / "store.json")
+        store.merge([{"id": "old", "published": now - 600}])
+        store.save()
+
+        client = _make_client({None: {"items": [{"id": "new", "published": now}]}})
+        data = client.get_news_incremental(hours=24, store=store)
+
+        assert [item["id"] for item in data["items"]] == ["new", "old"]
+        expected_ot = now - 600 - settings.FRESHRSS_INCREMENTAL_OVERLAP
+        assert client.session.calls[0]["ot"] == expected_ot
+
+
+def _chunks(payload, size):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestStreamingDecoder:
+    """测试流式解码与字段投影"""
+
+    PAYLOAD = {
+        "id": "user/-/state/com.google/reading-list",
+        "updated": 1700000000,
+        "items": [
+            {
+                "id": "tag:1",
+                "title": "新闻标题一",
+                "published": 1700000000,
+                "categories": ["user/-/label/俄罗斯"],
+                "canonical": [{"href": "https://a.test/1", "type": "text/html"}],
+                "origin": {"title": "BBC", "htmlUrl": "https://bbc.test", "streamId": "feed/1"},
+                "summary": {"content": "<p>摘要</p>", "direction": "ltr"},
+                "content": {"content": "x" * 1000},
+                "enclosure": [{"href": "https://a.test/1.jpg"}],
+                "annotations": [],
+            },
+            {"id": "tag:2", "title": "Second \"quoted\" title", "published": 1700000001},
+        ],
+        "continuation": "next-page",
+    }
+
+    def test_decode_matches_projected_json(self):
+        """测试任意分块下解码结果与整体解析后投影一致"""
+        expected_items = [project_item(item) for item in self.PAYLOAD["items"]]
+        for size in (1, 7, 64, 1 << 16):
+            data = StreamingDecoder(_chunks(self.PAYLOAD, size)).decode()
+            assert data["items"] == expected_items
+            assert data["updated"] == 1700000000
+            assert data["continuation"] == "next-page"
+
+    def test_projection_drops_unused_fields(self):
+        """测试投影丢弃不用的字段"""
+        item = project_item(self.PAYLOAD["items"][0])
+        assert "content" not in item
+        assert "enclosure" not in item
+        assert item["canonical"] == [{"href": "https://a.test/1"}]
+        assert item["origin"] == {"title": "BBC"}
+        assert item["summary"] == {"content": "<p>摘要</p>"}
+
+    def test_empty_and_truncated(self):
+        """测试空 items 与截断响应"""
+        data = StreamingDecoder([b'{"items": [], "id": "x"}']).decode()
+        assert data == {"id": "x", "items": []}
+        with pytest.raises(ValueError):
+            StreamingDecoder([b'{"items": [{"id": "a"}']).decode()
+
+
+class TestAuthTokenCache:
+    """测试 FreshRSS token 缓存"""
+
+    def test_disk_roundtrip_and_permissions(self, tmp_path):
+        """测试磁盘缓存可被新实例读取，且权限为 0600"""
+        path = tmp_path / "auth.json"
+        AuthTokenCache(path, ttl=60).set("disk-key", "GoogleLogin auth=abc")
+        AuthTokenCache._memory.pop("disk-key", None)
+
+        assert AuthTokenCache(path, ttl=60).get("disk-key") == "GoogleLogin auth=abc"
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    def test_expired_and_invalidated(self, tmp_path):
+        """测试过期与失效"""
+        cache = AuthTokenCache(tmp_path / "auth.json", ttl=-1)
+        cache.set("expired-key", "token")
+        assert cache.get("expired-key") is None
+
+        cache = AuthTokenCache(tmp_path / "auth.json", ttl=60)
+        cache.set("valid-key", "token")
+        cache.invalidate("valid-key")
+        assert cache.get("valid-key") is None
+
+    def test_reauthenticates_once_on_401(self, tmp_path):
+        """测试收到 401 时重新认证并重试"""
+
+        class ExpiringSession(FakeSession):
+            def get(self, url, params=None, timeout=None, stream=False):
+                self.calls.append(dict(params))
+                if self.headers.get("Authorization") != "fresh":
+                    return FakeResponse({}, status_code=401)
+                return FakeResponse({"items": [{"id": "a"}]})
+
+        client = _make_client({})
+        client.session = ExpiringSession({})
+        client.session.headers = {"Authorization": "stale"}
+        client.auth_url = "http://freshrss.test/login"
+        client.auth_cache = AuthTokenCache(tmp_path / "auth.json", ttl=60)
+        client._get_freshrss_auth = lambda: "fresh"
+
+        data = client.get_news(hours=24, n=10)
+        assert data["items"] == [{"id": "a"}]
+        assert len(client.session.calls) == 2
+        assert client.auth_cache.get(client._auth_key) == "fresh"
+
+    def test_session_token_refreshed_after_ttl(self, tmp_path):
+        """测试 ClientLogin 不持有会话锁，token 过了 TTL 后下一次请求前换新"""
+        logins = []
+
+        def login():
+            assert not RSSClient._sessions_lock.locked()
+            logins.append(1)
+            return f"token-{len(logins)}"
+
+        client = _make_client(PAGES)
+        client.auth_url = "http://freshrss.test/ttl-login"
+        client.auth_cache = AuthTokenCache(tmp_path / "auth.json", ttl=60)
+        client._get_freshrss_auth = login
+        try:
+            session = client._get_session()
+            assert session.headers["Authorization"] == "token-1"
+            assert client._get_session() is session and len(logins) == 1
+
+            # 模拟 TTL 到期：会话与缓存中的 token 都已过期
+            session.auth_expires_at = time.time() - 1
+            client.auth_cache.invalidate(client._auth_key)
+            fake = client.session
+            fake.auth_expires_at = session.auth_expires_at
+            fake.headers = {}
+            client.get_news(hours=24, n=10)
+            assert fake.headers["Authorization"] == "token-2"
+            assert fake.auth_expires_at > time.time()
+        finally:
+            RSSClient._sessions.pop(client._auth_key, None)
+
+
+class TestShardedFetch:
+    """测试按时间分片并发拉取"""
+
+    def test_shards_cover_window_and_dedupe_boundaries(self):
+        """测试分片覆盖整个窗口、按时间排序并去除边界重复"""
+        now = int(time.time())
+        items = [{"id": f"i{k}", "published": now - k * 600} for k in range(0, 24 * 6)]
+
+        class RangeSession(FakeSession):
+            def get(self, url, params=None, timeout=None, stream=False):
+                self.calls.append(dict(params))
+                ot, nt = params["ot"], params.get("nt", now)
+                # 边界两侧都包含，模拟相邻分片返回同一条目
+                return FakeResponse({"items": [it for it in items if ot <= it["published"] <= nt]})
+
+        client = _make_client({})
+        client.session = RangeSession({})
+        data = client.get_news_sharded(hours=24, shards=4, workers=2)
+
+        ids = [item["id"] for item in data["items"]]
+        assert len(ids) == len(set(ids))
+        assert set(ids) == {item["id"] for item in items}
+        published = [item["published"] for item in data["items"]]
+        assert published == sorted(published, reverse=True)
+        assert len(client.session.calls) == 4
+        assert all("nt" in call for call in client.session.calls)
+
+
+class TestServerSideExclude:
+    """测试服务端排除参数"""
+
+    def test_exclude_targets_sent_as_xt(self, monkeypatch):
+        """测试请求带上 xt 参数"""
+        monkeypatch.setattr(settings, "FRESHRSS_SERVER_EXCLUDE", True)
+        client = _make_client(PAGES)
+        list(client.iter_news(hours=24, page_size=2))
+        assert all(call["xt"] == settings.FRESHRSS_EXCLUDE_TARGETS for call in client.session.calls)
+        assert settings.RUSSIA_LABEL in settings.FRESHRSS_EXCLUDE_TARGETS
+
+    def test_exclude_targets_disabled(self, monkeypatch):
+        """测试关闭服务端排除"""
+        monkeypatch.setattr(settings, "FRESHRSS_SERVER_EXCLUDE", False)
+        client = _make_client(PAGES)
+        client.get_news(hours=24, n=10)
+        assert "xt" not in client.session.calls[0]
+
+
+class TestSnapshot:
+    """测试录制 / 回放"""
+
+    def test_record_then_replay(self, tmp_path):
+        """测试录制的快照可离线回放"""
+        path = tmp_path / "snap.json.gz"
+        client = _make_client(PAGES)
+        client.mode = "record"
+        client.snapshot_path = path
+        recorded = client.get_news(hours=24)
+
+        meta, data = load_snapshot(path)
+        assert meta["hours"] == 24
+        assert meta["item_count"] == 3
+        assert data == recorded
+
+        replay = RSSClient(mode="replay", snapshot_path=path)
+        assert replay.session is None
+        assert replay.get_news(hours=24)["items"] == recorded["items"]
+        pages = [items for _, items in replay.iter_pages(hours=24, page_size=2)]
+        assert [len(items) for items in pages] == [2, 1]
+
+    def test_snapshot_keeps_raw_items(self, tmp_path):
+        """测试快照保存投影前的完整条目，录制与回放返回的都是投影后的条目"""
+        path = tmp_path / "snap.json.gz"
+        raw = TestStreamingDecoder.PAYLOAD["items"]
+        client = _make_client({None: {"id": "reading-list", "items": raw}})
+        client.mode = "record"
+        client.snapshot_path = path
+        recorded = client.get_news(hours=24)
+
+        _, data = load_snapshot(path)
+        assert data["items"] == raw
+        projected = [project_item(item) for item in raw]
+        assert recorded["items"] == projected
+        assert RSSClient(mode="replay", snapshot_path=path).get_news(hours=24)["items"] == projected
+
+    def test_record_iter_pages(self, tmp_path):
+        """测试分页拉取也会录制"""
+        path = tmp_path / "snap.json.gz"
+        client = _make_client(PAGES)
+        client.mode = "record"
+        client.snapshot_path = path
+        ids = [item["id"] for item in client.iter_news(hours=24, page_size=2)]
+
+        _, data = load_snapshot(path)
+        assert [item["id"] for item in data["items"]] == ids
+
+    def test_replay_requires_path(self, monkeypatch):
+        """测试回放缺少快照路径"""
+        monkeypatch.setattr(settings, "FRESHRSS_SNAPSHOT", "")
+        with pytest.raises(ValueError):
+            RSSClient(mode="replay")
@@ -0,0 +1,79 @@
+"""
+测试历史条目库
+"""
+
+import time
+
+import pytest
+from preprocessing.classify import Classify
+from preprocessing.news_item import NewsItem
+from storage.item_store import ItemStore
+
+
+def _item(i, title, published):
+    return NewsItem.from_raw({
+        "id": f"tag:{i}",
+        "title": title,
+        "summaryText": f"summary of {title}",
+        "canonical": [{"href": f"https://news.test/{i}"}],
+        "origin": {"title": "Reuters Business"},
+        "categories": ["user/-/label/World"],
+        "published": published,
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ItemStore(tmp_path / "items.sqlite3") as s:
+        yield s
+
+
+class TestItemStore:
+    """测试写入、检索与重跑"""
+
+    def test_add_items_is_idempotent(self, store):
+        """测试重复写入同一条目只保留一份"""
+        items = [_item(1, "Stock market rallies", 1000), _item(2, "Bank raises rates", 2000)]
+        assert store.add_items(items) == 2
+        assert store.add_items(items) == 0
+
+    def test_search_and_window(self, store):
+        """测试全文检索与按窗口读取"""
+        store.add_items([_item(1, "Stock market rallies", 1000), _item(2, "Bank raises rates", 2000)])
+        assert [row["id"] for row in store.search("market")] == ["tag:1"]
+        assert store.search("market", since=1500) == []
+
+        items = store.load_items(since=0, until=3000)
+        assert [item.id for item in items] == ["tag:2", "tag:1"]
+        assert items[0].link == "https://news.test/2"
+        assert items[0].source_lower == "reuters business"
+
+    def test_run_history(self, store):
+        """测试记录每次运行的分类与风险结果"""
+        items = [_item(1, "Stock market rallies", 1000)]
+        store.start_run("run-1", hours=24, categories=["财经"])
+        store.add_items(items, run_id="run-1")
+
+        block = Classify(category="财经")._process_headlines(items)
+        block["category"] = "财经"
+        store.record_classification("run-1", [block])
+        store.record_risk("run-1", [dict(block["items"][0], ds_risk="low")])
+
+        history = store.item_history("tag:1")
+        assert len(history) == 1
+        assert history[0]["category"] == "财经"
+        assert history[0]["ref_id"] == "H1"
+        assert history[0]["ds_risk"] == "low"
+
+    def test_prune_old_entries(self, tmp_path):
+        """测试超过保留期的条目、全文索引与运行记录被清理"""
+        with ItemStore(tmp_path / "prune.sqlite3", retention_days=30) as store:
+            store.start_run("run-1", hours=24)
+            store.add_items([_item(1, "Stock market rallies", 1000)], run_id="run-1")
+
+            later = time.time() + 31 * 86400
+            assert store.prune(now=later) == 1
+            assert store.load_items(since=0, until=3000) == []
+            assert store.search("market") == []
+            assert store.item_history("tag:1") == []
+            assert store.add_items([_item(1, "Stock market rallies", 1000)]) == 1
@@ -0,0 +1,563 @@
+"""
+测试异步 LLMClient 与并发摘要生成
+"""
+
+import asyncio
+import json
+import re
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from config import settings
+from llms import llms as llms_module
+from llms.build_prompt import build_headline_prompts
+from llms.exceptions import ContentFilteredException
+from llms.llms import LLMClient, get_llm_client, reset_llm_clients
+from monitoring.metrics import metrics
+from storage.llm_cache import LLMCache, cache_key
+from workflows.summary_generation import arun_summary_generation_pipeline, run_summary_generation_pipeline
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("DEEPSEEK_TOKEN", "ds-test")
+    monkeypatch.setenv("GEMINI_TOKEN", "gm-test")
+    return LLMClient(timeout=5, cache=False)
+
+
+def _mock_http(monkeypatch, handler):
+    """让 LLMClient 创建的 AsyncClient 走 MockTransport，返回已创建的客户端列表"""
+    created = []
+    real = httpx.AsyncClient
+
+    def factory(**kwargs):
+        http = real(transport=httpx.MockTransport(handler), **kwargs)
+        created.append(http)
+        return http
+
+    monkeypatch.setattr(llms_module.httpx, "AsyncClient", factory)
+    return created
+
+
+class _FakeGenai:
+    """替代 genai.Client：aio.models 上挂测试提供的方法，记录 aclose / close"""
+
+    def __init__(self, methods, created):
+        self.closed = False
+        self.aio = types.SimpleNamespace(models=types.SimpleNamespace(**methods), aclose=self._aclose)
+        self.aio_closed = False
+        created.append(self)
+
+    async def _aclose(self):
+        self.aio_closed = True
+
+    def close(self):
+        self.closed = True
+
+
+def _mock_genai(monkeypatch, **methods):
+    """让 LLMClient 按事件循环创建的 genai 异步客户端使用给定的方法，返回已创建的客户端列表"""
+    created = []
+    monkeypatch.setattr(llms_module.genai, "Client", lambda api_key: _FakeGenai(methods, created))
+    return created
+
+
+def _completion(content):
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+def _sse(*deltas, finish_reason=None):
+    """DeepSeek SSE 响应：每个 delta 一个数据块，最后一块带 finish_reason"""
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": d}, "finish_reason": None}]})
+        for d in deltas
+    ]
+    lines.append("data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": finish_reason or "stop"}]}))
+    lines.append("data: [DONE]")
+    return httpx.Response(
+        200, headers={"content-type": "text/event-stream"}, content="\n\n".join(lines).encode("utf-8")
+    )
+
+
+class TestAsyncDeepseek:
+    """测试 arequest_deepseek"""
+
+    def test_success_and_pooling(self, client, monkeypatch):
+        """测试正常返回，且同一事件循环内复用连接池"""
+        seen = []
+
+        def handler(request):
+            body = json.loads(request.content)
+            seen.append((request.headers["Authorization"], body["messages"][0]["content"]))
+            return _completion(f"echo:{body['messages'][0]['content']}")
+
+        created = _mock_http(monkeypatch, handler)
+
+        async def run():
+            try:
+                return await asyncio.gather(
+                    client.arequest_deepseek("a"), client.arequest_deepseek("b"),
+                )
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(run()) == ["echo:a", "echo:b"]
+        assert len(created) == 1
+        assert sorted(seen) == [("Bearer ds-test", "a"), ("Bearer ds-test", "b")]
+
+    def test_async_clients_per_event_loop(self, client, monkeypatch):
+        """测试每个事件循环使用新的 httpx / genai 异步客户端，aclose 释放二者，漏调 aclose 时 asyncio.run 收尾也会释放"""
+        created = _mock_http(monkeypatch, lambda request: _completion("ok"))
+
+        async def generate_content(model, contents):
+            return types.SimpleNamespace(text="g")
+
+        genai_created = _mock_genai(monkeypatch, generate_content=generate_content)
+        monkeypatch.setattr(settings, "LLM_STREAM", False)
+
+        async def run(close):
+            try:
+                return [await client.arequest_deepseek("a"), await client.arequest_gemini("b")]
+            finally:
+                if close:
+                    await client.aclose()
+
+        assert asyncio.run(run(close=True)) == ["ok", "g"]
+        assert created[0].is_closed and genai_created[0].aio_closed and genai_created[0].closed
+
+        assert asyncio.run(run(close=False)) == ["ok", "g"]
+        assert created[1].is_closed and genai_created[1].aio_closed and genai_created[1].closed
+        assert client._http is None
+
+        assert asyncio.run(run(close=True)) == ["ok", "g"]
+        assert len(created) == 3 and len(genai_created) == 3
+        assert all(http.is_closed for http in created)
+        assert all(g.aio_closed and g.closed for g in genai_created)
+
+    def test_http_400_is_filtered(self, client, monkeypatch):
+        """测试 HTTP 400 抛出 ContentFilteredException"""
+        _mock_http(monkeypatch, lambda request: httpx.Response(400, json={}))
+        with pytest.raises(ContentFilteredException):
+            asyncio.run(client.arequest_deepseek("x"))
+
+    def test_empty_content_is_filtered(self, client, monkeypatch):
+        """测试空返回视为触发风控"""
+        _mock_http(monkeypatch, lambda request: _completion("  "))
+        with pytest.raises(ContentFilteredException):
+            asyncio.run(client.arequest_deepseek("x"))
+
+    def test_server_error(self, client, monkeypatch):
+        """测试 5xx 转为 RuntimeError"""
+        _mock_http(monkeypatch, lambda request: httpx.Response(503, text="busy"))
+        with pytest.raises(RuntimeError, match="DeepSeek API 请求失败"):
+            asyncio.run(client.arequest_deepseek("x"))
+
+
+class TestStreaming:
+    """测试流式请求"""
+
+    def test_stream_chunks_and_timing(self, client, monkeypatch):
+        """测试逐块产出，请求体带 stream 参数，并记录首 token 耗时"""
+        bodies = []
+
+        def handler(request):
+            bodies.append(json.loads(request.content))
+            return _sse("你", "好", "")
+
+        _mock_http(monkeypatch, handler)
+        before = metrics.counters["llm_stream_deepseek"]
+
+        async def run():
+            return [piece async for piece in client.astream_deepseek("x")]
+
+        assert asyncio.run(run()) == ["你", "好"]
+        assert bodies[0]["stream"] is True
+        assert metrics.counters["llm_stream_deepseek"] == before + 1
+        assert "llm_ttft_deepseek" in metrics.timings
+
+    def test_blank_stream_filtered_before_output(self, client, monkeypatch):
+        """测试只有空白的流不产出任何内容，直接抛出 ContentFilteredException"""
+        _mock_http(monkeypatch, lambda request: _sse(" ", "\n"))
+        received = []
+
+        async def run():
+            async for piece in client.astream_deepseek("x"):
+                received.append(piece)
+
+        with pytest.raises(ContentFilteredException, match="响应文本为空"):
+            asyncio.run(run())
+        assert received == []
+
+    def test_content_filter_triggers_fallback(self, client, monkeypatch):
+        """测试流中出现 finish_reason=content_filter 时切换 Gemini"""
+        monkeypatch.setattr(settings, "LLM_STREAM", True)
+        _mock_http(monkeypatch, lambda request: _sse("部分", finish_reason="content_filter"))
+
+        async def gemini(prompt):
+            return "from gemini"
+
+        monkeypatch.setattr(client, "_agenerate_gemini", gemini)
+        result = asyncio.run(client.arequest_with_fallback("x", primary="deepseek"))
+        assert result["model_used"] == "gemini"
+        assert result["filter_reason"] == "finish_reason=content_filter"
+
+    def test_gemini_stream(self, client, monkeypatch):
+        """测试 Gemini 流式请求跳过空块"""
+
+        class Chunk:
+            def __init__(self, text):
+                self.text = text
+
+        async def generate_content_stream(model, contents):
+            async def chunks():
+                for text in ("a", None, "b"):
+                    yield Chunk(text)
+            return chunks()
+
+        _mock_genai(monkeypatch, generate_content_stream=generate_content_stream)
+
+        async def run():
+            try:
+                return [piece async for piece in client.astream_gemini("x")]
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(run()) == ["a", "b"]
+
+
+class TestAsyncFallback:
+    """测试 arequest_with_fallback"""
+
+    def test_fallback_metadata(self, client, monkeypatch):
+        """测试主模型触发风控时切换备用模型并返回原因"""
+        _mock_http(monkeypatch, lambda request: httpx.Response(400, json={}))
+
+        async def gemini(prompt, temperature, max_tokens):
+            return "from gemini"
+
+        monkeypatch.setattr(client, "arequest_gemini", gemini)
+        result = asyncio.run(client.arequest_with_fallback("x", primary="deepseek"))
+        assert result == {
+            "content": "from gemini",
+            "model_used": "gemini",
+            "is_fallback": True,
+            "filter_reason": "HTTP 400 状态码",
+        }
+
+    def test_invalid_primary(self, client):
+        """测试 primary 参数校验"""
+        with pytest.raises(ValueError):
+            asyncio.run(client.arequest_with_fallback("x", primary="gpt"))
+
+
+class TestConcurrentSummaries:
+    """测试低 / 高风险摘要并发生成"""
+
+    def test_low_and_high_run_concurrently(self):
+        """两个请求互相等待对方开始：串行执行会超时"""
+        started = {"low": asyncio.Event(), "high": asyncio.Event()}
+
+        class FakeClient:
+            async def arequest_with_fallback(self, prompt, **kwargs):
+                started["low"].set()
+                await started["high"].wait()
+                return {"content": "<p>low [1]</p>", "model_used": "deepseek", "is_fallback": False}
+
+            async def arequest_gemini(self, prompt, **kwargs):
+                started["high"].set()
+                await started["low"].wait()
+                return "<p>high [1]</p>"
+
+        data = {
+            "section": "headline",
+            "category": "头条",
+            "items": [
+                {"id": "H1", "title": "a", "summary": "s", "link": "https://a.test", "ds_risk": "low"},
+                {"id": "H2", "title": "b", "summary": "s", "link": "https://b.test", "ds_risk": "high"},
+            ],
+        }
+
+        async def run():
+            return await asyncio.wait_for(arun_summary_generation_pipeline(data, llm_client=FakeClient()), 2)
+
+        result = asyncio.run(run())
+        assert "https://a.test" in result["low_risk_summary"]
+        assert "https://b.test" in result["high_risk_summary"]
+        assert result["meta"]["low_model_used"] == "deepseek"
+
+
+def _items(count, risk="low"):
+    return [
+        {"id": f"H{n}", "title": f"news {n}", "summary": "s" * 200, "link": f"https://n.test/{n}", "ds_risk": risk}
+        for n in range(1, count + 1)
+    ]
+
+
+def _echo_refs(prompt):
+    """每条素材写一段，引用 prompt 中的编号"""
+    return "<h1>t</h1>" + "".join(f"<p>n{n} [{n}]</p>" for n in re.findall(r"【(\d+)】", prompt))
+
+
+class TestChunkedSummaries:
+    """测试按 token 预算分块生成摘要"""
+
+    def test_chunks_continue_numbering(self):
+        """测试各块编号接续，refs 覆盖全部条目"""
+        block = {"section": "headline", "category": "头条", "items": _items(10)}
+        chunks = build_headline_prompts(block, risk_filter="low", chunk_tokens=200)
+        assert len(chunks) > 1
+        refs = [ref["n"] for chunk in chunks for ref in chunk["refs"]]
+        assert refs == list(range(1, 11))
+        assert "【1】" not in chunks[1]["prompt"]
+        assert len(build_headline_prompts(block, risk_filter="low", chunk_tokens=0)) == 1
+
+    def test_chunks_run_concurrently(self, monkeypatch):
+        """测试各块并发生成，合并后全部引用链接都在且高风险编号接在低风险之后"""
+        monkeypatch.setattr(settings, "SUMMARY_CHUNK_TOKENS", 200)
+        monkeypatch.setattr(settings, "SUMMARY_CONDENSE", False)
+        in_flight = {"now": 0, "max": 0}
+
+        class FakeClient:
+            async def _call(self, prompt):
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+                await asyncio.sleep(0.01)
+                in_flight["now"] -= 1
+                return _echo_refs(prompt)
+
+            async def arequest_with_fallback(self, prompt, **kwargs):
+                return {"content": await self._call(prompt), "model_used": "deepseek", "is_fallback": False}
+
+            async def arequest_gemini(self, prompt, **kwargs):
+                return await self._call(prompt)
+
+        data = {"section": "headline", "category": "头条", "items": _items(6) + _items(2, "high")}
+        result = asyncio.run(arun_summary_generation_pipeline(data, llm_client=FakeClient()))
+
+        assert result["meta"]["low_chunks"] > 1
+        assert in_flight["max"] == result["meta"]["low_chunks"] + result["meta"]["high_chunks"]
+        merged = result["merged_summary"]
+        assert all(f"https://n.test/{n}" in merged for n in range(1, 7))
+        assert "[8]" in merged and "[9]" not in merged
+
+    def test_condense_keeps_refs(self, monkeypatch):
+        """测试整合结果漏掉引用时保留拼接版本"""
+        monkeypatch.setattr(settings, "SUMMARY_CHUNK_TOKENS", 200)
+        monkeypatch.setattr(settings, "SUMMARY_CONDENSE", True)
+
+        class FakeClient:
+            def request_with_fallback(self, prompt, **kwargs):
+                content = "<h1>t</h1><p>only [1]</p>" if "待整合" in prompt else _echo_refs(prompt)
+                return {"content": content, "model_used": "deepseek", "is_fallback": False}
+
+        data = {"section": "headline", "category": "头条", "items": _items(6)}
+        result = run_summary_generation_pipeline(data, llm_client=FakeClient())
+        assert all(f"https://n.test/{n}" in result["low_risk_summary"] for n in range(1, 7))
+
+
+class TestLLMCache:
+    """测试 LLM 响应缓存"""
+
+    def test_ttl(self, tmp_path):
+        """测试过期条目视为未命中"""
+        cache = LLMCache(tmp_path / "c.sqlite3", ttl=10, max_bytes=10**6)
+        cache.put("k", "gemini", "m", {"content": "x"}, now=100)
+        assert cache.get("k", now=105) == {"content": "x"}
+        assert cache.get("k", now=111) is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self, tmp_path):
+        """测试超出大小上限时淘汰最久未使用的条目"""
+        cache = LLMCache(tmp_path / "c.sqlite3", ttl=1000, max_bytes=60)
+        cache.put("a", "gemini", "m", {"content": "a" * 10}, now=1)
+        cache.put("b", "gemini", "m", {"content": "b" * 10}, now=2)
+        cache.get("a", now=3)
+        cache.put("c", "gemini", "m", {"content": "c" * 10}, now=4)
+
+        assert cache.get("b", now=5) is None
+        assert cache.get("a", now=5) is not None
+        assert cache.get("c", now=5) is not None
+
+    def test_key_covers_params(self):
+        """测试键包含 provider / 模型 / 参数"""
+        base = cache_key("gemini", "m", "p", temperature=0.3, max_tokens=10)
+        assert base == cache_key("gemini", "m", "p", max_tokens=10, temperature=0.3)
+        assert base != cache_key("deepseek", "m", "p", temperature=0.3, max_tokens=10)
+        assert base != cache_key("gemini", "m", "p", temperature=0.5, max_tokens=10)
+
+
+class TestCachedClient:
+    """测试 LLMClient 经缓存重放"""
+
+    @pytest.fixture
+    def cached_client(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("DEEPSEEK_TOKEN", "ds-test")
+        monkeypatch.setenv("GEMINI_TOKEN", "gm-test")
+        return LLMClient(timeout=5, cache=LLMCache(tmp_path / "c.sqlite3"))
+
+    def test_sync_and_async_share_cache(self, cached_client, monkeypatch):
+        """测试同一请求只发一次（同步、异步共用缓存）"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return _completion("ok")
+
+        _mock_http(monkeypatch, handler)
+        assert asyncio.run(cached_client.arequest_deepseek("p", 0.3, 100)) == "ok"
+        assert cached_client.request_deepseek("p", 0.3, 100) == "ok"
+        assert asyncio.run(cached_client.arequest_deepseek("p", 0.3, 100)) == "ok"
+        assert len(calls) == 1
+
+    def test_fallback_replayed_without_network(self, cached_client, monkeypatch):
+        """测试风控 + fallback 的结果连同元数据一起重放"""
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400, json={})
+
+        async def gemini(prompt):
+            calls.append(prompt)
+            return "from gemini"
+
+        _mock_http(monkeypatch, handler)
+        monkeypatch.setattr(cached_client, "_agenerate_gemini", gemini)
+
+        first = asyncio.run(cached_client.arequest_with_fallback("p", primary="deepseek"))
+        second = cached_client.request_with_fallback("p", primary="deepseek")
+        assert first == second == {
+            "content": "from gemini",
+            "model_used": "gemini",
+            "is_fallback": True,
+            "filter_reason": "HTTP 400 状态码",
+        }
+        assert len(calls) == 2
+
+        # 单独请求 DeepSeek 也直接重放风控结果
+        with pytest.raises(ContentFilteredException):
+            cached_client.request_deepseek("p", 0.7, 2000)
+        assert len(calls) == 2
+
+    def test_fallback_key_covers_models(self, cached_client, monkeypatch):
+        """测试 fallback 结果的缓存键与 model 列包含主模型与备用模型，更换备用模型后不命中旧结果"""
+        monkeypatch.setattr(settings, "GEMINI_MODEL", "gemini-a")
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(400, json={})
+
+        async def gemini(prompt):
+            calls.append(prompt)
+            return settings.GEMINI_MODEL
+
+        _mock_http(monkeypatch, handler)
+        monkeypatch.setattr(cached_client, "_agenerate_gemini", gemini)
+
+        assert asyncio.run(cached_client.arequest_with_fallback("q", primary="deepseek"))["content"] == "gemini-a"
+        assert cached_client.request_with_fallback("q", primary="deepseek")["content"] == "gemini-a"
+        rows = cached_client.cache.conn.execute("SELECT model FROM responses WHERE provider = 'fallback_deepseek'")
+        assert [model for (model,) in rows] == ["deepseek-chat->gemini-a"]
+
+        monkeypatch.setattr(settings, "GEMINI_MODEL", "gemini-b")
+        assert asyncio.run(cached_client.arequest_with_fallback("q", primary="deepseek"))["content"] == "gemini-b"
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive 的假 DeepSeek 接口"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSharedClient:
+    """测试进程内共享客户端与连接复用"""
+
+    @pytest.fixture
+    def server_url(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _CompletionHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}/chat/completions"
+        server.shutdown()
+        server.server_close()
+
+    def test_registry_returns_same_instance(self, monkeypatch):
+        """测试 get_llm_client 按超时复用实例，reset 后重新创建"""
+        monkeypatch.setenv("GEMINI_TOKEN", "gm-test")
+        monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+        reset_llm_clients()
+        try:
+            first = get_llm_client(timeout=7)
+            assert get_llm_client(timeout=7) is first
+            assert get_llm_client(timeout=8) is not first
+            reset_llm_clients()
+            assert get_llm_client(timeout=7) is not first
+        finally:
+            reset_llm_clients()
+
+    def test_shared_client_across_runs(self, server_url, monkeypatch):
+        """测试共享实例跨多次 asyncio.run 使用：同步连接池与 Gemini 客户端共享，异步连接池每次运行新建并在结束时释放"""
+        monkeypatch.setenv("GEMINI_TOKEN", "gm-test")
+        monkeypatch.setenv("DEEPSEEK_TOKEN", "ds-test")
+        monkeypatch.setattr(settings, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(settings, "LLM_STREAM", False)
+        reset_llm_clients()
+        pools = []
+
+        async def run():
+            client = get_llm_client(timeout=7)
+            client.deepseek_api_url = server_url
+            try:
+                content = await client.arequest_deepseek("a")
+                pools.append(client._http)
+                return content
+            finally:
+                await client.aclose()
+
+        try:
+            shared = get_llm_client(timeout=7)
+            session, gemini_client = shared.session, shared.gemini_client
+            assert asyncio.run(run()) == "ok"
+            assert asyncio.run(run()) == "ok"
+            assert pools[0] is not pools[1] and all(http.is_closed for http in pools)
+            assert shared.session is session and shared.gemini_client is gemini_client
+        finally:
+            reset_llm_clients()
+
+    def test_connections_reused(self, client, server_url, monkeypatch):
+        """测试同步 / 异步各自只建一次连接，建连耗时计入指标"""
+        monkeypatch.setattr(settings, "LLM_STREAM", False)
+        client.deepseek_api_url = server_url
+        before = metrics.counters["llm_connections_deepseek"]
+
+        assert [client.request_deepseek(f"p{i}") for i in range(3)] == ["ok"] * 3
+        assert metrics.counters["llm_connections_deepseek"] == before + 1
+
+        async def run():
+            try:
+                return [await client.arequest_deepseek(f"a{i}") for i in range(3)]
+            finally:
+                await client.aclose()
+
+        assert asyncio.run(run()) == ["ok"] * 3
+        assert metrics.counters["llm_connections_deepseek"] == before + 2
+        assert metrics.timings["llm_connect_deepseek"] > 0
+        client.close()
+
@@ -104,3 +104,51 @@ class TestMergeSummaries:
 
         assert "【主要新闻】" not in result
         assert "【其他新闻】" not in result
+
+
+class TestSummaryLinks:
+    """测试摘要生成后的引用链接"""
+
+    class _FakeClient:
+        def request_with_fallback(self, prompt, primary, temperature, max_tokens):
+            return {
+                "content": "<h1>标题</h1><p>低风险新闻。[1]</p>",
+                "model_used": "deepseek",
+                "is_fallback": False,
+                "filter_reason": None,
+            }
+
+        def request_gemini(self, prompt, temperature, max_tokens):
+            return "<h1>标题</h1><p>高风险新闻。[1]</p>"
+
+    def test_member_links_in_merged_summary(self):
+        """测试聚类合并条目的相关报道链接出现在合并后的摘要中"""
+        from workflows.summary_generation import run_summary_generation_pipeline
+
+        data = {
+            "section": "headline",
+            "category": "头条",
+            "dateStr": "2026-02-14",
+            "items": [
+                {"title": "低风险", "summary": "摘要", "link": "https://a.example/low", "ds_risk": "low"},
+                {
+                    "title": "高风险",
+                    "summary": "摘要",
+                    "link": "https://b.example/lead",
+                    "ds_risk": "high",
+                    "members": [
+                        {"title": "相关报道", "link": "https://c.example/member"},
+                        {"title": "同链接报道", "link": "https://b.example/lead"},
+                    ],
+                },
+            ],
+        }
+
+        result = run_summary_generation_pipeline(data, llm_client=self._FakeClient())
+
+        merged = result["merged_summary"]
+        assert '<a href="https://a.example/low" target="_blank">[1]</a>' in merged
+        assert '<a href="https://b.example/lead" target="_blank">[2]</a>' in merged
+        assert '<a href="https://c.example/member" target="_blank">[2.1]</a>' in merged
+        assert merged.count("https://b.example/lead") == 1
+        assert "https://c.example/member" in result["high_risk_summary"]
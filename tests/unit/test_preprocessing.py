@@ -2,8 +2,21 @@
 测试预处理模块
 """
 
+import os
+
 import pytest
-from preprocessing.dedupe import normalize_title, dedupe_items
+from config import settings
+from monitoring.metrics import metrics
+from preprocessing.dedupe import normalize_title, dedupe_items, near_dedupe_items
+from preprocessing.filters import filter_ru, RUSSIA_LABEL
+from preprocessing.classify import Classify
+from preprocessing.cluster import cluster_block, cosine_pairs, tfidf_vectors
+from preprocessing.matcher import KeywordMatcher, ahocorasick
+from preprocessing.news_item import NewsItem
+from preprocessing.parallel import preprocess, preprocess_parallel
+from preprocessing.ranking import select_top_k
+from preprocessing.rules import RuleEngine
+from preprocessing.stages import chain, iter_dedupe, iter_filter_ru, iter_near_dedupe
 
 
 class TestNormalizeTitle:
@@ -69,3 +82,570 @@ class TestDedupeItems:
         data = {"items": []}
         result = dedupe_items(data)
         assert len(result["items"]) == 0
+
+
+class TestFilterRu:
+    """测试俄罗斯标签兜底过滤"""
+
+    def test_filter_and_count(self):
+        """测试过滤并计数"""
+        before = metrics.counters.get("filter_ru_client_dropped", 0)
+        data = {
+            "items": [
+                {"title": "a", "categories": [RUSSIA_LABEL]},
+                {"title": "b", "categories": []},
+            ]
+        }
+        result = filter_ru(data)
+        assert [item["title"] for item in result["items"]] == ["b"]
+        assert len(data["items"]) == 2
+        assert metrics.counters["filter_ru_client_dropped"] == before + 1
+
+
+RAW_ITEM = {
+    "id": "tag:1",
+    "title": "【突发】Senate Passes Budget",
+    "summaryText": "",
+    "summary": {"content": "The senate voted on Tuesday."},
+    "alternate": [{"href": "https://news.test/Budget"}],
+    "origin": {"title": "BBC Politics"},
+    "categories": ["user/-/label/Top"],
+    "published": 1700000000,
+}
+
+
+class TestNewsItem:
+    """测试 NewsItem 归一化"""
+
+    def test_from_raw(self):
+        """测试从原始条目构建"""
+        item = NewsItem.from_raw(RAW_ITEM)
+        assert item.link == "https://news.test/Budget"
+        assert item.link_lower == "https://news.test/budget"
+        assert item.summary == "The senate voted on Tuesday."
+        assert item.source == "BBC Politics"
+        assert item.source_lower == "bbc politics"
+        assert item.categories_lower == "user/-/label/top"
+        assert item.norm_title == "senate passes budget"
+        assert "the senate voted" in item.text_lower
+
+    def test_dict_style_get(self):
+        """测试兼容 dict 读取"""
+        item = NewsItem.from_raw(RAW_ITEM)
+        assert item.get("title") == RAW_ITEM["title"]
+        assert item.get("ds_risk") is None
+        assert item.get("categories", []) == ("user/-/label/Top",)
+
+    def test_classify_accepts_dict_and_news_item(self):
+        """测试分类结果对 dict 与 NewsItem 一致"""
+        classifier = Classify(category="头条")
+        from_dict = classifier._process_headlines([RAW_ITEM])
+        from_item = classifier._process_headlines([NewsItem.from_raw(RAW_ITEM)])
+        assert from_dict == from_item
+        assert from_item["items"][0]["link"] == "https://news.test/Budget"
+
+    def test_dedupe_uses_norm_title(self):
+        """测试去重使用预计算的规范化标题"""
+        items = [NewsItem.from_raw(RAW_ITEM), NewsItem.from_raw(dict(RAW_ITEM, title="Senate Passes Budget"))]
+        assert len(dedupe_items({"items": items})["items"]) == 1
+
+
+class TestPartition:
+    """测试单次遍历多类别划分"""
+
+    ITEMS = [
+        {"title": "Senate passes budget", "origin": {"title": "BBC"}},
+        {"title": "Stock market rallies", "origin": {"title": "Reuters"}},
+        {"title": "Election results", "origin": {"title": "AP"}},
+        {"title": "New AI chip unveiled", "origin": {"title": "Wired"}},
+        {"title": "Super Bowl preview", "origin": {"title": "CBS"}},
+        {"title": "", "origin": {"title": "AP"}},
+        {"title": "Morning briefing", "origin": {"title": "Top Stories"}},
+    ]
+
+    def test_matches_per_category_processing(self):
+        """测试与逐类别处理结果一致（含 H 编号）"""
+        categories = ["头条", "政治", "财经", "科技", "国际"]
+        partitioned = Classify.partition(self.ITEMS, categories)
+        for cat in categories:
+            assert partitioned[cat] == Classify(category=cat)._process_headlines(self.ITEMS)
+
+    def test_engine_fetched_once_per_batch(self, monkeypatch):
+        """测试整个批次只取一次规则引擎（热加载检查不会在批次中途发生）"""
+        from preprocessing import classify as classify_module
+
+        engine = classify_module.get_rule_engine()
+        calls = []
+
+        def fake_get_rule_engine():
+            calls.append(1)
+            return engine
+
+        monkeypatch.setattr(classify_module, "get_rule_engine", fake_get_rule_engine)
+        Classify.partition(self.ITEMS * 10)
+        assert len(calls) == 1
+
+    def test_custom_engine(self, tmp_path):
+        """测试分类器使用传入的规则引擎（自定义规则文件），不回退到全局规则"""
+        path = tmp_path / "rules.toml"
+        path.write_text(
+            'fallback = "国际"\n\n'
+            '[[rules]]\nname = "markets"\naction = "category"\ncategory = "科技"\ntitle = ["stock"]\n',
+            encoding="utf-8",
+        )
+        engine = RuleEngine(path)
+
+        result = Classify(category="科技", engine=engine)._process_headlines(self.ITEMS)
+        assert [it["title"] for it in result["items"]] == ["Stock market rallies"]
+        partitioned = Classify.partition(self.ITEMS, ["科技"], engine=engine)
+        assert partitioned["科技"] == result
+
+    def test_numbering_per_category(self):
+        """测试各类别独立编号"""
+        partitioned = Classify.partition(self.ITEMS, ["政治", "财经"])
+        assert list(partitioned) == ["政治", "财经"]
+        assert [it["id"] for it in partitioned["政治"]["items"]] == ["H1", "H2"]
+        assert [it["title"] for it in partitioned["政治"]["items"]] == ["Senate passes budget", "Election results"]
+        assert [it["id"] for it in partitioned["财经"]["items"]] == ["H1"]
+
+
+class TestParallelPreprocess:
+    """测试并行预处理与串行结果一致"""
+
+    SUMMARY = "Officials said on Tuesday that talks would continue next week in Geneva."
+
+    def _items(self):
+        raw = []
+        titles = [
+            "Senate passes budget", "Stock market rallies", "Election results", "New AI chip unveiled",
+            "Super Bowl preview", "Morning briefing", "Storm hits coast", "Court ruling on trade",
+        ]
+        for i in range(40):
+            title = titles[i % len(titles)]
+            if i % 3:
+                # 跨块的改写稿 / 转载稿
+                title = f"{title} {i // len(titles)}"
+            raw.append({
+                "id": f"id{i}",
+                "title": title,
+                "summaryText": self.SUMMARY if i % 2 else f"Report {i}: {title.lower()} as expected.",
+                "origin": {"title": ["BBC", "Reuters", "Top Stories", "Wired"][i % 4]},
+                "canonical": [{"href": f"https://news{i}.test/story"}],
+            })
+        return [NewsItem.from_raw(item) for item in raw]
+
+    def test_identical_to_serial(self):
+        """测试分块进程池结果（含 H 编号与 alternates）与串行完全一致"""
+        categories = ["头条", "政治", "财经", "科技", "国际"]
+        serial = preprocess(self._items(), categories, workers=1)
+        parallel = preprocess_parallel(self._items(), categories, workers=2, chunk_size=7)
+
+        assert parallel == serial
+        assert sum(len(block["items"]) for block in serial.values()) > 0
+
+    def test_opt_in_by_default(self):
+        """测试默认配置下即使条目很多也走串行路径"""
+        from preprocessing.parallel import should_parallelize
+
+        assert not should_parallelize(10 ** 6)
+
+    def test_serial_below_threshold(self, monkeypatch):
+        """测试条目数低于阈值时不启动进程池"""
+        from preprocessing import parallel
+
+        def fail(*args, **kwargs):
+            raise AssertionError("不应走并行路径")
+
+        monkeypatch.setattr(parallel, "preprocess_parallel", fail)
+        monkeypatch.setattr(parallel.settings, "PREPROCESS_PARALLEL_MIN_ITEMS", 1000)
+        result = preprocess(self._items(), ["政治"], workers=4)
+        assert [it["id"] for it in result["政治"]["items"]][:1] == ["H1"]
+
+
+class TestStages:
+    """测试惰性预处理阶段"""
+
+    RAW = [
+        {"title": "Senate passes budget", "origin": {"title": "BBC"}, "categories": []},
+        {"title": "Senate passes budget", "origin": {"title": "CBS"}, "categories": []},
+        {"title": "Stock market rallies", "origin": {"title": "Reuters"}, "categories": [RUSSIA_LABEL]},
+        {"title": "Election results", "origin": {"title": "AP"}, "categories": []},
+        {"title": "Stock market rallies", "origin": {"title": "AP"}, "categories": []},
+    ]
+
+    def test_matches_eager_functions(self):
+        """测试串联生成器与 filter_ru → dedupe_items → partition 结果一致"""
+        categories = ["政治", "财经"]
+        eager = dedupe_items(filter_ru({"items": [NewsItem.from_raw(r) for r in self.RAW]}))
+        expected = Classify.partition(eager["items"], categories)
+
+        items = chain(map(NewsItem.from_raw, self.RAW), iter_filter_ru, iter_dedupe, iter_near_dedupe)
+        assert Classify.partition(items, categories) == expected
+
+    def test_stages_are_lazy(self):
+        """测试阶段按需逐条产出"""
+        consumed = []
+
+        def source():
+            for raw in self.RAW:
+                consumed.append(raw["title"])
+                yield NewsItem.from_raw(raw)
+
+        items = chain(source(), iter_filter_ru, iter_dedupe)
+        assert consumed == []
+        assert next(items).title == "Senate passes budget"
+        assert consumed == ["Senate passes budget"]
+
+
+class TestKeywordMatcher:
+    """测试多组关键词匹配器"""
+
+    GROUPS = {
+        "政治": ["election", "senate", "选举"],
+        "财经": ["market", "bank"],
+        "soft": ["art", "video"],
+    }
+    TEXTS = [
+        "",
+        "senate debates market rules",
+        "party video",
+        "选举结果公布",
+        "weather forecast",
+        "bankers and artists at the election",
+    ]
+
+    def test_scan_backend(self):
+        """测试 scan 后端与逐关键词子串判断一致"""
+        matcher = KeywordMatcher(self.GROUPS, backend="scan")
+        assert matcher.match("senate debates market rules") == {"政治", "财经"}
+        assert matcher.match("party video") == {"soft"}
+        assert matcher.match("weather forecast") == frozenset()
+        assert matcher.match("") == frozenset()
+
+    @pytest.mark.skipif(ahocorasick is None, reason="未安装 pyahocorasick")
+    def test_backends_agree(self):
+        """测试 aho 与 scan 后端结果一致（含子串命中、关键词属于多组）"""
+        groups = dict(self.GROUPS, top=["top", "bank"])
+        scan = KeywordMatcher(groups, backend="scan")
+        aho = KeywordMatcher(groups, backend="aho")
+        for text in self.TEXTS:
+            assert aho.match(text) == scan.match(text)
+
+    def test_invalid_backend(self):
+        """测试非法后端报错"""
+        with pytest.raises(ValueError):
+            KeywordMatcher(self.GROUPS, backend="regex")
+
+    def test_search(self):
+        """测试任一关键词命中"""
+        for backend in ["scan"] + (["aho"] if ahocorasick is not None else []):
+            matcher = KeywordMatcher(self.GROUPS, backend=backend)
+            assert matcher.search("senate debates")
+            assert not matcher.search("weather forecast")
+            assert not matcher.search("")
+
+
+class TestRuleEngine:
+    """测试分类规则引擎"""
+
+    RULES = """
+fallback = "国际"
+
+[[rules]]
+name = "exclude_sports"
+action = "exclude"
+text = ["nfl"]
+
+[[rules]]
+name = "exclude_date_prefix"
+action = "exclude"
+source = ["cbs"]
+title_regex = '^\\d{1,2}/\\d{1,2}'
+
+[[rules]]
+name = "top_source"
+action = "top"
+source = ["top"]
+
+[[rules]]
+name = "soft_title"
+action = "soft"
+title = ["video"]
+
+[[rules]]
+name = "politics_title"
+action = "category"
+category = "政治"
+title = ["election"]
+"""
+
+    def _write(self, path, text):
+        path.write_text(text, encoding="utf-8")
+
+    def test_evaluate(self, tmp_path):
+        """测试硬排除、头条/软内容与类别优先级"""
+        path = tmp_path / "rules.toml"
+        self._write(path, self.RULES)
+        engine = RuleEngine(path)
+
+        def item(title, source="AP"):
+            return NewsItem.from_raw({"title": title, "origin": {"title": source}})
+
+        assert engine.evaluate(item("NFL draft")) is None
+        assert engine.evaluate(item("2/14 evening report", "CBS News")) is None
+        assert engine.evaluate(item("2/14 evening report", "AP")) == "国际"
+        assert engine.evaluate(item("Election day", "Top Stories")) == "头条"
+        assert engine.evaluate(item("Election video", "Top Stories")) == "政治"
+        assert engine.evaluate(item("Weather")) == "国际"
+
+    def test_one_scan_per_field(self, tmp_path, monkeypatch):
+        """测试所有规则共用一个字段匹配器，每个字段每条新闻只扫描一次"""
+        path = tmp_path / "rules.toml"
+        self._write(path, self.RULES + '\n[[rules]]\nname = "tech_title"\naction = "category"\ncategory = "科技"\ntitle = ["chip"]\n')
+        engine = RuleEngine(path)
+        scanned = []
+        original = KeywordMatcher.match_mask
+
+        def counting(matcher, text):
+            scanned.append(text)
+            return original(matcher, text)
+
+        monkeypatch.setattr(KeywordMatcher, "match_mask", counting)
+        assert engine.evaluate(NewsItem.from_raw({"title": "Chip video", "origin": {"title": "AP"}})) == "科技"
+        # text / source / title 各一次（title 被 soft_title、politics_title、tech_title 共用）
+        assert len(scanned) == 3
+
+    @pytest.mark.skipif(ahocorasick is None, reason="未安装 pyahocorasick")
+    def test_default_backend_is_automaton(self):
+        """测试默认配置下 Classify 使用的规则引擎走 Aho–Corasick 自动机"""
+        assert settings.CLASSIFY_MATCHER_BACKEND == ""
+        engine = Classify(category="政治").engine
+        assert engine._scans
+        assert {matcher.backend for _, matcher, _, _ in engine._scans} == {"aho"}
+
+    def test_hit_counters(self, tmp_path, monkeypatch):
+        """测试每条规则的命中计数与耗时（开启 CLASSIFY_RULE_TIMING 时）写入 metrics"""
+        monkeypatch.setattr(settings, "CLASSIFY_RULE_TIMING", True)
+        path = tmp_path / "rules.toml"
+        self._write(path, self.RULES)
+        engine = RuleEngine(path)
+        before = metrics.counters.get("classify_rule_hit_politics_title", 0)
+
+        engine.evaluate(NewsItem.from_raw({"title": "Election day"}))
+        engine.evaluate(NewsItem.from_raw({"title": "Election night"}))
+        engine.flush_metrics()
+
+        assert metrics.counters["classify_rule_hit_politics_title"] == before + 2
+        assert "classify_rule_exclude_sports" in metrics.timings
+
+    def test_hot_reload(self, tmp_path):
+        """测试文件 mtime 变化后重新加载，坏文件保留旧规则"""
+        path = tmp_path / "rules.json"
+        self._write(path, '{"rules": [{"name": "a", "action": "category", "category": "科技", "title": ["chip"]}]}')
+        engine = RuleEngine(path, reload_interval=0)
+        chip = NewsItem.from_raw({"title": "New chip"})
+        assert engine.evaluate(chip) == "科技"
+
+        self._write(path, '{"rules": [{"name": "a", "action": "category", "category": "财经", "title": ["chip"]}]}')
+        mtime = path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(mtime, mtime))
+        assert engine.maybe_reload()
+        assert engine.evaluate(chip) == "财经"
+
+        self._write(path, "{broken")
+        os.utime(path, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+        assert not engine.maybe_reload()
+        assert engine.evaluate(chip) == "财经"
+
+    def test_invalid_rules(self, tmp_path):
+        """测试规则文件无效时报错"""
+        path = tmp_path / "rules.toml"
+        self._write(path, '[[rules]]\nname = "x"\naction = "unknown"\ntitle = ["a"]\n')
+        with pytest.raises(RuntimeError):
+            RuleEngine(path)
+
+
+class TestNearDedupe:
+    """测试近似去重（MinHash + LSH）"""
+
+    SUMMARY = (
+        "The central bank raised its benchmark interest rate by a quarter point on Wednesday, "
+        "citing persistent inflation and a tight labour market."
+    )
+
+    def _item(self, i, title, summary=SUMMARY, link=None):
+        return NewsItem.from_raw({
+            "id": f"id{i}",
+            "title": title,
+            "summaryText": summary,
+            "canonical": [{"href": link or f"https://news{i}.test/story"}],
+        })
+
+    def test_merges_syndicated_copies(self):
+        """测试转载稿合并，链接写入 alternates"""
+        items = [
+            self._item(1, "Central bank raises interest rate by a quarter point"),
+            self._item(2, "Central bank raises interest rate by quarter point - Reuters"),
+            self._item(3, "Markets: central bank raises interest rate by a quarter point"),
+            self._item(4, "Storm cuts power to thousands", "Heavy winds knocked down lines across the region overnight."),
+        ]
+        kept = near_dedupe_items({"items": items})["items"]
+
+        assert [it.id for it in kept] == ["id1", "id4"]
+        assert kept[0].alternates == ("https://news2.test/story", "https://news3.test/story")
+        assert kept[1].alternates == ()
+
+    def test_threshold(self):
+        """测试阈值为 1 时只合并签名完全相同的条目"""
+        items = [
+            self._item(1, "Central bank raises interest rate by a quarter point"),
+            self._item(2, "Central bank lifts interest rate by a quarter point", summary="Rates rise again."),
+        ]
+        kept = near_dedupe_items({"items": items}, threshold=1.0)["items"]
+        assert len(kept) == 2
+
+    def test_dict_items_and_cjk(self):
+        """测试 dict 条目与中文按字分词"""
+        items = [
+            {"title": "美联储宣布加息25个基点", "summaryText": "美联储周三宣布将基准利率上调25个基点，为年内第三次加息。", "link": "https://a.test/1"},
+            {"title": "快讯：美联储宣布加息25个基点", "summaryText": "美联储周三宣布将基准利率上调25个基点，为年内第三次加息。", "link": "https://b.test/1"},
+        ]
+        kept = near_dedupe_items({"items": items})["items"]
+        assert len(kept) == 1
+        assert kept[0]["alternates"] == ["https://b.test/1"]
+
+    def test_invalid_params(self):
+        """测试签名长度与分段数校验"""
+        with pytest.raises(ValueError):
+            near_dedupe_items({"items": []}, num_perm=24)
+        with pytest.raises(ValueError):
+            near_dedupe_items({"items": []}, num_perm=16, bands=3)
+
+    def test_alternates_in_classify_output(self):
+        """测试分类输出携带 alternates"""
+        item = self._item(1, "Senate passes budget", summary="Lawmakers approved the spending plan.")
+        item.alternates = ("https://other.test/1",)
+        result = Classify.partition([item], ["政治"])["政治"]["items"][0]
+        assert result["alternates"] == ["https://other.test/1"]
+
+
+class TestClusterBlock:
+    """测试报道聚类"""
+
+    ITEMS = [
+        {"id": "H1", "title": "Central bank raises interest rates to fight inflation",
+         "summary": "The central bank raised interest rates by half a point.", "link": "https://a.test/1", "item_id": "a1"},
+        {"id": "H2", "title": "Earthquake strikes coastal region",
+         "summary": "A strong earthquake hit the coast overnight.", "link": "https://b.test/1", "item_id": "b1"},
+        {"id": "H3", "title": "Markets react as central bank raises interest rates",
+         "summary": "Stocks fell after the central bank raised interest rates.", "link": "https://c.test/1", "item_id": "c1"},
+        {"id": "H4", "title": "央行宣布加息以应对通胀", "summary": "央行周三宣布加息。", "link": "https://d.test/1", "item_id": "d1"},
+        {"id": "H5", "title": "央行加息应对通胀压力", "summary": "央行宣布加息半个百分点。", "link": "https://e.test/1", "item_id": "e1"},
+    ]
+
+    def test_cosine_pairs(self):
+        """测试相似度对只包含共享词的条目"""
+        pairs = cosine_pairs(tfidf_vectors(self.ITEMS), threshold=0.3)
+        assert {(i, j) for _, i, j in pairs} == {(0, 2), (3, 4)}
+
+    def test_merge_and_renumber(self):
+        """测试同一事件合并为一条，members 保留链接，重新编号"""
+        block = {"section": "headline", "category": "财经", "items": self.ITEMS}
+        merged = cluster_block(block, threshold=0.3)
+
+        items = merged["items"]
+        assert [it["id"] for it in items] == ["H1", "H2", "H3"]
+        assert [it["item_id"] for it in items] == ["a1", "b1", "d1"]
+        assert [m["link"] for m in items[0]["members"]] == ["https://c.test/1"]
+        assert [m["item_id"] for m in items[2]["members"]] == ["e1"]
+        assert "members" not in items[1]
+        assert block["items"][0]["id"] == "H1" and "members" not in block["items"][0]
+
+    def test_max_size(self):
+        """测试簇大小上限"""
+        block = {"category": "财经", "items": self.ITEMS}
+        assert len(cluster_block(block, threshold=0.3, max_size=1)["items"]) == 5
+
+    def test_headline_prompt_refs(self):
+        """测试合并条目在标题 prompt 中列出相关报道并保留引用"""
+        from llms.build_prompt import build_headline_prompt
+
+        merged = cluster_block({"section": "headline", "category": "财经", "items": self.ITEMS}, threshold=0.3)
+        for item in merged["items"]:
+            item["ds_risk"] = "low"
+        data = build_headline_prompt(merged, risk_filter="low")
+
+        assert len(data["refs"]) == 3
+        assert data["refs"][0]["related"] == [
+            {"title": "Markets react as central bank raises interest rates", "url": "https://c.test/1"}
+        ]
+        assert "相关报道：Markets react as central bank raises interest rates" in data["prompt"]
+
+    def test_risk_prompt_covers_members(self):
+        """测试风险评估 prompt 列出相关报道，判定缓存键随簇的组成变化"""
+        from llms.build_prompt import build_ds_risk_prompt
+        from storage.risk_cache import RiskVerdictCache
+
+        merged = cluster_block({"section": "headline", "category": "财经", "items": self.ITEMS}, threshold=0.3)
+        prompt = build_ds_risk_prompt(merged)["prompt"]
+        assert "相关报道：Markets react as central bank raises interest rates" in prompt
+
+        lead = merged["items"][0]
+        alone = {key: value for key, value in lead.items() if key != "members"}
+        assert RiskVerdictCache.key(lead) != RiskVerdictCache.key(alone)
+
+
+class TestSelectTopK:
+    """测试相关度排序与截断"""
+
+    NOW = 1700000000
+
+    def _block(self):
+        items = [
+            {"id": "H1", "title": "old", "source": "A", "published": self.NOW - 48 * 3600, "item_id": "i1"},
+            {"id": "H2", "title": "fresh", "source": "A", "published": self.NOW, "item_id": "i2"},
+            {"id": "H3", "title": "widely covered", "source": "B", "published": self.NOW - 24 * 3600,
+             "alternates": ["x", "y", "z"], "item_id": "i3"},
+            {"id": "H4", "title": "fresh too", "source": "A", "published": self.NOW - 600, "item_id": "i4"},
+            {"id": "H5", "title": "no date", "source": "C", "published": None, "item_id": "i5"},
+        ]
+        return {"section": "headline", "category": "头条", "items": items}
+
+    def test_top_k_keeps_order_and_renumbers(self):
+        """测试按得分取前 K 条，保留原顺序并重新编号"""
+        block = self._block()
+        kept, dropped = select_top_k(block, k=3, per_source_cap=0, now=self.NOW)
+
+        assert [it["title"] for it in kept["items"]] == ["fresh", "widely covered", "fresh too"]
+        assert [it["id"] for it in kept["items"]] == ["H1", "H2", "H3"]
+        assert {it["item_id"] for it in dropped} == {"i1", "i5"}
+        assert block["items"][1]["id"] == "H2"
+
+    def test_per_source_cap(self):
+        """测试单一来源条数上限"""
+        kept, dropped = select_top_k(self._block(), k=3, per_source_cap=1, now=self.NOW)
+        assert [it["title"] for it in kept["items"]] == ["fresh", "widely covered", "no date"]
+        assert len(dropped) == 2
+
+    def test_empty_source_not_capped(self):
+        """测试来源为空的条目不共用一个来源上限"""
+        block = self._block()
+        for item in block["items"]:
+            item["source"] = ""
+        kept, dropped = select_top_k(block, k=5, per_source_cap=1, now=self.NOW)
+        assert len(kept["items"]) == 5 and dropped == []
+
+    def test_source_weight(self, monkeypatch):
+        """测试来源权重"""
+        kept, _ = select_top_k(self._block(), k=1, per_source_cap=0, now=self.NOW)
+        assert [it["title"] for it in kept["items"]] == ["widely covered"]
+
+        monkeypatch.setattr(settings, "RANK_SOURCE_WEIGHTS", {"b": 0.1})
+        kept, _ = select_top_k(self._block(), k=1, per_source_cap=0, now=self.NOW)
+        assert [it["title"] for it in kept["items"]] == ["fresh"]
+
+    def test_small_block_unchanged(self):
+        """测试条数不超过 K 且不限来源时原样返回"""
+        block = self._block()
+        kept, dropped = select_top_k(block, k=10, per_source_cap=0, now=self.NOW)
+        assert kept is block and dropped == []
@@ -0,0 +1,110 @@
+"""
+测试逐条风险判定缓存
+"""
+
+import asyncio
+
+import pytest
+from storage.risk_cache import RiskVerdictCache
+from workflows.risk_assessment import arun_risk_assessment_pipeline, run_risk_assessment_pipeline
+
+NOW = 1_700_000_000
+
+
+def _block(titles):
+    return {
+        "section": "headline",
+        "category": "头条",
+        "items": [
+            {"id": f"H{n}", "title": t, "summary": "摘要", "link": f"https://news.test/{t}"}
+            for n, t in enumerate(titles, start=1)
+        ],
+    }
+
+
+class FakeClient:
+    """按 prompt 中的条目数返回 n:low / n:high（奇数 low，偶数 high）"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def _answer(self, prompt):
+        self.prompts.append(prompt)
+        count = prompt.count("   摘要：")
+        return "\n".join(f"{n}:{'low' if n % 2 else 'high'}" for n in range(1, count + 1))
+
+    def request_gemini(self, prompt, **kwargs):
+        return self._answer(prompt)
+
+    async def arequest_gemini(self, prompt, **kwargs):
+        return self._answer(prompt)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RiskVerdictCache(tmp_path / "risk.sqlite3", hours=1)
+
+
+class TestRiskVerdictCache:
+    """测试判定缓存读写"""
+
+    def test_ttl_and_invalid_verdicts(self, cache):
+        """测试过期结果视为未命中，unknown 不写入"""
+        cache.put_many({"a": "low", "b": "high", "c": "unknown"}, now=NOW)
+        assert cache.get_many(["a", "b", "c"], now=NOW + 60) == {"a": "low", "b": "high"}
+        assert cache.get_many(["a", "b"], now=NOW + 3601) == {}
+
+
+class TestCachedRiskAssessment:
+    """测试风险评估只为新条目请求 Gemini"""
+
+    def test_only_new_items_prompted(self, cache):
+        """测试第二次运行只发送新条目，缓存结果与新结果按条目合并"""
+        client = FakeClient()
+        first = run_risk_assessment_pipeline(_block(["alpha", "beta"]), llm_client=client, verdict_cache=cache)
+        assert [it["ds_risk"] for it in first["items"]] == ["low", "high"]
+
+        result = run_risk_assessment_pipeline(
+            _block(["gamma", "beta", "alpha"]), llm_client=client, verdict_cache=cache
+        )
+        assert len(client.prompts) == 2
+        assert "gamma" in client.prompts[1]
+        assert "alpha" not in client.prompts[1] and "beta" not in client.prompts[1]
+        assert [it["ds_risk"] for it in result["items"]] == ["low", "high", "low"]
+
+    def test_all_cached_skips_request(self, cache):
+        """测试全部命中缓存时不请求 Gemini（异步）"""
+        client = FakeClient()
+        run_risk_assessment_pipeline(_block(["alpha", "beta"]), llm_client=client, verdict_cache=cache)
+        result = asyncio.run(
+            arun_risk_assessment_pipeline(_block(["beta", "alpha"]), llm_client=client, verdict_cache=cache)
+        )
+        assert len(client.prompts) == 1
+        assert [it["ds_risk"] for it in result["items"]] == ["high", "low"]
+
+    def test_default_cache_closed(self, tmp_path, monkeypatch):
+        """测试未传 verdict_cache 时自行打开的默认缓存在评估结束后关闭（请求失败时也关闭）"""
+        from workflows import risk_assessment
+
+        opened = []
+
+        class TrackingCache(RiskVerdictCache):
+            def __init__(self):
+                super().__init__(tmp_path / "default.sqlite3", hours=1)
+                opened.append(self)
+
+            def close(self):
+                self.closed = True
+                super().close()
+
+        class FailingClient(FakeClient):
+            def request_gemini(self, prompt, **kwargs):
+                raise RuntimeError("Gemini 不可用")
+
+        monkeypatch.setattr(risk_assessment.settings, "RISK_CACHE_ENABLED", True)
+        monkeypatch.setattr(risk_assessment, "RiskVerdictCache", TrackingCache)
+        run_risk_assessment_pipeline(_block(["alpha"]), llm_client=FakeClient())
+        with pytest.raises(RuntimeError):
+            run_risk_assessment_pipeline(_block(["beta"]), llm_client=FailingClient())
+        assert len(opened) == 2
+        assert all(getattr(cache, "closed", False) for cache in opened)
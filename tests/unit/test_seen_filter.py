@@ -0,0 +1,88 @@
+"""
+测试已投递新闻记录
+"""
+
+import pytest
+from preprocessing.dedupe import story_key
+from storage.seen_filter import BloomFilter, SeenStories
+
+NOW = 1_700_000_000  # 2023-11-14 22:13 UTC
+DAY = 86400
+
+
+def _block(category, titles):
+    return {
+        "section": "headline",
+        "category": category,
+        "items": [
+            {"id": f"H{n}", "title": t, "link": f"https://news.test/{t}", "item_id": f"tag:{t}"}
+            for n, t in enumerate(titles, start=1)
+        ],
+    }
+
+
+@pytest.fixture
+def seen(tmp_path):
+    return SeenStories(tmp_path / "seen", hours=24, capacity=1000, fp_rate=0.001)
+
+
+class TestBloomFilter:
+    """测试 Bloom 过滤器"""
+
+    def test_membership_and_roundtrip(self):
+        """测试写入后可查到，序列化后不变"""
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(500):
+            bloom.add(f"key{i}")
+        assert all(f"key{i}" in bloom for i in range(500))
+        false_positives = sum(f"other{i}" in bloom for i in range(2000))
+        assert false_positives < 100
+
+        restored = BloomFilter.from_bytes(bloom.to_bytes(), 1000)
+        assert restored.count == 500
+        assert all(f"key{i}" in restored for i in range(500))
+
+    def test_invalid_params(self):
+        """测试参数校验"""
+        with pytest.raises(ValueError):
+            BloomFilter(0, 0.01)
+        with pytest.raises(ValueError):
+            BloomFilter(100, 1.5)
+
+
+class TestSeenStories:
+    """测试跨运行去掉已投递新闻"""
+
+    def test_story_key(self):
+        """测试标题规范化后相同、链接不同的新闻键不同"""
+        assert story_key("【突发】Title", "https://a.test/1") == story_key("【突发】title", "https://a.test/1")
+        assert story_key("Title", "https://a.test/1") != story_key("Title", "https://a.test/2")
+
+    def test_drop_and_renumber(self, seen):
+        """测试已投递条目被去掉，剩余条目重新编号"""
+        seen.mark_delivered(_block("政治", ["A", "C"]), now=NOW)
+
+        block, dropped = seen.drop_delivered(_block("政治", ["A", "B", "C", "D"]), now=NOW + 3600)
+        assert [it["title"] for it in dropped] == ["A", "C"]
+        assert [(it["id"], it["title"]) for it in block["items"]] == [("H1", "B"), ("H2", "D")]
+
+    def test_per_category(self, seen):
+        """测试不同分类分别记录"""
+        seen.mark_delivered(_block("政治", ["A"]), now=NOW)
+        block, dropped = seen.drop_delivered(_block("财经", ["A"]), now=NOW)
+        assert dropped == []
+        assert block["items"][0]["title"] == "A"
+
+    def test_persist_and_rotate(self, seen, tmp_path):
+        """测试保存后新实例可读取，超出窗口的代际不再生效并被删除"""
+        seen.mark_delivered(_block("头条", ["A"]), now=NOW)
+        seen.save(now=NOW)
+
+        reopened = SeenStories(tmp_path / "seen", hours=24, capacity=1000, fp_rate=0.001)
+        key = SeenStories.key("头条", {"title": "A", "link": "https://news.test/A"})
+        assert reopened.seen(key, now=NOW + 12 * 3600)
+        assert not reopened.seen(key, now=NOW + 3 * DAY)
+
+        reopened.mark_delivered(_block("头条", ["B"]), now=NOW + 3 * DAY)
+        reopened.save(now=NOW + 3 * DAY)
+        assert sorted(p.name for p in (tmp_path / "seen").iterdir()) == ["2023-11-17.bloom"]
@@ -5,7 +5,7 @@
 from .logger import get_logger, setup_logger
 from .deepseek_check import is_content_filtered, check_deepseek_response
 from .risk import parse_risk_response, annotate_risk_levels
-from .merge_summaries import merge_summaries, extract_html_content, renumber_references
+from .merge_summaries import merge_summaries, concat_sections, extract_html_content, renumber_references
 
 __all__ = [
     "get_logger",
@@ -15,6 +15,7 @@ __all__ = [
     "parse_risk_response",
     "annotate_risk_levels",
     "merge_summaries",
+    "concat_sections",
     "extract_html_content",
     "renumber_references"
 ]
@@ -0,0 +1,138 @@
+"""
+摘要 HTML 清洗：去标签与实体、去常见模板文字、按字符/token 预算截断
+
+基于 html.parser 分块喂入，收集到的正文超过预算一定倍数后即停止解析，
+整篇文章 HTML 只解析开头一小段。
+"""
+
+import re
+from html.parser import HTMLParser
+
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+# 内容整体跳过的标签
+_SKIP_TAGS = {"script", "style", "noscript", "iframe", "svg", "figure", "figcaption", "video", "audio", "form", "button"}
+# 块级标签：前后补空格，避免相邻段落粘连
+_BLOCK_TAGS = {"p", "br", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "td", "blockquote", "section", "article"}
+
+# 每次喂给解析器的字符数
+_FEED_CHUNK = 2048
+# 收集到 预算 × 该倍数 的正文后停止解析（给模板文字去除留余量）
+_COLLECT_FACTOR = 2
+
+_BOILERPLATE_RES = [
+    re.compile(r"\bThe post\b.{0,300}?\bappeared first on\b.*$", re.I | re.S),
+    re.compile(r"\b(continue reading|read more|read the full (story|article)|click here to read)\b.*$", re.I | re.S),
+    re.compile(r"(阅读全文|查看原文|点击查看全文|点击阅读原文).*$", re.S),
+    re.compile(r"\b(advertisement|sponsored content)\b", re.I),
+]
+
+_ELLIPSIS = "…"
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self, limit: int | None):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.size = 0
+        self.limit = limit
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+            self.size += len(data)
+
+    @property
+    def full(self) -> bool:
+        return self.limit is not None and self.size >= self.limit
+
+
+def html_to_text(html: str, limit: int | None = None) -> str:
+    """
+    提取 HTML 正文文本（去标签、解码实体、合并空白）
+
+    Args:
+        html: HTML 或纯文本
+        limit: 收集到这么多字符后停止解析（None 表示解析全文）
+    """
+    if not html:
+        return ""
+    if "<" not in html and "&" not in html:
+        return " ".join(html.split())
+
+    parser = _TextCollector(limit)
+    for start in range(0, len(html), _FEED_CHUNK):
+        parser.feed(html[start:start + _FEED_CHUNK])
+        if parser.full:
+            break
+    else:
+        parser.close()
+    return " ".join("".join(parser.parts).split())
+
+
+def strip_boilerplate(text: str) -> str:
+    """去掉 RSS 常见的模板文字（"The post ... appeared first on"、"Read more" 等）"""
+    for pattern in _BOILERPLATE_RES:
+        text = pattern.sub("", text)
+    return " ".join(text.split())
+
+
+def _truncate(text: str, max_chars: int | None, max_tokens: int | None) -> str:
+    """截断到预算内（含末尾的"…"，因此对已截断的文本再次调用结果不变）"""
+    over_chars = bool(max_chars) and len(text) > max_chars
+    over_tokens = bool(max_tokens) and estimate_tokens(text) > max_tokens
+    if not (over_chars or over_tokens):
+        return text
+
+    cut = text
+    if max_chars:
+        cut = cut[:max_chars - 1]
+    if max_tokens:
+        cut = truncate_to_tokens(cut, max_tokens - 1)
+    # 尽量在空白处断开（中文无空白时直接截断）
+    space = cut.rfind(" ")
+    if space > len(cut) * 0.8:
+        cut = cut[:space]
+    return cut.rstrip() + _ELLIPSIS
+
+
+def sanitize_summary(summary, max_chars: int | None = None, max_tokens: int | None = None) -> str:
+    """
+    清洗摘要：去 HTML → 去模板文字 → 按预算截断（超出时末尾加"…"）
+
+    Args:
+        summary: 摘要（字符串或 greader 的 {"content": ...}）
+        max_chars: 字符预算，None/0 表示不限
+        max_tokens: token 预算（估算值），None/0 表示不限
+
+    Returns:
+        str: 清洗后的纯文本
+    """
+    if isinstance(summary, dict):
+        summary = summary.get("content", "") or ""
+    summary = str(summary or "")
+
+    limit = max_chars * _COLLECT_FACTOR if max_chars else None
+    if max_tokens:
+        # 最宽松情况下 1 token 约 4 字符
+        limit = min(limit or max_tokens * 4 * _COLLECT_FACTOR, max_tokens * 4 * _COLLECT_FACTOR)
+
+    text = strip_boilerplate(html_to_text(summary, limit))
+    return _truncate(text, max_chars, max_tokens)
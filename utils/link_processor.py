@@ -1,7 +1,8 @@
 # utils/link_processor.py
 """摘要链接处理工具：
 把 LLM 生成的引用标记 [N] 替换为真实新闻链接，
-并确保每条新闻段落只在最后一个标点之前挂上一个链接。
+并确保每条新闻段落只在最后一个标点之前挂上一个链接；
+聚类合并的条目在主链接后附上各相关报道的链接 [N.1] [N.2] …
 """
 
 from __future__ import annotations
@@ -19,7 +20,8 @@ def process_summary_links(summary_html: str, refs: list[dict[str, Any]]) -> str:
 
     Args:
         summary_html: LLM 生成的 HTML 摘要（可能包含 [1] [2] … 格式引用）
-        refs: 引用列表，格式 [{"n": 1, "title": "...", "url": "..."}, …]
+        refs: 引用列表，格式 [{"n": 1, "title": "...", "url": "..."}, …]；
+            聚类合并的条目另有 "related": [{"title": "...", "url": "..."}, …]
 
     Returns:
         str: 处理后的 HTML
@@ -33,12 +35,20 @@ def process_summary_links(summary_html: str, refs: list[dict[str, Any]]) -> str:
 
     # 1) 构建编号到 URL 的映射
     ref_map: dict[int, str] = {}
+    related_map: dict[int, list[str]] = {}
     for ref in refs:
         try:
             n = ref.get("n")
             url = ref.get("url")
             if isinstance(n, int) and isinstance(url, str) and url:
                 ref_map[n] = url
+                related = []
+                for member in ref.get("related") or []:
+                    member_url = member.get("url")
+                    if isinstance(member_url, str) and member_url and member_url != url and member_url not in related:
+                        related.append(member_url)
+                if related:
+                    related_map[n] = related
         except Exception:
             continue
 
@@ -94,6 +104,20 @@ def process_summary_links(summary_html: str, refs: list[dict[str, Any]]) -> str:
 
     result_html = "".join(output)
 
+    # 4) 段落里保留下来的主链接后附上相关报道链接（放在挪位之后，避免被当作多余链接删掉）
+    def _with_related(m: re.Match) -> str:
+        n = int(m.group(1))
+        related = related_map.get(n)
+        if not related:
+            return m.group(0)
+        extra = "".join(
+            f'<a href="{url}" target="_blank">[{n}.{i}]</a>' for i, url in enumerate(related, 1)
+        )
+        return m.group(0) + extra
+
+    if related_map:
+        result_html = re.sub(r'<a\s+href="[^"]+"\s*target="_blank">\[(\d+)\]</a>', _with_related, result_html)
+
     # 统计信息
     total_refs = len(re.findall(r"\[\d+\]", summary_html))
     kept_links = len(re.findall(r'<a\s+href=', result_html))
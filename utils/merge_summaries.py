@@ -3,7 +3,7 @@
 用于合并低风险和高风险新闻的HTML摘要
 """
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from utils.logger import get_logger
 
 logger = get_logger("merge_summaries")
@@ -56,16 +56,39 @@ def renumber_references(paragraph: str, offset: int) -> str:
     return re.sub(r"\[(\d+)\]", replace_ref, paragraph)
 
 
+def concat_sections(parts: List[str], date: Optional[str] = None, category: Optional[str] = None) -> str:
+    """
+    按顺序拼接同一栏目分块生成的 HTML（各块引用编号已接续，不重新编号）
+    注意：标题格式不在这里强制（由 workflows/summary_generation.py 统一强制）
+    """
+    parts = [p for p in parts if p]
+    if len(parts) <= 1:
+        return parts[0] if parts else ""
+
+    contents = [extract_html_content(p) for p in parts]
+    if not date:
+        date = next((c["date"] for c in contents if c["date"]), None) or "未知日期"
+
+    html_parts = [f"<h1>{date} {category or ''}</h1>".strip()]
+    html_parts.extend(f"<p>{p}</p>" for c in contents for p in c["paragraphs"])
+    logger.info(f"拼接 {len(parts)} 块摘要，总段落数: {len(html_parts) - 1}")
+    return "\n".join(html_parts)
+
+
 def merge_summaries(
     low_risk_summary: Optional[str],
     high_risk_summary: Optional[str],
     date: Optional[str] = None,
     category: Optional[str] = None,
     add_section_headers: bool = True,
+    offset: Optional[int] = None,
 ) -> str:
     """
     合并低风险和高风险新闻摘要
     注意：标题格式不在这里强制（由 workflows/summary_generation.py 统一强制）
+
+    offset: 高风险引用的编号偏移量，默认取低风险摘要中出现的最大编号；
+        传入低风险素材条数可避免模型漏引最后几条时编号与 refs 错位
     """
     logger.info("开始合并摘要")
 
@@ -95,7 +118,8 @@ def merge_summaries(
     logger.info(f"高风险段落数: {len(high_content['paragraphs'])}")
 
     # 重新编号高风险摘要的引用
-    offset = low_content["max_ref_num"]
+    if offset is None:
+        offset = low_content["max_ref_num"]
     high_paragraphs_renumbered = [renumber_references(p, offset) for p in high_content["paragraphs"]]
     logger.info(f"引用编号偏移量: {offset}")
 
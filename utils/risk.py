@@ -50,16 +50,15 @@ def parse_risk_response(response_text):
 
 def annotate_risk_levels(items, risk_map):
     """
-    将风险等级标注到新闻条目
+    将风险等级标注到新闻条目（原地写入 ds_risk，不复制条目）
 
     Args:
         items: 新闻条目列表，每个条目需要有 id 字段
         risk_map: 编号到风险等级的映射，如 {"1": "low", "2": "high"}
 
     Returns:
-        list: 标注了 ds_risk 字段的新闻条目列表
+        list: 同一个列表，条目已标注 ds_risk 字段
     """
-    items_with_risk = []
     matched_count = 0
     unknown_count = 0
 
@@ -75,14 +74,11 @@ def annotate_risk_levels(items, risk_map):
         else:
             matched_count += 1
 
-        item_copy = item.copy()
-        item_copy["ds_risk"] = risk_level
-        items_with_risk.append(item_copy)
+        item["ds_risk"] = risk_level
 
     logger.info(f"标注完成 - 成功匹配: {matched_count}, 未匹配: {unknown_count}")
 
     if unknown_count > 0:
         logger.warning(f"有 {unknown_count} 条新闻未找到风险标注，将标记为 unknown")
 
-    return items_with_risk
-
+    return items
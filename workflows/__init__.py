@@ -3,13 +3,16 @@
 """
 
 from .news_pipeline import run_news_pipeline
-from .risk_assessment import run_risk_assessment_pipeline
-from .summary_generation import run_summary_generation_pipeline
-from .main_workflow import run_main_workflow
+from .risk_assessment import run_risk_assessment_pipeline, arun_risk_assessment_pipeline
+from .summary_generation import run_summary_generation_pipeline, arun_summary_generation_pipeline
+from .main_workflow import run_main_workflow, arun_main_workflow
 
 __all__ = [
     "run_news_pipeline",
     "run_risk_assessment_pipeline",
+    "arun_risk_assessment_pipeline",
     "run_summary_generation_pipeline",
-    "run_main_workflow"
+    "arun_summary_generation_pipeline",
+    "run_main_workflow",
+    "arun_main_workflow",
 ]
@@ -1,15 +1,22 @@
 """
 主工作流入口：新闻处理 -> 风险评估 -> 摘要生成 -> 写入文件（支持多分类 + hours 参数）
 """
+import asyncio
 import os
 import argparse
 from datetime import datetime
 
 from config import settings
 from monitoring.metrics import metrics
-from workflows.news_pipeline import run_news_pipeline_all
-from workflows.risk_assessment import run_risk_assessment_pipeline
-from workflows.summary_generation import run_summary_generation_pipeline
+from preprocessing.cluster import cluster_block
+from preprocessing.ranking import select_top_k
+from storage.item_store import ItemStore
+from storage.risk_cache import RiskVerdictCache
+from storage.seen_filter import SeenStories
+from workflows.news_pipeline import run_news_pipeline_all, run_news_pipeline_from_store
+from llms.llms import get_llm_client
+from workflows.risk_assessment import arun_risk_assessment_pipeline
+from workflows.summary_generation import arun_summary_generation_pipeline
 from utils.email_sender import send_html_email
 from utils.logger import get_logger
 
@@ -27,12 +34,59 @@ def _safe_filename(s: str) -> str:
     return out
 
 
-def run_main_workflow(categories=None, hours: int = 24):
+def run_main_workflow(
+    categories=None,
+    hours: int = 24,
+    incremental: bool | None = None,
+    rss_mode: str | None = None,
+    snapshot_path=None,
+    from_store: bool = False,
+    until: int | None = None,
+    skip_seen: bool | None = None,
+    llm_client=None,
+):
     """
     运行主工作流（多分类）
     Args:
         categories: 分类列表，默认 ["头条","政治","财经","科技"]
         hours: 拉取最近多少小时的新闻（默认 24）
+        incremental: 是否增量拉取（默认取 settings.FRESHRSS_INCREMENTAL）
+        rss_mode: FreshRSS 模式 live / record / replay（默认取 settings.FRESHRSS_MODE）
+        snapshot_path: 录制/回放的快照路径（默认取 settings.FRESHRSS_SNAPSHOT）
+        from_store: 不访问 FreshRSS，用历史条目库中 [until - hours, until] 的条目重跑
+        until: from_store 时的窗口结束时间戳（Unix 秒），默认当前时间
+        skip_seen: 去掉最近 SEEN_FILTER_HOURS 小时内同分类已投递过的新闻（默认取 settings.SEEN_FILTER_ENABLED）
+        llm_client: 复用的 LLMClient，不传则使用进程内共享实例（get_llm_client）
+    """
+    return asyncio.run(
+        arun_main_workflow(
+            categories=categories,
+            hours=hours,
+            incremental=incremental,
+            rss_mode=rss_mode,
+            snapshot_path=snapshot_path,
+            from_store=from_store,
+            until=until,
+            skip_seen=skip_seen,
+            llm_client=llm_client,
+        )
+    )
+
+
+async def arun_main_workflow(
+    categories=None,
+    hours: int = 24,
+    incremental: bool | None = None,
+    rss_mode: str | None = None,
+    snapshot_path=None,
+    from_store: bool = False,
+    until: int | None = None,
+    skip_seen: bool | None = None,
+    llm_client=None,
+):
+    """
+    run_main_workflow 的异步版本：拉取与分类完成后，各分类的风险评估与摘要生成并发执行
+    （参数同 run_main_workflow）
     """
     settings.ensure_directories()
     settings.validate()
@@ -47,71 +101,53 @@ def run_main_workflow(categories=None, hours: int = 24):
 
     logger.info(f"开始主工作流，多分类: {categories}，hours={hours}")
 
-    # 1) 获取 + 预处理 + 分类（一次拉取，多分类输出）
-    logger.info("运行新闻预处理与分类...")
-    blocks = run_news_pipeline_all(categories=categories, hours=hours)
-
-    results = []
-    for block in blocks:
-        category = block.get("category", "unknown")
-        items = block.get("items", [])
-
-        logger.info(f"分类 [{category}] 共有 {len(items)} 条")
-        if not items:
-            logger.info(f"分类 [{category}] 无新闻，跳过风险评估与摘要生成")
-            continue
-
-        # 计数：处理条数（按分类累计）
-        metrics.increment_counter(f"news_processed_{category}", len(items))
-
-        # 2) 风险评估（Gemini）
-        logger.info(f"分类 [{category}] 进行风险评估...")
-        risk_data = run_risk_assessment_pipeline(block)
-
-        low_count = sum(1 for it in risk_data.get("items", []) if it.get("ds_risk") == "low")
-        high_count = sum(1 for it in risk_data.get("items", []) if it.get("ds_risk") == "high")
-        metrics.record_risk_assessment(
-            total=len(risk_data.get("items", [])),
-            low=low_count,
-            high=high_count,
-        )
+    item_store = ItemStore() if (settings.ITEM_STORE_ENABLED or from_store) else None
+    try:
+        if item_store is not None:
+            item_store.start_run(run_ts, hours=hours, categories=categories)
 
-        # 3) 摘要生成
-        logger.info(f"分类 [{category}] 生成摘要...")
-        summaries = run_summary_generation_pipeline(risk_data)
-        merged_summary = summaries.get("merged_summary", "") or ""
-        meta = summaries.get("meta", {}) or {}
-
-        # 如果低风险触发 fallback，记录一次
-        if meta.get("low_is_fallback"):
-            metrics.record_fallback(
-                reason=meta.get("low_filter_reason") or "content_filtered",
-                primary_model="deepseek",
-                fallback_model="gemini",
-            )
+        if skip_seen is None:
+            skip_seen = settings.SEEN_FILTER_ENABLED
+        seen = SeenStories() if skip_seen else None
 
-        # 4) 写入文件：每类一个 merged html（文件名精确到秒）
-        date_str = meta.get("dateStr") or datetime.now().strftime("%Y-%m-%d")
-        safe_cat = _safe_filename(category)
-        filename = f"summary_{safe_cat}_{date_str}_{run_ts}.html"
-        out_path = os.path.join(str(settings.DATA_DIR), filename)
-
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(merged_summary)
-
-        logger.info(f"分类 [{category}] 输出文件: {out_path}")
-        results.append(
-            {
-                "category": category,
-                "output_path": out_path,
-                "meta": meta,
-            }
-        )
+        # 1) 获取 + 预处理 + 分类（一次拉取，多分类输出）
+        logger.info("运行新闻预处理与分类...")
+        if from_store:
+            blocks = run_news_pipeline_from_store(
+                categories=categories,
+                hours=hours,
+                until=until,
+                item_store=item_store,
+                run_id=run_ts,
+            )
+        else:
+            blocks = run_news_pipeline_all(
+                categories=categories,
+                hours=hours,
+                incremental=incremental,
+                rss_mode=rss_mode,
+                snapshot_path=snapshot_path,
+                item_store=item_store,
+                run_id=run_ts,
+            )
 
-        # ✅ 发送邮件：标题不带日期，只要小时
-        subject = f"{hour_cn}-{category}"
-        send_html_email(subject=subject, html_body=merged_summary)
-        logger.info(f"分类 [{category}] 邮件已发送，subject={subject}")
+        # 2) ~ 4) 各分类并发：所有 LLM 请求共用一个客户端的连接池，风险判定缓存共用一个连接
+        llm_client = llm_client or get_llm_client()
+        verdict_cache = RiskVerdictCache() if settings.RISK_CACHE_ENABLED else False
+        try:
+            outcomes = await asyncio.gather(*(
+                _aprocess_category(block, llm_client, item_store, seen, run_ts, hour_cn, verdict_cache)
+                for block in blocks
+            ))
+        finally:
+            await llm_client.aclose()
+            if verdict_cache:
+                verdict_cache.close()
+        results = [result for result in outcomes if result is not None]
+    finally:
+        # 拉取或任一分类失败时也关闭条目库
+        if item_store is not None:
+            item_store.close()
 
     # 5) 打印指标摘要
     metrics.print_summary()
@@ -126,6 +162,97 @@ def run_main_workflow(categories=None, hours: int = 24):
     }
 
 
+async def _aprocess_category(
+    block, llm_client, item_store, seen, run_ts: str, hour_cn: str, verdict_cache=None
+):
+    """单个分类：筛选 → 风险评估 → 摘要生成 → 写文件 → 发邮件；无新闻时返回 None"""
+    category = block.get("category", "unknown")
+
+    # 去掉已投递过的新闻、合并同一事件的报道、按相关度截断（在风险评估前，减少 Gemini / DeepSeek 调用）
+    dropped = []
+    if seen is not None:
+        block, dropped = seen.drop_delivered(block)
+    if settings.CLUSTER_ENABLED:
+        block = cluster_block(block)
+    if settings.RANK_ENABLED:
+        # 按相关度只保留前 K 条，prompt 大小与输出长度不随当天新闻量增长
+        block, ranked_out = select_top_k(block)
+        dropped = dropped + ranked_out
+    if item_store is not None:
+        # 更新 H 编号；被去掉的条目编号置空
+        cleared = [
+            {"item_id": it.get("item_id"), "id": None, "members": it.get("members")}
+            for it in dropped
+        ]
+        item_store.record_classification(run_ts, [block, {"category": category, "items": cleared}])
+
+    items = block.get("items", [])
+
+    logger.info(f"分类 [{category}] 共有 {len(items)} 条")
+    if not items:
+        logger.info(f"分类 [{category}] 无新闻，跳过风险评估与摘要生成")
+        return None
+
+    # 计数：处理条数（按分类累计）
+    metrics.increment_counter(f"news_processed_{category}", len(items))
+
+    # 2) 风险评估（Gemini）
+    logger.info(f"分类 [{category}] 进行风险评估...")
+    risk_data = await arun_risk_assessment_pipeline(
+        block, llm_client=llm_client, verdict_cache=verdict_cache
+    )
+    if item_store is not None:
+        item_store.record_risk(run_ts, risk_data.get("items", []))
+
+    low_count = sum(1 for it in risk_data.get("items", []) if it.get("ds_risk") == "low")
+    high_count = sum(1 for it in risk_data.get("items", []) if it.get("ds_risk") == "high")
+    metrics.record_risk_assessment(
+        total=len(risk_data.get("items", [])),
+        low=low_count,
+        high=high_count,
+    )
+
+    # 3) 摘要生成（低风险 / 高风险并发）
+    logger.info(f"分类 [{category}] 生成摘要...")
+    summaries = await arun_summary_generation_pipeline(risk_data, llm_client=llm_client)
+    merged_summary = summaries.get("merged_summary", "") or ""
+    meta = summaries.get("meta", {}) or {}
+
+    # 如果低风险触发 fallback，记录一次
+    if meta.get("low_is_fallback"):
+        metrics.record_fallback(
+            reason=meta.get("low_filter_reason") or "content_filtered",
+            primary_model="deepseek",
+            fallback_model="gemini",
+        )
+
+    # 4) 写入文件：每类一个 merged html（文件名精确到秒）
+    date_str = meta.get("dateStr") or datetime.now().strftime("%Y-%m-%d")
+    safe_cat = _safe_filename(category)
+    filename = f"summary_{safe_cat}_{date_str}_{run_ts}.html"
+    out_path = os.path.join(str(settings.DATA_DIR), filename)
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(merged_summary)
+
+    logger.info(f"分类 [{category}] 输出文件: {out_path}")
+
+    # ✅ 发送邮件：标题不带日期，只要小时（SMTP 为阻塞调用，放到线程里不挡住其他分类）
+    subject = f"{hour_cn}-{category}"
+    await asyncio.to_thread(send_html_email, subject=subject, html_body=merged_summary)
+    logger.info(f"分类 [{category}] 邮件已发送，subject={subject}")
+
+    if seen is not None:
+        seen.mark_delivered(block)
+        seen.save()
+
+    return {
+        "category": category,
+        "output_path": out_path,
+        "meta": meta,
+    }
+
+
 def _parse_args():
     p = argparse.ArgumentParser(description="DailyNews 主工作流（多分类）")
     p.add_argument(
@@ -140,10 +267,62 @@ def _parse_args():
         default="",
         help='分类列表，逗号分隔，例如： "头条,政治,财经,科技"；不传则用默认分类',
     )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        default=None,
+        help="增量拉取：只请求上次运行之后的新条目，窗口由 data/ 下的本地条目库重建",
+    )
+    snapshot = p.add_mutually_exclusive_group()
+    snapshot.add_argument(
+        "--from-store",
+        action="store_true",
+        help="不访问 FreshRSS，用历史条目库（data/items.sqlite3）中的条目重跑",
+    )
+    snapshot.add_argument(
+        "--record",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="录制 FreshRSS 响应到快照（.json.gz）；不写路径则存到 data/snapshots/",
+    )
+    snapshot.add_argument(
+        "--replay",
+        default=None,
+        metavar="PATH",
+        help="从快照回放 FreshRSS 响应，不访问网络",
+    )
+    p.add_argument(
+        "--until",
+        type=str,
+        default="",
+        help='配合 --from-store：窗口结束时间，格式 "YYYY-MM-DD HH:MM"，默认当前时间',
+    )
+    p.add_argument(
+        "--include-seen",
+        action="store_true",
+        help="不去掉最近已投递过的新闻（默认按 SEEN_FILTER_HOURS 去掉）",
+    )
     return p.parse_args()
 
 
 if __name__ == "__main__":
     args = _parse_args()
     cats = [x.strip() for x in (args.categories or "").split(",") if x.strip()] or None
-    run_main_workflow(categories=cats, hours=args.hours)
\ No newline at end of file
+    rss_mode, snapshot_path = None, None
+    if args.replay:
+        rss_mode, snapshot_path = "replay", args.replay
+    elif args.record is not None:
+        rss_mode, snapshot_path = "record", args.record or None
+    until_ts = int(datetime.strptime(args.until, "%Y-%m-%d %H:%M").timestamp()) if args.until else None
+    run_main_workflow(
+        categories=cats,
+        hours=args.hours,
+        incremental=args.incremental,
+        rss_mode=rss_mode,
+        snapshot_path=snapshot_path,
+        from_store=args.from_store,
+        until=until_ts,
+        skip_seen=False if args.include_seen else None,
+    )
\ No newline at end of file
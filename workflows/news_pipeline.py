@@ -1,48 +1,144 @@
 """新闻处理工作流"""
+import time
 
+from config import settings
 from ingestion.RSSclient import RSSClient
-from preprocessing.filters import filter_ru
-from preprocessing.dedupe import dedupe_items
 from preprocessing.classify import Classify
+from preprocessing.news_item import NewsItem
+from preprocessing.parallel import preprocess
+from preprocessing.stages import chain, iter_dedupe, iter_filter_ru, iter_near_dedupe
+from preprocessing.sanitize import sanitize_block
+from storage.item_store import ItemStore
+from utils.logger import get_logger
+
+logger = get_logger("news_pipeline")
 
 
 DEFAULT_CATEGORIES = ["头条", "政治", "财经", "科技"]  # 你之前 main_workflow 里也是这几类（国际已注释）
 
 
-def run_news_pipeline(category: str = "头条", hours: int = 24):
+def run_news_pipeline(category: str = "头条", hours: int = 24, rss_mode: str | None = None, snapshot_path=None):
     """
     单分类：拉取最近 hours 小时新闻 -> 过滤 -> 去重 -> 分类
+
+    rss_mode / snapshot_path 见 RSSClient（live / record / replay）
     """
-    rss = RSSClient()
+    rss = RSSClient(mode=rss_mode, snapshot_path=snapshot_path)
     data = rss.get_news(hours=hours)
-
-    filtered = filter_ru(data)
-    deduped = dedupe_items(filtered)
+    items = chain(
+        map(NewsItem.from_raw, data.get("items", [])),
+        iter_filter_ru,
+        iter_dedupe,
+        iter_near_dedupe,
+    )
 
     classifier = Classify(category=category)
-    classified = classifier._process_headlines(deduped.get("items", []))
+    classified = classifier._process_headlines(items)
     classified["category"] = category
+    sanitize_block(classified)
     return classified
 
 
-def run_news_pipeline_all(categories=None, hours: int = 24):
-    """
-    多分类：一次拉取最近 hours 小时新闻 -> 过滤 -> 去重 -> 每个分类分别产出 block
+def _classify_blocks(items, categories):
     """
-    categories = categories or DEFAULT_CATEGORIES
-
-    rss = RSSClient()
-    data = rss.get_news(hours=hours)
+    去重（精确 + 近似）-> 单次遍历分类 -> 摘要清洗，每个分类产出一个 block（items 应已过滤）
 
-    filtered = filter_ru(data)
-    deduped = dedupe_items(filtered)
-    raw_items = deduped.get("items", [])
+    开启 PREPROCESS_WORKERS 且条目数达到 PREPROCESS_PARALLEL_MIN_ITEMS 时，去重与分类在进程池中并行（结果与串行一致）
+    """
+    partitioned = preprocess(items, categories)
 
     blocks = []
     for cat in categories:
-        classifier = Classify(category=cat)
-        block = classifier._process_headlines(raw_items)
+        block = dict(partitioned[cat])
         block["category"] = cat
+        sanitize_block(block)
         blocks.append(block)
 
-    return blocks
\ No newline at end of file
+    return blocks
+
+
+def run_news_pipeline_all(
+    categories=None,
+    hours: int = 24,
+    incremental: bool | None = None,
+    rss_mode: str | None = None,
+    snapshot_path=None,
+    item_store=None,
+    run_id: str | None = None,
+):
+    """
+    多分类：分页拉取最近 hours 小时新闻 -> 过滤 -> 去重 -> 每个分类分别产出 block
+
+    incremental 为 True 时只拉取本地高水位之后的新条目，窗口由本地条目库重建；
+    不传则取 settings.FRESHRSS_INCREMENTAL
+    rss_mode / snapshot_path 见 RSSClient（live / record / replay）
+    item_store / run_id 传入时，拉取到的条目与分类结果写入历史条目库
+    """
+    categories = categories or DEFAULT_CATEGORIES
+    if incremental is None:
+        incremental = settings.FRESHRSS_INCREMENTAL
+
+    rss = RSSClient(mode=rss_mode, snapshot_path=snapshot_path)
+
+    def ingest(raw_items):
+        # 拉取后立即转换为 NewsItem，原始 greader 条目不再向后传递
+        items = map(NewsItem.from_raw, raw_items)
+        if item_store is not None:
+            items = list(items)
+            item_store.add_items(items, run_id=run_id)
+        return iter_filter_ru(items)
+
+    kept = []
+    if incremental:
+        kept.extend(ingest(rss.get_news_incremental(hours=hours)["items"]))
+    elif settings.FRESHRSS_SHARDS > 1:
+        kept.extend(ingest(rss.get_news_sharded(hours=hours)["items"]))
+    else:
+        # 分页流式拉取：每到一页先做过滤和入库，后续页在后台继续下载
+        for _, page_items in rss.iter_pages(hours=hours):
+            kept.extend(ingest(page_items))
+
+    blocks = _classify_blocks(kept, categories)
+
+    if item_store is not None and run_id:
+        item_store.record_classification(run_id, blocks)
+
+    return blocks
+
+
+def run_news_pipeline_from_store(
+    categories=None,
+    hours: int = 24,
+    until: int | None = None,
+    item_store=None,
+    run_id: str | None = None,
+):
+    """
+    用历史条目库重跑：取 [until - hours, until] 内的已存条目 -> 过滤 -> 去重 -> 分类，
+    不访问 FreshRSS
+
+    Args:
+        categories: 分类列表
+        hours: 时间窗口（小时）
+        until: 窗口结束时间戳（Unix 秒），默认当前时间
+        item_store: ItemStore，默认打开 settings.ITEM_STORE_PATH
+        run_id: 传入时把本次重跑的成员关系与分类结果也记入库中
+    """
+    categories = categories or DEFAULT_CATEGORIES
+    until = int(until or time.time())
+    since = until - int(hours) * 3600
+
+    store = item_store or ItemStore()
+    items = store.load_items(since, until)
+    logger.info(f"从历史条目库读取 {len(items)} 条新闻（{since} ~ {until}）")
+
+    if run_id:
+        store.add_items(items, run_id=run_id)
+
+    kept = list(iter_filter_ru(items))
+    blocks = _classify_blocks(kept, categories)
+
+    if run_id:
+        store.record_classification(run_id, blocks)
+
+    return blocks
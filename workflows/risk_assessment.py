@@ -1,16 +1,22 @@
 """
 新闻风险评估工作流
+
+逐条判定结果按 story_key 缓存（storage.risk_cache），有效期内已判定过的新闻不再发给 Gemini，
+prompt 只包含新条目；缓存结果与本次结果合并后再标注到各条目。
 """
 
+from config import settings
 from llms.build_prompt import build_ds_risk_prompt
-from llms.llms import LLMClient
+from llms.llms import get_llm_client
+from monitoring.metrics import metrics
+from storage.risk_cache import RiskVerdictCache
 from utils.risk import parse_risk_response, annotate_risk_levels
 from utils.logger import get_logger
 
 logger = get_logger("risk_assessment")
 
 
-def run_risk_assessment_pipeline(classified_data):
+def run_risk_assessment_pipeline(classified_data, llm_client=None, verdict_cache=None):
     """
     执行新闻风险评估工作流
 
@@ -21,11 +27,13 @@ def run_risk_assessment_pipeline(classified_data):
                 "category": "头条/政治/财经/科技/国际",   # 可选，但建议带上
                 "items": [...]
             }
+        llm_client: 复用的 LLMClient，不传则使用进程内共享实例（get_llm_client）
+        verdict_cache: RiskVerdictCache；不传时按 settings.RISK_CACHE_ENABLED 打开默认缓存，传 False 不使用
 
     流程：
-    1. 构建风险评估 prompt
-    2. 请求 Gemini 进行风险评分
-    3. 解析结果并标注每条新闻的风险等级
+    1. 查询逐条判定缓存，只为没有缓存结果的新闻构建风险评估 prompt
+    2. 请求 Gemini 进行风险评分（全部命中缓存时跳过）
+    3. 解析结果，与缓存结果合并后标注每条新闻的风险等级
 
     Returns:
         dict: 标注了风险等级的新闻数据（保留 category 等字段）
@@ -36,42 +44,137 @@ def run_risk_assessment_pipeline(classified_data):
                 "items": [...],             # 每条带 ds_risk
             }
     """
+    verdict_cache, owned = _open_cache(verdict_cache)
+    try:
+        plan = _plan_risk(classified_data, verdict_cache)
+
+        response = None
+        if plan["prompt_data"]:
+            # 2. 请求 Gemini
+            logger.info("请求 Gemini 进行风险评估...")
+            llm_client = llm_client or get_llm_client()
+            response = llm_client.request_gemini(
+                prompt=plan["prompt_data"]["prompt"],
+                temperature=0.1,
+                max_tokens=1000
+            )
+            logger.info("✓ Gemini 响应成功")
+
+        return _annotate(classified_data, plan, response)
+    finally:
+        if owned:
+            verdict_cache.close()
+
+
+async def arun_risk_assessment_pipeline(classified_data, llm_client=None, verdict_cache=None):
+    """run_risk_assessment_pipeline 的异步版本（多个分类可并发评估）"""
+    verdict_cache, owned = _open_cache(verdict_cache)
+    try:
+        plan = _plan_risk(classified_data, verdict_cache)
+
+        response = None
+        if plan["prompt_data"]:
+            logger.info("请求 Gemini 进行风险评估...")
+            llm_client = llm_client or get_llm_client()
+            response = await llm_client.arequest_gemini(
+                prompt=plan["prompt_data"]["prompt"],
+                temperature=0.1,
+                max_tokens=1000
+            )
+            logger.info("✓ Gemini 响应成功")
+
+        return _annotate(classified_data, plan, response)
+    finally:
+        if owned:
+            verdict_cache.close()
+
+
+def _open_cache(verdict_cache):
+    """
+    解析 verdict_cache 参数
+
+    Returns:
+        tuple: (RiskVerdictCache 或 None, 是否由本次调用打开——是则调用方负责关闭)
+    """
+    if verdict_cache is False:
+        return None, False
+    if verdict_cache is None:
+        if not settings.RISK_CACHE_ENABLED:
+            return None, False
+        return RiskVerdictCache(), True
+    return verdict_cache, False
+
 
+def _plan_risk(classified_data, verdict_cache):
+    """查询缓存（verdict_cache 为 None 时不使用）并为未判定过的条目构建 prompt"""
     if not classified_data or classified_data.get("section") != "headline":
         raise ValueError("输入数据必须是 headline 类型的分类结果")
 
-    classified = classified_data
-    category = classified.get("category")
-    date_str = classified.get("dateStr") or classified.get("date")
-
-    item_count = len(classified.get("items", []))
-    logger.info(f"开始风险评估，共 {item_count} 条新闻" + (f"（{category}）" if category else ""))
+    items = classified_data.get("items", [])
+    category = classified_data.get("category")
+    logger.info(f"开始风险评估，共 {len(items)} 条新闻" + (f"（{category}）" if category else ""))
+    if not items:
+        raise ValueError("无法构建风险评估 prompt（可能是 items 为空）")
 
-    # 2. 构建风险评估 prompt
-    logger.info("构建风险评估 prompt...")
-    prompt_data = build_ds_risk_prompt(classified)
+    keys = [RiskVerdictCache.key(item) for item in items]
+    cached = verdict_cache.get_many(keys) if verdict_cache is not None else {}
+    fresh = [idx for idx, key in enumerate(keys) if key not in cached]
+
+    if cached:
+        hits = len(items) - len(fresh)
+        metrics.increment_counter("risk_verdict_cached", hits)
+        logger.info(f"风险判定缓存命中 {hits} 条，需评估 {len(fresh)} 条")
+
+    # 1. 构建风险评估 prompt（只含新条目，编号按新条目顺序 1..m）
+    prompt_data = None
+    if fresh:
+        logger.info("构建风险评估 prompt...")
+        prompt_data = build_ds_risk_prompt({
+            "section": "headline",
+            "items": [items[idx] for idx in fresh],
+        })
+        if not prompt_data:
+            raise ValueError("无法构建风险评估 prompt（可能是 items 为空）")
+
+    return {
+        "keys": keys,
+        "cached": cached,
+        "fresh": fresh,
+        "prompt_data": prompt_data,
+        "verdict_cache": verdict_cache,
+    }
 
-    if not prompt_data:
-        raise ValueError("无法构建风险评估 prompt（可能是 items 为空）")
 
-    # 3. 请求 Gemini
-    logger.info("请求 Gemini 进行风险评估...")
-    llm_client = LLMClient()
-    response = llm_client.request_gemini(
-        prompt=prompt_data["prompt"],
-        temperature=0.1,
-        max_tokens=1000
-    )
-    logger.info("✓ Gemini 响应成功")
-
-    # 4. 解析风险评分
-    logger.info("解析风险评分...")
-    risk_map = parse_risk_response(response)
-    logger.info(f"✓ 解析完成，识别 {len(risk_map)} 条风险标注")
-
-    # 5. 标注风险等级
+def _annotate(classified, plan, response):
+    category = classified.get("category")
+    date_str = classified.get("dateStr") or classified.get("date")
+    items = classified.get("items", [])
+    keys = plan["keys"]
+
+    # 3. 解析风险评分（prompt 编号 -> 条目在新条目中的位置）
+    fresh_verdicts = {}
+    if response is not None:
+        logger.info("解析风险评分...")
+        fresh_map = parse_risk_response(response)
+        logger.info(f"✓ 解析完成，识别 {len(fresh_map)} 条风险标注")
+        for n, idx in enumerate(plan["fresh"], start=1):
+            if str(n) in fresh_map:
+                fresh_verdicts[keys[idx]] = fresh_map[str(n)]
+        metrics.increment_counter("risk_verdict_new", len(fresh_verdicts))
+
+    if plan["verdict_cache"] is not None and fresh_verdicts:
+        plan["verdict_cache"].put_many(fresh_verdicts)
+
+    # 缓存结果与本次结果合并，按条目 H 编号给出 risk_map
+    verdicts = {**plan["cached"], **fresh_verdicts}
+    risk_map = {}
+    for item, key in zip(items, keys):
+        if key in verdicts:
+            risk_map[str(item.get("id", "")).replace("H", "")] = verdicts[key]
+
+    # 4. 标注风险等级
     logger.info("标注风险等级...")
-    items_with_risk = annotate_risk_levels(classified.get("items", []), risk_map)
+    items_with_risk = annotate_risk_levels(items, risk_map)
 
     low_count = sum(1 for item in items_with_risk if item.get("ds_risk") == "low")
     high_count = sum(1 for item in items_with_risk if item.get("ds_risk") == "high")
@@ -89,4 +192,3 @@ def run_risk_assessment_pipeline(classified_data):
         out["dateStr"] = date_str
 
     return out
-
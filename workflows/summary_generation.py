@@ -1,13 +1,19 @@
 """
 新闻摘要生成工作流
+
+素材较多时按 SUMMARY_CHUNK_TOKENS 拆块（map）：各块编号接续、并发生成，再按顺序拼接（reduce），
+单次生成的耗时随块大小而不是总条数增长；SUMMARY_CONDENSE 开启时再请求一次模型整合各块。
 """
+import asyncio
 import re
 from datetime import datetime
 
-from llms.build_prompt import build_headline_prompt
-from llms.llms import LLMClient
+from config import settings
+from llms.build_prompt import build_condense_prompt, build_headline_prompts
+from llms.llms import get_llm_client
+from monitoring.metrics import metrics
 from utils.link_processor import process_summary_links
-from utils.merge_summaries import merge_summaries
+from utils.merge_summaries import concat_sections, merge_summaries
 from utils.logger import get_logger
 
 logger = get_logger("summary_generation")
@@ -52,10 +58,123 @@ def _force_h1_title(html: str, title: str) -> str:
     return f"<h1>{title}</h1>\n{html}"
 
 
-def run_summary_generation_pipeline(risk_annotated_data):
+def run_summary_generation_pipeline(risk_annotated_data, llm_client=None):
     """
     执行新闻摘要生成工作流
+
+    llm_client: 复用的 LLMClient，不传则使用进程内共享实例（get_llm_client）
+
+    素材超过 SUMMARY_CHUNK_TOKENS 时按块生成（编号接续）再拼接；
+    开启 SUMMARY_CONDENSE 时对分块结果再做一次整合。
     """
+    plan = _plan_summaries(risk_annotated_data)
+    llm_client = llm_client or get_llm_client()
+
+    low_resps = []
+    if plan["low_prompts"]:
+        logger.info(f"生成低风险摘要（DeepSeek 主 + fallback，{len(plan['low_prompts'])} 块）...")
+        low_resps = [
+            llm_client.request_with_fallback(
+                prompt=prompt,
+                primary="deepseek",
+                temperature=0.3,
+                max_tokens=4000,
+            )
+            for prompt in plan["low_prompts"]
+        ]
+
+    high_parts = []
+    if plan["high_prompts"]:
+        logger.info(f"生成高风险摘要（Gemini，{len(plan['high_prompts'])} 块）...")
+        high_parts = [
+            llm_client.request_gemini(
+                prompt=prompt,
+                temperature=0.3,
+                max_tokens=4000,
+            ) or ""
+            for prompt in plan["high_prompts"]
+        ]
+
+    low_resp = _combine_low(plan, low_resps)
+    high_risk_summary = concat_sections(high_parts, date=plan["date_str"], category=plan["category"])
+
+    if _should_condense(plan, "low", low_resp):
+        logger.info("整合低风险分块摘要...")
+        condensed = llm_client.request_with_fallback(
+            prompt=build_condense_prompt(low_resp["content"], plan["date_str"], plan["category"]),
+            primary="deepseek",
+            temperature=0.3,
+            max_tokens=4000,
+        )
+        low_resp = _apply_condensed_low(low_resp, condensed)
+
+    if _should_condense(plan, "high", high_risk_summary):
+        logger.info("整合高风险分块摘要...")
+        condensed = llm_client.request_gemini(
+            prompt=build_condense_prompt(high_risk_summary, plan["date_str"], plan["category"]),
+            temperature=0.3,
+            max_tokens=4000,
+        )
+        high_risk_summary = _keep_refs(high_risk_summary, condensed)
+
+    return _assemble_summaries(plan, low_resp, high_risk_summary)
+
+
+async def arun_summary_generation_pipeline(risk_annotated_data, llm_client=None):
+    """run_summary_generation_pipeline 的异步版本：低风险 / 高风险的各块摘要全部并发生成"""
+    plan = _plan_summaries(risk_annotated_data)
+    llm_client = llm_client or get_llm_client()
+
+    def low(prompt):
+        return llm_client.arequest_with_fallback(
+            prompt=prompt,
+            primary="deepseek",
+            temperature=0.3,
+            max_tokens=4000,
+        )
+
+    def high(prompt):
+        return llm_client.arequest_gemini(
+            prompt=prompt,
+            temperature=0.3,
+            max_tokens=4000,
+        )
+
+    if plan["low_prompts"]:
+        logger.info(f"生成低风险摘要（DeepSeek 主 + fallback，{len(plan['low_prompts'])} 块）...")
+    if plan["high_prompts"]:
+        logger.info(f"生成高风险摘要（Gemini，{len(plan['high_prompts'])} 块）...")
+
+    n_low = len(plan["low_prompts"])
+    results = await asyncio.gather(
+        *(low(prompt) for prompt in plan["low_prompts"]),
+        *(high(prompt) for prompt in plan["high_prompts"]),
+    )
+    low_resp = _combine_low(plan, results[:n_low])
+    high_risk_summary = concat_sections(
+        [part or "" for part in results[n_low:]], date=plan["date_str"], category=plan["category"]
+    )
+
+    async def condense_low():
+        if not _should_condense(plan, "low", low_resp):
+            return low_resp
+        logger.info("整合低风险分块摘要...")
+        condensed = await low(build_condense_prompt(low_resp["content"], plan["date_str"], plan["category"]))
+        return _apply_condensed_low(low_resp, condensed)
+
+    async def condense_high():
+        if not _should_condense(plan, "high", high_risk_summary):
+            return high_risk_summary
+        logger.info("整合高风险分块摘要...")
+        condensed = await high(build_condense_prompt(high_risk_summary, plan["date_str"], plan["category"]))
+        return _keep_refs(high_risk_summary, condensed)
+
+    low_resp, high_risk_summary = await asyncio.gather(condense_low(), condense_high())
+    return _assemble_summaries(plan, low_resp, high_risk_summary)
+
+
+def _plan_summaries(risk_annotated_data):
+    """按风险等级拆分条目并按 token 预算构建低 / 高风险 prompt 块（无条目的一侧为空列表）"""
     if not risk_annotated_data or risk_annotated_data.get("section") != "headline":
         raise ValueError("输入数据必须是 headline 类型，且 items 已包含 ds_risk")
 
@@ -76,70 +195,123 @@ def run_summary_generation_pipeline(risk_annotated_data):
         + f"，低风险 {len(low_items)}，高风险 {len(high_items)}"
     )
 
-    llm_client = LLMClient()
-
-    # ---------- 低风险（DeepSeek 主，触发过滤才 fallback Gemini）----------
-    low_risk_summary = ""
-    low_meta = {"model_used": None, "is_fallback": False, "filter_reason": None}
-    low_refs = []
-    if low_items:
-        low_block = {
+    plan = {
+        "category": category,
+        "date_str": date_str,
+        "now_hour": now_hour,
+        "forced_title": forced_title,
+        "total_items": len(items),
+        "low_items": len(low_items),
+        "high_items": len(high_items),
+        "low_prompts": [],
+        "low_refs": [],
+        "high_prompts": [],
+        "high_refs": [],
+    }
+
+    # ---------- 低风险（DeepSeek 主，触发过滤才 fallback Gemini）/ 高风险（直接 Gemini）----------
+    for risk, risk_items in (("low", low_items), ("high", high_items)):
+        if not risk_items:
+            label = "低" if risk == "low" else "高"
+            logger.info(f"{label}风险新闻为空，跳过{label}风险摘要生成")
+            continue
+
+        block = {
             "section": "headline",
-            "items": low_items,
+            "items": risk_items,
         }
         if category:
-            low_block["category"] = category
+            block["category"] = category
         if date_str:
-            low_block["dateStr"] = date_str
+            block["dateStr"] = date_str
 
-        low_prompt_data = build_headline_prompt(low_block, risk_filter="low")
-        low_refs = low_prompt_data.get("refs", [])
+        # 各块编号接续，拼接后的 refs 与单次生成一致
+        chunks = build_headline_prompts(block, risk_filter=risk)
+        plan[f"{risk}_prompts"] = [chunk["prompt"] for chunk in chunks]
+        plan[f"{risk}_refs"] = [ref for chunk in chunks for ref in chunk.get("refs", [])]
+        if len(chunks) > 1:
+            metrics.increment_counter(f"summary_chunks_{risk}", len(chunks))
+            logger.info(f"{'低' if risk == 'low' else '高'}风险素材超出 token 预算，拆为 {len(chunks)} 块生成")
 
-        logger.info("生成低风险摘要（DeepSeek 主 + fallback）...")
-        resp = llm_client.request_with_fallback(
-            prompt=low_prompt_data["prompt"],
-            primary="deepseek",
-            temperature=0.3,
-            max_tokens=4000,
-        )
+    return plan
 
-        low_risk_summary = resp.get("content", "") or ""
-        low_meta = {
-            "model_used": resp.get("model_used"),
-            "is_fallback": bool(resp.get("is_fallback")),
-            "filter_reason": resp.get("filter_reason"),
-        }
 
-        logger.info(f"✓ 低风险摘要生成完成，模型: {low_meta['model_used']}, fallback: {low_meta['is_fallback']}")
-    else:
-        logger.info("低风险新闻为空，跳过低风险摘要生成")
+def _combine_low(plan, low_resps):
+    """拼接低风险各块的 request_with_fallback 结果（任一块 fallback 即记为 fallback）"""
+    if not low_resps:
+        return None
 
-    # ---------- 高风险（直接 Gemini）----------
-    high_risk_summary = ""
-    high_refs = []
-    if high_items:
-        high_block = {
-            "section": "headline",
-            "items": high_items,
-        }
-        if category:
-            high_block["category"] = category
-        if date_str:
-            high_block["dateStr"] = date_str
+    models = list(dict.fromkeys(r.get("model_used") for r in low_resps if r.get("model_used")))
+    return {
+        "content": concat_sections(
+            [r.get("content", "") or "" for r in low_resps], date=plan["date_str"], category=plan["category"]
+        ),
+        "model_used": "+".join(models) or None,
+        "is_fallback": any(r.get("is_fallback") for r in low_resps),
+        "filter_reason": next((r.get("filter_reason") for r in low_resps if r.get("filter_reason")), None),
+    }
+
+
+def _should_condense(plan, risk, content) -> bool:
+    if not settings.SUMMARY_CONDENSE or len(plan[f"{risk}_prompts"]) < 2:
+        return False
+    if isinstance(content, dict):
+        content = content.get("content")
+    return bool(content)
+
+
+_REF_RE = re.compile(r"\[(\d+)\]")
+
+
+def _keep_refs(original: str, condensed: str | None) -> str:
+    """整合结果漏掉引用编号时保留拼接版本"""
+    if not condensed:
+        return original
+    missing = set(_REF_RE.findall(original)) - set(_REF_RE.findall(condensed))
+    if missing:
+        logger.warning(f"整合结果缺少 {len(missing)} 个引用编号，保留分块拼接版本")
+        metrics.increment_counter("summary_condense_rejected")
+        return original
+    return condensed
+
+
+def _apply_condensed_low(low_resp, condensed):
+    content = _keep_refs(low_resp["content"], condensed.get("content"))
+    if content is low_resp["content"]:
+        return low_resp
+    return dict(
+        low_resp,
+        content=content,
+        is_fallback=low_resp["is_fallback"] or bool(condensed.get("is_fallback")),
+        filter_reason=low_resp["filter_reason"] or condensed.get("filter_reason"),
+    )
 
-        high_prompt_data = build_headline_prompt(high_block, risk_filter="high")
-        high_refs = high_prompt_data.get("refs", [])
 
-        logger.info("生成高风险摘要（Gemini）...")
-        high_risk_summary = llm_client.request_gemini(
-            prompt=high_prompt_data["prompt"],
-            temperature=0.3,
-            max_tokens=4000,
-        ) or ""
+def _max_ref(refs) -> int:
+    return max((r.get("n", 0) for r in refs if isinstance(r.get("n"), int)), default=0)
+
+
+def _assemble_summaries(plan, low_resp, high_risk_summary):
+    """合并低 / 高风险摘要，替换引用链接并统一标题"""
+    category = plan["category"]
+    date_str = plan["date_str"]
+    forced_title = plan["forced_title"]
+    low_refs = plan["low_refs"]
+    high_refs = plan["high_refs"]
 
+    low_risk_summary = ""
+    low_meta = {"model_used": None, "is_fallback": False, "filter_reason": None}
+    if low_resp is not None:
+        low_risk_summary = low_resp.get("content", "") or ""
+        low_meta = {
+            "model_used": low_resp.get("model_used"),
+            "is_fallback": bool(low_resp.get("is_fallback")),
+            "filter_reason": low_resp.get("filter_reason"),
+        }
+        logger.info(f"✓ 低风险摘要生成完成，模型: {low_meta['model_used']}, fallback: {low_meta['is_fallback']}")
+
+    if high_risk_summary:
         logger.info("✓ 高风险摘要生成完成")
-    else:
-        logger.info("高风险新闻为空，跳过高风险摘要生成")
 
     # ---------- 合并（先合并再替换链接，避免合并时引用重编号失效）----------
     merged_summary = merge_summaries(
@@ -148,14 +320,13 @@ def run_summary_generation_pipeline(risk_annotated_data):
         date=date_str,
         category=category,
         add_section_headers=True,
+        offset=_max_ref(low_refs),
     )
 
     # 合并后统一把 #refN 替换为真实 URL
     # 低/高风险各自 refs 编号从 1 开始；合并时高风险引用会被平移
     all_refs = []
-    offset = 0
-    if low_refs:
-        offset = max(r.get("n", 0) for r in low_refs if isinstance(r.get("n"), int)) or 0
+    offset = _max_ref(low_refs)
     all_refs.extend(low_refs)
 
     if high_refs:
@@ -188,11 +359,13 @@ def run_summary_generation_pipeline(risk_annotated_data):
         "meta": {
             "category": category,
             "dateStr": date_str,
-            "titleHour": now_hour,
+            "titleHour": plan["now_hour"],
             "forcedTitle": forced_title,
-            "total_items": len(items),
-            "low_items": len(low_items),
-            "high_items": len(high_items),
+            "total_items": plan["total_items"],
+            "low_items": plan["low_items"],
+            "high_items": plan["high_items"],
+            "low_chunks": len(plan["low_prompts"]),
+            "high_chunks": len(plan["high_prompts"]),
             "low_model_used": low_meta.get("model_used"),
             "low_is_fallback": low_meta.get("is_fallback"),
             "low_filter_reason": low_meta.get("filter_reason"),